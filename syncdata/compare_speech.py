@@ -64,13 +64,12 @@ def parse_textgrid(textgrid_path):
 def extract_phone_features(audio_path, phone_info):
     """특정 음소 구간에서 음향 특징을 추출합니다."""
     try:
-        y, sr = librosa.load(audio_path)
-        
-        start_sample = int(phone_info['start'] * sr)
-        end_sample = int(phone_info['end'] * sr)
-        
-        # 음소 구간 추출
-        phone_audio = y[start_sample:end_sample]
+        # 파일 전체가 아니라 음소 구간만 읽는다 (긴 파일도 메모리 사용이 구간 길이에 비례)
+        phone_audio, sr = librosa.load(
+            audio_path,
+            offset=max(0.0, float(phone_info['start'])),
+            duration=max(0.0, float(phone_info['end']) - float(phone_info['start'])),
+        )
         
         if len(phone_audio) < 512:  # 너무 짧은 구간 처리
             return None
@@ -0,0 +1,130 @@
+"""
+ASR 엔진 인터페이스
+
+transcribe_audio 는 어떤 엔진을 쓰든 whisper 와 같은 모양의 결과를 받는다:
+    {"text": str, "language": str, "segments": [
+        {"id", "start", "end", "text", "avg_logprob", "compression_ratio", "no_speech_prob",
+         "words": [{"word", "start", "end", "probability"}, ...]}, ...]}
+
+- whisper_timestamped: 기존 PyTorch Whisper (GPU 또는 CPU float32)
+- faster_whisper: CTranslate2 기반, CPU 에서 int8 양자화 + 멀티스레드로 추론
+
+옵션 이름은 whisper transcribe 기준 (beam_size, best_of, temperature, logprob_threshold ...) 이고
+엔진별로 맞는 이름으로 바꿔 넘긴다. 모델은 asr_models 저장소에서 빌려 쓴다.
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from asr_models import get_asr_registry
+from config import ASR_BACKEND, ASR_MODEL_NAME, ASR_DEVICE, ASR_COMPUTE_TYPE
+
+
+class ASRBackend(ABC):
+    name = None
+    streams_segments = False  # True 면 iter_segments 가 전체 전사를 기다리지 않고 디코딩되는 대로 내줌
+
+    def __init__(self, model_name=ASR_MODEL_NAME, device=ASR_DEVICE, compute_type=ASR_COMPUTE_TYPE):
+        self.model_name = model_name
+        self.device = device
+        self.compute_type = compute_type
+
+    @property
+    def key(self):
+        return get_asr_registry().make_key(self.model_name, self.device, self.compute_type, self.name)
+
+    def _use_model(self):
+        _, name, device, compute_type = self.key
+        return get_asr_registry().use(name, device, compute_type, self.name)
+
+    @abstractmethod
+    def transcribe(self, audio: np.ndarray, **options) -> dict:
+        """
+        audio: 16kHz mono float32 배열 → whisper 와 같은 모양의 결과 (엔진마다 구현)
+        """
+
+    def iter_segments(self, audio: np.ndarray, **options):
+        """
+        segment 를 확정되는 대로 yield (기본: 전체 전사 후 차례로)
+        """
+        yield from self.transcribe(audio, **options).get("segments", [])
+
+
+class WhisperTimestampedBackend(ASRBackend):
+    name = "whisper_timestamped"
+
+    def transcribe(self, audio, **options):
+        options.setdefault("fp16", self.key[3] == "float16")
+        with self._use_model() as model:
+            return model.transcribe(audio, **options)
+
+
+class FasterWhisperBackend(ASRBackend):
+    name = "faster_whisper"
+    streams_segments = True
+
+    # whisper 옵션 이름 → faster-whisper 옵션 이름
+    OPTION_NAMES = {"logprob_threshold": "log_prob_threshold"}
+
+    def _convert_options(self, options) -> dict:
+        options = dict(options)
+        options.pop("fp16", None)  # compute type 은 모델 로드 시 정해짐
+        # whisper 는 beam_size/best_of=None 이 greedy, faster-whisper 는 1 이 greedy (None 이면 기본값 5)
+        for key in ("beam_size", "best_of"):
+            if key in options and options[key] is None:
+                options[key] = 1
+        return {self.OPTION_NAMES.get(k, k): v for k, v in options.items()}
+
+    def transcribe(self, audio, **options):
+        options = self._convert_options(options)
+        with self._use_model() as model:
+            segments, info = model.transcribe(np.asarray(audio, dtype=np.float32), **options)
+            segments = [self._to_dict(i, seg) for i, seg in enumerate(segments)]  # generator 라 여기서 디코딩
+        return {
+            "text": "".join(seg["text"] for seg in segments),
+            "language": info.language,
+            "segments": segments,
+        }
+
+    def iter_segments(self, audio, **options):
+        # faster-whisper 는 segment 를 generator 로 내주므로 디코딩되는 대로 바로 넘긴다
+        options = self._convert_options(options)
+        with self._use_model() as model:
+            segments, _ = model.transcribe(np.asarray(audio, dtype=np.float32), **options)
+            for i, seg in enumerate(segments):
+                yield self._to_dict(i, seg)
+
+    @staticmethod
+    def _to_dict(index, seg) -> dict:
+        return {
+            "id": index,
+            "seek": seg.seek,
+            "start": seg.start,
+            "end": seg.end,
+            "text": seg.text,
+            "tokens": list(seg.tokens),
+            "temperature": seg.temperature,
+            "avg_logprob": seg.avg_logprob,
+            "compression_ratio": seg.compression_ratio,
+            "no_speech_prob": seg.no_speech_prob,
+            "words": [
+                {"word": w.word, "start": w.start, "end": w.end, "probability": w.probability}
+                for w in (seg.words or [])
+            ],
+        }
+
+
+BACKENDS = {
+    WhisperTimestampedBackend.name: WhisperTimestampedBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def get_asr_backend(name=ASR_BACKEND, **kwargs) -> ASRBackend:
+    """
+    이름으로 ASR 엔진 생성 (모델 자체는 저장소에서 공유되므로 가볍다)
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"알 수 없는 ASR backend: {name} (가능: {', '.join(BACKENDS)})")
+    return BACKENDS[name](**kwargs)
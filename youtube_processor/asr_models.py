@@ -0,0 +1,328 @@
+"""
+프로세스 전역 ASR 모델 저장소
+
+transcribe_audio 가 호출될 때마다 Whisper 가중치를 디스크에서 다시 읽지 않도록,
+로드한 모델을 (backend, 모델 이름, device, compute type) 키로 보관한다.
+
+- 같은 키를 동시에 요청해도 한 번만 로드 (키별 lock)
+- use() 로 빌려 쓰는 동안은 같은 모델을 다른 스레드가 동시에 쓰지 않고, 삭제 대상에서도 빠진다
+- 서버 시작 시 preload() 로 미리 올려 첫 요청 지연을 없앤다
+- 모델별 메모리, 로드 시간, 사용 횟수 집계 (PyTorch 는 파라미터 바이트, CTranslate2 는 model.bin 크기로 추정,
+  잴 수 없는 모델은 "unmeasured" 로 표시)
+- ASR_MODEL_IDLE_EVICT_SEC 동안 안 쓴 모델은 백그라운드 스레드가 내려서 메모리를 돌려준다 (None 이면 계속 유지)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import ASR_BACKEND, ASR_MODEL_NAME, ASR_DEVICE, ASR_COMPUTE_TYPE, ASR_PRELOAD, ASR_MODEL_IDLE_EVICT_SEC, ASR_CPU_THREADS
+
+
+def default_device() -> str:
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def default_compute_type(backend, device) -> str:
+    if device.startswith("cuda"):
+        return "float16"
+    return "int8" if backend == "faster_whisper" else "float32"
+
+
+def _load_whisper_timestamped(name, device, compute_type):
+    import whisper_timestamped as wts
+    # compute type 은 transcribe 시 fp16 옵션으로 반영 (가중치는 whisper 기본대로 로드)
+    return wts.load_model(name, device=device)
+
+
+def _load_faster_whisper(name, device, compute_type):
+    from faster_whisper import WhisperModel
+    # CTranslate2 int8 양자화 + 멀티스레드 CPU 추론
+    # 스레드 수: ASR_CPU_THREADS → OMP_NUM_THREADS(병렬 전사 워커가 설정) → 코어 수
+    threads = ASR_CPU_THREADS or int(os.environ.get("OMP_NUM_THREADS") or 0) or os.cpu_count() or 0
+    return WhisperModel(name, device=device, compute_type=compute_type, cpu_threads=threads)
+
+
+def _torch_model_bytes(model, name, compute_type):
+    """
+    PyTorch 모델: 올라간 파라미터 바이트를 그대로 센다
+    """
+    return sum(p.numel() * p.element_size() for p in model.parameters()), "parameters"
+
+
+# CTranslate2 compute type 의 가중치 원소당 바이트 (int8_float16 처럼 섞인 타입은 앞쪽이 가중치 타입)
+_CT2_WEIGHT_BYTES = {"int8": 1, "int16": 2, "float16": 2, "bfloat16": 2, "float32": 4}
+
+
+def _ctranslate2_model_bytes(model, name, compute_type):
+    """
+    faster_whisper(CTranslate2) 모델: 파라미터를 꺼낼 수 없으므로 디스크의 model.bin 크기를
+    compute type 의 원소 크기로 환산해 추정 (변환된 Whisper 모델은 float16 으로 저장돼 있음)
+    """
+    if os.path.isdir(name):
+        model_dir = name
+    else:
+        from faster_whisper.utils import download_model
+        model_dir = download_model(name, local_files_only=True)  # 방금 로드했으므로 캐시에 있음
+    disk_bytes = os.path.getsize(os.path.join(model_dir, "model.bin"))
+    weight_bytes = _CT2_WEIGHT_BYTES.get(compute_type.split("_")[0])
+    if weight_bytes is None:  # "default" / "auto" 는 저장된 타입 그대로 올라간다
+        return disk_bytes, "disk"
+    return disk_bytes * weight_bytes // 2, "disk_estimate"
+
+
+def _describe_bytes(entry) -> str:
+    if entry["bytes"] is None:
+        return "메모리 unmeasured"
+    approx = "약 " if entry["bytes_source"] == "disk_estimate" else ""
+    return f"메모리 {approx}{entry['bytes'] / 1e6:.0f}MB"
+
+
+class ASRModelRegistry:
+    def __init__(self, idle_evict_sec=ASR_MODEL_IDLE_EVICT_SEC):
+        self.idle_evict_sec = idle_evict_sec
+        self._loaders = {
+            "whisper_timestamped": _load_whisper_timestamped,
+            "faster_whisper": _load_faster_whisper,
+        }
+        # 모델 크기 측정: sizer(model, name, compute_type) → (바이트, 측정 방법)
+        self._sizers = {
+            "whisper_timestamped": _torch_model_bytes,
+            "faster_whisper": _ctranslate2_model_bytes,
+        }
+        self._entries = {}  # key → {"model", "bytes", "bytes_source", "load_sec", "uses", "last_used", "in_use", "lock"}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._evictor = None  # idle_evict_sec 가 있으면 첫 로드 때 띄우는 내림 스레드
+        self._closed = threading.Event()
+
+    def register_loader(self, backend, loader, sizer=None):
+        """
+        loader(name, device, compute_type) → 모델 객체
+        sizer(model, name, compute_type) → (바이트, 측정 방법), 없으면 메모리는 "unmeasured" 로 기록
+        """
+        self._loaders[backend] = loader
+        if sizer is not None:
+            self._sizers[backend] = sizer
+        else:
+            self._sizers.pop(backend, None)
+
+    def _measure(self, backend, model, name, compute_type):
+        """
+        (바이트, 측정 방법) — 잴 수 없으면 (None, "unmeasured")
+        """
+        sizer = self._sizers.get(backend)
+        if sizer is None:
+            return None, "unmeasured"
+        try:
+            return sizer(model, name, compute_type)
+        except Exception as e:
+            print(f"⚠️ ASR 모델 메모리 측정 실패 ({backend}/{name}): {type(e).__name__}: {e}")
+            return None, "unmeasured"
+
+    @staticmethod
+    def make_key(name=ASR_MODEL_NAME, device=ASR_DEVICE, compute_type=ASR_COMPUTE_TYPE, backend=ASR_BACKEND):
+        device = device or default_device()
+        return (backend, name, device, compute_type or default_compute_type(backend, device))
+
+    def _entry(self, key) -> dict:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:  # 같은 키는 한 번만 로드, 다른 키는 동시에 로드 가능
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            backend, name, device, compute_type = key
+            if backend not in self._loaders:
+                raise ValueError(f"알 수 없는 ASR backend: {backend}")
+            print(f"🎙️ ASR 모델 로드: {backend}/{name} ({device}, {compute_type})")
+            t0 = time.time()
+            model = self._loaders[backend](name, device, compute_type)
+            load_sec = time.time() - t0
+            model_bytes, bytes_source = self._measure(backend, model, name, compute_type)
+            entry = {
+                "model": model,
+                "bytes": model_bytes,
+                "bytes_source": bytes_source,
+                "load_sec": load_sec,
+                "uses": 0,
+                "last_used": time.time(),
+                "in_use": 0,
+                "lock": threading.RLock(),  # 같은 스레드 안의 중첩 use() 허용 (스트리밍 generator 가 잡은 채로 재디코딩)
+            }
+            with self._lock:
+                self._entries[key] = entry
+            self._start_evictor()
+            print(f"✅ ASR 모델 로드 완료: {name} ({load_sec:.2f}초, {_describe_bytes(entry)})")
+            return entry
+
+    def get(self, name=ASR_MODEL_NAME, device=ASR_DEVICE, compute_type=ASR_COMPUTE_TYPE, backend=ASR_BACKEND):
+        """
+        모델 객체를 반환 (없으면 로드). 동시에 같은 모델로 추론할 수 있으면 use() 대신 써도 된다.
+        """
+        self.evict_idle()
+        entry = self._claim(self.make_key(name, device, compute_type, backend), hold=False)
+        return entry["model"]
+
+    def _claim(self, key, hold) -> dict:
+        """
+        살아 있는 entry 를 찾아(없으면 로드) 사용 기록을 남긴다. hold 면 in_use 를 올려 내림 대상에서 뺀다.
+        찾은 직후 내림 스레드가 지웠으면 다시 로드한다 (지워진 entry 를 쓰면 메모리 집계에서 빠진 채 남음)
+        """
+        while True:
+            entry = self._entry(key)
+            with self._lock:
+                if self._entries.get(key) is not entry:
+                    continue
+                if hold:
+                    entry["in_use"] += 1
+                else:
+                    entry["uses"] += 1
+                entry["last_used"] = time.time()
+                return entry
+
+    @contextmanager
+    def use(self, name=ASR_MODEL_NAME, device=ASR_DEVICE, compute_type=ASR_COMPUTE_TYPE, backend=ASR_BACKEND):
+        """
+        with registry.use() as model: ... — 쓰는 동안 같은 모델을 독점하고 삭제되지 않게 잡아둔다
+        독점은 스레드 단위: 같은 스레드에서는 다시 use() 할 수 있다 (segment 를 yield 하는 동안 모델을 잡고 있는
+        iter_segments 의 소비자가 같은 모델로 재디코딩하는 경우, 일반 Lock 이면 그 자리에서 멈춘다)
+        """
+        self.evict_idle()
+        entry = self._claim(self.make_key(name, device, compute_type, backend), hold=True)
+        try:
+            with entry["lock"]:
+                with self._lock:
+                    entry["uses"] += 1
+                yield entry["model"]
+        finally:
+            with self._lock:
+                entry["in_use"] -= 1
+                entry["last_used"] = time.time()
+
+    def preload(self, specs=None):
+        """
+        specs: [(name, device, compute_type, backend), ...] (없으면 config 기본 모델 하나)
+        """
+        specs = specs or [(ASR_MODEL_NAME, ASR_DEVICE, ASR_COMPUTE_TYPE, ASR_BACKEND)]
+        for spec in specs:
+            self._entry(self.make_key(*spec))
+
+    def evict(self, key, idle_sec=None) -> bool:
+        """
+        모델을 내린다 (쓰는 중이면 그대로 둠). idle_sec 를 주면 그만큼 안 쓴 경우에만 내린다.
+        같은 키를 로드 중이면 기다리지 않고 넘어간다 (키별 lock)
+        """
+        with self._lock:
+            key_lock = self._key_locks.get(key)
+        if key_lock is not None and not key_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None or entry["in_use"]:
+                    return False
+                if idle_sec is not None and time.time() - entry["last_used"] <= idle_sec:
+                    return False  # 목록을 만든 뒤 다시 쓰였음
+                del self._entries[key]
+        finally:
+            if key_lock is not None:
+                key_lock.release()
+        print(f"🗑️ ASR 모델 내림: {key[0]}/{key[1]} ({key[2]}, {key[3]}, {_describe_bytes(entry)})")
+        if key[2].startswith("cuda"):
+            import torch
+            torch.cuda.empty_cache()
+        return True
+
+    def evict_idle(self):
+        if self.idle_evict_sec is None:
+            return
+        now = time.time()
+        with self._lock:
+            idle = [
+                key for key, entry in self._entries.items()
+                if not entry["in_use"] and now - entry["last_used"] > self.idle_evict_sec
+            ]
+        for key in idle:
+            self.evict(key, idle_sec=self.idle_evict_sec)
+
+    def _start_evictor(self):
+        """
+        idle_evict_sec 가 있으면 주기적으로 evict_idle 을 도는 daemon 스레드를 한 번 띄운다
+        (요청이 없어도 안 쓰는 모델이 ASR_MODEL_IDLE_EVICT_SEC 뒤에 내려가도록)
+        """
+        if self.idle_evict_sec is None:
+            return
+        with self._lock:
+            if self._evictor is not None or self._closed.is_set():
+                return
+            self._evictor = threading.Thread(target=self._evict_loop, name="asr-model-evictor", daemon=True)
+            self._evictor.start()
+
+    def _evict_loop(self):
+        interval = max(0.05, self.idle_evict_sec / 4)  # 안 쓴 지 idle_evict_sec ~ 1.25배 사이에 내려감
+        while not self._closed.wait(interval):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"⚠️ ASR 모델 내림 실패: {type(e).__name__}: {e}")
+
+    def close(self):
+        """
+        내림 스레드 종료 (로드된 모델은 그대로)
+        """
+        self._closed.set()
+        evictor = self._evictor
+        if evictor is not None:
+            evictor.join()
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            models = [
+                {
+                    "key": "/".join(str(k) for k in key),
+                    "bytes": entry["bytes"],
+                    "bytes_source": entry["bytes_source"],
+                    "load_sec": round(entry["load_sec"], 2),
+                    "uses": entry["uses"],
+                    "in_use": entry["in_use"],
+                    "idle_sec": round(now - entry["last_used"], 1),
+                }
+                for key, entry in self._entries.items()
+            ]
+        return {
+            "models": models,
+            "total_bytes": sum(m["bytes"] or 0 for m in models),
+            "unmeasured": [m["key"] for m in models if m["bytes"] is None],  # total_bytes 에 빠진 모델
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_asr_registry() -> ASRModelRegistry:
+    """
+    프로세스 전역 ASRModelRegistry 인스턴스
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ASRModelRegistry()
+        return _registry
+
+
+def preload_asr_models():
+    """
+    서버 시작 시 호출: ASR_PRELOAD 면 기본 모델을 미리 로드
+    """
+    if ASR_PRELOAD:
+        get_asr_registry().preload()
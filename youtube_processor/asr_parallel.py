@@ -0,0 +1,206 @@
+"""
+무음 기준으로 나눈 조각을 프로세스 여러 개로 동시에 전사
+
+- vad.detect_speech_regions 로 찾은 음성 구간을 ASR_CHUNK_MAX_SEC 까지 묶어 조각을 만든다 (무음에서만 자름)
+- 워커 풀은 프로세스 전역으로 한 번 띄워 두고 작업 간에 재사용 (워커마다 ASR 모델을 한 번 로드하고
+  스레드 수를 고정, 기본: 코어 수 / 워커 수)
+- 16k mono 오디오는 공유 raw 파일을 memmap 으로 같이 읽는다 (프로세스 간에는 조각 범위만 전달)
+- 조각별 결과의 segment/word 시간을 원본 기준으로 옮기고 id 를 다시 매겨
+  한 번에 전사한 것과 같은 모양의 결과로 합친다
+"""
+
+import atexit
+import os
+import threading
+import time
+
+import numpy as np
+
+from audio_store import get_audio_store, shared_raw_file
+from config import ASR_BACKEND, ASR_PARALLEL_WORKERS, ASR_THREADS_PER_WORKER, ASR_CHUNK_MAX_SEC
+
+ASR_SR = 16000
+
+
+def plan_chunks(regions, max_sec=ASR_CHUNK_MAX_SEC) -> list:
+    """
+    음성 구간 [(start, end), ...] 을 max_sec 이하 조각으로 묶는다 (구간 하나가 더 길면 그대로 한 조각)
+    """
+    chunks = []
+    for start, end in regions:
+        if chunks and end - chunks[-1][0] <= max_sec:
+            chunks[-1][1] = end
+        else:
+            chunks.append([start, end])
+    return [tuple(c) for c in chunks]
+
+
+def quiet_cut(audio, sr, lo, hi, frame_sec=0.03) -> int:
+    """
+    audio[lo:hi] 안에서 가장 조용한 프레임(frame_sec 길이, RMS 기준)의 가운데 위치를 반환
+    (길이 제한으로 조각을 잘라야 할 때 단어 중간이 아닌 곳에서 자르기 위함)
+    """
+    frame = max(1, int(frame_sec * sr))
+    lo, hi = max(0, int(lo)), min(len(audio), int(hi))
+    if hi - lo < frame:
+        return hi
+    n = (hi - lo) // frame
+    frames = np.asarray(audio[lo:lo + n * frame], dtype=np.float32).reshape(n, frame)
+    quietest = int(np.argmin(np.square(frames).mean(axis=1)))
+    return lo + quietest * frame + frame // 2
+
+
+def shift_result(result: dict, offset_sec: float) -> dict:
+    """
+    조각 기준 시간을 원본 기준으로 옮긴다 (segment/word start, end, seek)
+    """
+    for seg in result.get("segments", []):
+        seg["start"] = float(seg["start"]) + offset_sec
+        seg["end"] = float(seg["end"]) + offset_sec
+        if "seek" in seg:
+            seg["seek"] = int(seg["seek"]) + int(round(offset_sec * 100))  # whisper seek: mel 프레임(10ms) 단위
+        for word in seg.get("words", []) or []:
+            word["start"] = float(word["start"]) + offset_sec
+            word["end"] = float(word["end"]) + offset_sec
+    return result
+
+
+def merge_results(results: list) -> dict:
+    """
+    시간순 조각 결과를 하나의 whisper 결과로 합치고 segment id 를 0부터 다시 매긴다
+    """
+    segments = []
+    for result in results:
+        segments.extend(result.get("segments", []))
+    for i, seg in enumerate(segments):
+        seg["id"] = i
+    language = next((r.get("language") for r in results if r.get("language")), None)
+    return {"text": "".join(seg.get("text", "") for seg in segments), "segments": segments, "language": language}
+
+
+_backend = None
+
+
+def _init_worker(backend_name, threads):
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+
+    from asr_backends import get_asr_backend
+    from asr_models import get_asr_registry
+
+    global _backend
+    _backend = get_asr_backend(backend_name)
+    backend, name, device, compute_type = _backend.key
+    get_asr_registry().preload([(name, device, compute_type, backend)])  # 워커당 한 번 로드
+
+
+def _worker_ready(_=None):
+    return _backend is not None
+
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def get_asr_pool(backend_name, workers, threads):
+    """
+    병렬 전사용 프로세스 전역 워커 풀 (처음 요청 때 띄우고 이후 작업은 재사용, 워커당 모델 로드는 한 번)
+    설정(엔진/워커 수/스레드 수)이 바뀌면 이전 풀을 닫고 새로 띄운다.
+    반환: (pool, 이번 호출의 풀 기동 시간(초))
+    """
+    import multiprocessing
+
+    global _pool, _pool_key
+    key = (backend_name, workers, threads)
+    with _pool_lock:
+        if _pool is not None and _pool_key == key:
+            return _pool, 0.0
+        _close_pool()
+        t0 = time.time()
+        # torch 는 fork 이후 스레드 풀이 꼬일 수 있어 spawn 사용
+        ctx = multiprocessing.get_context("spawn")
+        pool = ctx.Pool(workers, initializer=_init_worker, initargs=(backend_name, threads))
+        try:
+            pool.map(_worker_ready, range(workers), chunksize=1)  # 워커 기동(모델 로드)을 여기서 기다림
+        except BaseException:
+            pool.terminate()
+            raise
+        _pool, _pool_key = pool, key
+        setup_sec = time.time() - t0
+        print(f"🧠 병렬 전사 워커 풀 기동: 워커 {workers}개 x 스레드 {threads} ({setup_sec:.2f}초)")
+        return pool, setup_sec
+
+
+def _close_pool():
+    global _pool, _pool_key
+    if _pool is not None:
+        _pool.close()
+        _pool.join()
+    _pool, _pool_key = None, None
+
+
+def shutdown_asr_pool():
+    """
+    병렬 전사 워커 풀 종료 (프로세스 종료 시 자동 호출)
+    """
+    with _pool_lock:
+        _close_pool()
+
+
+atexit.register(shutdown_asr_pool)
+
+
+def _transcribe_chunk(task):
+    raw_file, n_frames, start, end, options = task
+    audio = np.memmap(raw_file, dtype=np.float32, mode="r", shape=(n_frames,))
+    result = _backend.transcribe(np.array(audio[start:end]), **options)
+    return shift_result(result, start / ASR_SR)
+
+
+def transcribe_chunked(audio_path, workers=ASR_PARALLEL_WORKERS, threads_per_worker=ASR_THREADS_PER_WORKER,
+                       backend_name=ASR_BACKEND, **options) -> dict:
+    """
+    audio_path 를 무음 기준 조각으로 나눠 병렬 전사. options 는 whisper transcribe 옵션 그대로.
+    워커 풀은 조각 수와 관계없이 workers 개로 띄워 다음 작업에서도 그대로 재사용한다.
+    """
+    results = list(iter_transcribe_chunked(audio_path, workers, threads_per_worker, backend_name, **options))
+    if not results:
+        return {"text": "", "segments": [], "language": options.get("language")}
+    return merge_results(results)
+
+
+def iter_transcribe_chunked(audio_path, workers=ASR_PARALLEL_WORKERS, threads_per_worker=ASR_THREADS_PER_WORKER,
+                            backend_name=ASR_BACKEND, **options):
+    """
+    transcribe_chunked 의 스트리밍 버전: 조각별 결과(시간은 원본 기준)를 원본 순서대로,
+    앞 조각이 끝나는 대로 yield (뒤 조각들은 그동안 다른 워커에서 계속 전사됨)
+    """
+    from vad import detect_speech_regions
+
+    t0 = time.time()
+    audio = get_audio_store(audio_path).get(sr=ASR_SR, channels=1)
+    chunks = plan_chunks(detect_speech_regions(audio_path))
+    if not chunks:
+        print("📝 병렬 전사: 음성 구간 없음")
+        return
+
+    workers = max(1, int(workers or 1))
+    threads = int(threads_per_worker or max(1, (os.cpu_count() or 1) // workers))
+    pool, setup_sec = get_asr_pool(backend_name, workers, threads)
+    raw_file, tmp_file = shared_raw_file(audio)
+    tasks = [
+        (raw_file, len(audio), int(start * ASR_SR), min(len(audio), int(end * ASR_SR)), options)
+        for start, end in chunks
+    ]
+    try:
+        yield from pool.imap(_transcribe_chunk, tasks, chunksize=1)
+    finally:
+        if tmp_file is not None:
+            os.remove(tmp_file)
+
+    speech_sec = sum(end - start for start, end in chunks)
+    print(f"🕒 병렬 전사: 조각 {len(chunks)}개 ({speech_sec:.0f}초), 워커 {workers}개 x 스레드 {threads}, "
+          f"{time.time() - t0:.2f}초 (풀 기동 {setup_sec:.2f}초 포함)")
@@ -0,0 +1,316 @@
+"""
+작업 단위 공유 오디오 저장소
+
+vocals.wav 하나를 Whisper, MFA export, 음성 화자분리, pyannote, MFCC, 피치 분석이
+각자 다시 디코딩/리샘플링하던 것을 한 번만 디코딩해서 공유한다.
+
+- 원본은 ffmpeg 로 한 번만 디코딩해서 float32 raw 파일로 저장 → np.memmap 으로 읽기
+- 16k mono, 22.05k mono 같은 파생 버전은 처음 요청될 때 raw PCM 에서 만들어 같은 방식으로 보관
+- 각 단계는 같은 memmap 을 복사 없이 읽는다 (mode='c': 쓰기가 필요하면 그 페이지만 복사)
+- memmap 은 디스크 기반이라 긴 소스도 필요한 부분만 페이지로 올라온다 (처리는 AUDIO_MEMORY_LIMIT_MB 크기 청크로)
+- 디코딩/리샘플링에 든 시간과 재사용 횟수로 절약된 시간을 집계
+
+사용법:
+    store = get_audio_store(vocal_path)
+    y16k = store.get(sr=16000, channels=1)      # shape (frames,)
+    native = store.get()                        # shape (frames, channels), 원본 샘플레이트
+    ...
+    release_audio_stores()                      # 작업이 끝나면 임시 파일 정리
+
+서버처럼 여러 작업이 한 프로세스에서 동시에 돌 때는 작업 단위로 연 저장소만 정리한다:
+    job = begin_audio_store_job()
+    try: ... get_audio_store(...) ...
+    finally: release_audio_stores(job)
+"""
+
+import contextvars
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from config import FFMPEG_PATH, FFPROBE_PATH, AUDIO_MEMORY_LIMIT_MB
+
+
+def probe_audio_format(path):
+    """
+    첫 번째 오디오 스트림의 (샘플레이트, 채널 수)
+    """
+    cmd = [
+        FFPROBE_PATH, "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=sample_rate,channels",
+        "-of", "default=noprint_wrappers=1",
+        str(path),
+    ]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    fields = dict(line.split("=", 1) for line in result.stdout.split() if "=" in line)
+    return int(fields["sample_rate"]), int(fields["channels"])
+
+
+def chunk_frames_for(bytes_per_frame, limit_mb=AUDIO_MEMORY_LIMIT_MB, minimum=4096):
+    """
+    프레임당 작업 메모리(bytes_per_frame)로 AUDIO_MEMORY_LIMIT_MB 안에 들어가는 청크 프레임 수
+    """
+    return max(minimum, int(limit_mb * 1024 * 1024 // max(1, bytes_per_frame)))
+
+
+def _pcm16(chunk):
+    # ffmpeg 의 s16 → float 변환(/32768)과 대칭이 되도록 변환 (16bit 원본이면 비트 단위로 같음)
+    return np.clip(np.rint(chunk * 32768.0), -32768, 32767).astype("<i2").tobytes()
+
+
+def write_wav(path, data, sr, chunk_frames=None):
+    """
+    float32 배열(frames,) 또는 (frames, channels)을 16bit PCM WAV 로 저장 (청크 단위 변환)
+    """
+    return write_wav_ranges(path, data, sr, [(0, len(data))], chunk_frames)
+
+
+def write_wav_ranges(path, data, sr, ranges, chunk_frames=None):
+    """
+    data 의 여러 (start_frame, end_frame) 구간을 순서대로 이어붙여 16bit PCM WAV 하나로 저장.
+    이어붙인 버퍼를 만들지 않고 구간별로 청크 단위로 바로 써서 메모리 사용이 청크 크기로 고정된다.
+    """
+    data = np.asarray(data)
+    channels = 1 if data.ndim == 1 else data.shape[1]
+    with WavStreamWriter(path, sr, channels, chunk_frames) as writer:
+        for start, end in ranges:
+            start = max(0, int(start))
+            end = min(data.shape[0], int(end))
+            if end > start:
+                writer.write(data[start:end])
+    return str(path)
+
+
+class WavStreamWriter:
+    """
+    16bit PCM WAV 를 조각 단위로 이어 쓰는 writer (전체 길이를 미리 몰라도 된다)
+    """
+
+    def __init__(self, path, sr, channels, chunk_frames=None):
+        self.path = str(path)
+        # float32 임시 배열 몇 개 + int16 + bytes 정도가 채널당 프레임마다 잡힌다
+        self.chunk_frames = chunk_frames or chunk_frames_for(16 * channels)
+        self._wf = wave.open(self.path, "wb")
+        self._wf.setnchannels(channels)
+        self._wf.setsampwidth(2)
+        self._wf.setframerate(int(sr))
+
+    def write(self, data):
+        data = np.asarray(data)
+        for i in range(0, data.shape[0], self.chunk_frames):
+            self._wf.writeframes(_pcm16(data[i:i + self.chunk_frames]))
+
+    def close(self):
+        if self._wf is not None:
+            self._wf.close()
+            self._wf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def shared_raw_file(arr):
+    """
+    다른 프로세스가 np.memmap 으로 같이 읽을 raw float32 파일 경로.
+    이미 파일 전체를 가리키는 memmap(저장소 배열)이면 그 파일을 그대로 쓰고, 아니면 임시 파일로 저장한다.
+    (memmap 을 행 단위로 자른 배열도 filename 을 그대로 갖고 있으므로 크기가 파일 전체와 같은지까지 확인)
+    반환: (raw_file, 다 쓰고 지워야 할 임시 파일 또는 None)
+    """
+    filename = getattr(arr, "filename", None)
+    if (filename and getattr(arr, "offset", 0) == 0 and arr.flags["C_CONTIGUOUS"] and arr.dtype == np.float32
+            and os.path.exists(filename) and os.path.getsize(filename) == arr.nbytes):
+        return filename, None
+    fd, tmp_path = tempfile.mkstemp(suffix=".f32", prefix="shared_pcm_")
+    with os.fdopen(fd, "wb") as f:
+        np.ascontiguousarray(arr, dtype=np.float32).tofile(f)
+    return tmp_path, tmp_path
+
+
+def trim_audio(src_path, dest_path, start, end, codec="pcm_s16le"):
+    """
+    src_path 의 start~end(초) 구간만 무손실 PCM WAV 로 저장.
+    ffmpeg 입력 탐색(-ss 를 -i 앞에)으로 구간 근처부터 읽기 시작하므로
+    전체 디코딩/재인코딩 없이 비용이 잘라낸 구간 길이에 비례한다.
+    """
+    start = max(0.0, float(start))
+    length = float(end) - start
+    if length <= 0:
+        raise ValueError(f"잘라낼 구간이 비어 있습니다: {start}~{end}")
+    Path(dest_path).parent.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        FFMPEG_PATH, "-y", "-loglevel", "error",
+        "-ss", f"{start:.3f}",
+        "-t", f"{length:.3f}",
+        "-i", str(src_path),
+        "-map", "0:a:0", "-vn",
+        "-acodec", codec,
+        str(dest_path),
+    ]
+    subprocess.run(cmd, check=True)
+    return str(dest_path)
+
+
+class AudioStore:
+    def __init__(self, path):
+        self.path = str(path)
+        self.native_sr, self.native_channels = probe_audio_format(self.path)
+        self.work_dir = Path(tempfile.mkdtemp(prefix="audio_store_"))
+        self._variants = {}   # (sr, channels) → {"file", "array", "build_sec", "reuses"}
+        self._lock = threading.Lock()
+
+    def _raw_path(self, sr, channels) -> Path:
+        return self.work_dir / f"{sr}_{channels}.f32"
+
+    def _build(self, sr, channels):
+        """
+        (sr, channels) 버전을 raw float32 파일로 만든다.
+        원본 버전은 소스를 디코딩하고, 파생 버전은 원본 raw PCM 을 리샘플링한다 (재디코딩 없음).
+        """
+        out = self._raw_path(sr, channels)
+        if (sr, channels) == (self.native_sr, self.native_channels):
+            src_args = ["-i", self.path]
+        else:
+            native_file = self._ensure(self.native_sr, self.native_channels)["file"]
+            src_args = [
+                "-f", "f32le", "-ar", str(self.native_sr), "-ac", str(self.native_channels),
+                "-i", str(native_file),
+            ]
+        cmd = [
+            FFMPEG_PATH, "-y", "-loglevel", "error",
+            *src_args,
+            "-map", "0:a:0",
+            "-ar", str(sr), "-ac", str(channels),
+            "-f", "f32le", "-acodec", "pcm_f32le",
+            str(out),
+        ]
+        subprocess.run(cmd, check=True)
+        return out
+
+    def _ensure(self, sr, channels) -> dict:
+        key = (sr, channels)
+        variant = self._variants.get(key)
+        if variant is not None:
+            return variant
+        t0 = time.time()
+        raw_file = self._build(sr, channels)
+        build_sec = time.time() - t0
+        n_frames = os.path.getsize(raw_file) // (4 * channels)
+        shape = (n_frames,) if channels == 1 else (n_frames, channels)
+        # mode='c': 읽기는 파일 그대로, 쓰기가 필요한 소비자는 해당 페이지만 복사 (원본 불변)
+        array = np.memmap(raw_file, dtype=np.float32, mode="c", shape=shape) if n_frames else np.zeros(shape, np.float32)
+        variant = {"file": raw_file, "array": array, "build_sec": build_sec, "reuses": 0}
+        self._variants[key] = variant
+        kind = "디코딩" if key == (self.native_sr, self.native_channels) else "리샘플링"
+        print(f"🎼 오디오 {kind}: {Path(self.path).name} → {sr}Hz/{channels}ch ({build_sec:.2f}초)")
+        return variant
+
+    def get(self, sr=None, channels=None) -> np.ndarray:
+        """
+        sr/channels 버전의 float32 배열 (None 이면 원본 값). mono 면 (frames,), 아니면 (frames, channels)
+        """
+        sr = int(sr or self.native_sr)
+        channels = int(channels or self.native_channels)
+        with self._lock:
+            existed = (sr, channels) in self._variants
+            variant = self._ensure(sr, channels)
+            if existed:
+                variant["reuses"] += 1
+            return variant["array"]
+
+    def duration(self) -> float:
+        return len(self.get(16000, 1)) / 16000.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            variants = {
+                f"{sr}Hz/{ch}ch": {"build_sec": round(v["build_sec"], 2), "reuses": v["reuses"]}
+                for (sr, ch), v in self._variants.items()
+            }
+            saved = sum(v["build_sec"] * v["reuses"] for v in self._variants.values())
+        return {"path": self.path, "variants": variants, "saved_sec": round(saved, 2)}
+
+    def close(self):
+        with self._lock:
+            self._variants.clear()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+_stores = {}
+_store_owners = {}  # key → 이 저장소를 연 작업 수
+_stores_lock = threading.Lock()
+_job_keys = contextvars.ContextVar("audio_store_job_keys", default=None)
+
+
+def _store_key(path):
+    # 같은 경로에 파일이 새로 쓰이면(다른 작업의 vocals.wav) 다른 저장소로 취급
+    st = os.stat(path)
+    return (os.path.realpath(path), st.st_mtime_ns, st.st_size)
+
+
+def get_audio_store(path) -> AudioStore:
+    """
+    path 에 대한 공유 AudioStore (없으면 생성). 같은 파일이면 모든 단계가 같은 인스턴스를 쓴다.
+    """
+    key = _store_key(path)
+    job_keys = _job_keys.get()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = AudioStore(path)
+            _stores[key] = store
+        if job_keys is not None and key not in job_keys:
+            job_keys.add(key)
+            _store_owners[key] = _store_owners.get(key, 0) + 1
+        return store
+
+
+def begin_audio_store_job():
+    """
+    작업 시작 시 호출: 이후 이 작업(같은 스레드/context)에서 연 저장소를 기록한다.
+    반환값을 release_audio_stores(job) 에 넘기면 그 저장소만 정리된다.
+    """
+    keys = set()
+    return keys, _job_keys.set(keys)
+
+
+def release_audio_stores(job=None):
+    """
+    작업 종료 시 호출: 디코딩 통계를 출력하고 임시 raw 파일을 정리한다.
+    job 을 주면 그 작업이 연 저장소만 (다른 작업도 쓰고 있으면 남겨 둠), 없으면 프로세스의 모든 저장소.
+    """
+    with _stores_lock:
+        if job is None:
+            stores = list(_stores.values())
+            _stores.clear()
+            _store_owners.clear()
+        else:
+            keys, token = job
+            stores = []
+            for key in keys:
+                owners = _store_owners.get(key, 0) - 1
+                if owners > 0:
+                    _store_owners[key] = owners
+                    continue
+                _store_owners.pop(key, None)
+                if key in _stores:
+                    stores.append(_stores.pop(key))
+    if job is not None:
+        try:
+            _job_keys.reset(job[1])
+        except ValueError:
+            pass  # 다른 context 에서 정리하는 경우 (기록은 이미 끝남)
+    for store in stores:
+        stats = store.stats()
+        print(f"📊 오디오 저장소 {Path(stats['path']).name}: {stats['variants']}, 절약 약 {stats['saved_sec']:.2f}초")
+        store.close()
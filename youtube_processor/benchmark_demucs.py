@@ -0,0 +1,68 @@
+"""
+Demucs 병렬 분리 벤치마크
+
+같은 입력을 워커 수를 바꿔가며 분리해서 1개 대비 속도 향상(speedup)과 코어 효율을 출력한다.
+워커 풀 기동(워커별 모델 로드)은 따로 재고, 속도 비교는 이미 떠 있는 풀에서의 분리 시간만 쓴다.
+
+사용법:
+    python benchmark_demucs.py downloads/sample.mp3 --workers 1,2,4,8,16,32 --seconds 600
+"""
+
+import argparse
+import os
+import time
+
+from audio_store import get_audio_store, release_audio_stores
+from demucs_wrapper import get_separator, get_shard_pool, shutdown_shard_pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Demucs 병렬 분리 워커 수별 소요 시간 측정")
+    parser.add_argument("audio_path", help="분리할 오디오 파일")
+    parser.add_argument("--workers", default="1,2,4,8", help="측정할 워커 수 목록 (쉼표 구분)")
+    parser.add_argument("--threads", type=int, default=None, help="워커당 torch 스레드 수 (기본: 코어 수 / 워커 수)")
+    parser.add_argument("--seconds", type=float, default=None, help="앞에서부터 이 길이만 사용 (초)")
+    parser.add_argument("--repeat", type=int, default=1, help="워커 수마다 반복 횟수 (가장 빠른 값 사용)")
+    args = parser.parse_args()
+
+    separator = get_separator()
+    separator.load()
+    sr = separator.model.samplerate
+    audio = get_audio_store(args.audio_path).get(sr=sr, channels=separator.model.audio_channels)
+    if args.seconds is not None:
+        audio = audio[:int(args.seconds * sr)]
+    duration = len(audio) / sr
+    print(f"🎧 입력: {args.audio_path} ({duration:.1f}초), 코어 {os.cpu_count()}개")
+
+    rows = []
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        parallel = not (workers == 1 and args.threads is None)
+        setup = 0.0
+        if parallel:
+            threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+            _, _, setup = get_shard_pool(separator.model_name, separator.device, workers, threads)
+        best = None
+        for _ in range(max(1, args.repeat)):
+            t0 = time.time()
+            if not parallel:
+                separator.separate(audio, sr=sr)
+            else:
+                separator.separate_parallel(audio, sr=sr, workers=workers, threads_per_worker=args.threads)
+            elapsed = time.time() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        rows.append((workers, best, setup))
+        print(f"⏱️ 워커 {workers}개: {best:.2f}초 (실시간 대비 x{duration / best:.2f}), 풀 기동 {setup:.2f}초")
+
+    base = rows[0][1] if rows else None
+    print("\n workers |   sec   | speedup | efficiency | pool setup")
+    print("---------+---------+---------+------------+-----------")
+    for workers, elapsed, setup in rows:
+        speedup = base / elapsed
+        print(f" {workers:7d} | {elapsed:7.2f} | {speedup:7.2f} | {speedup / workers * rows[0][0]:10.0%} | {setup:9.2f}")
+
+    shutdown_shard_pool()
+    release_audio_stores()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,85 @@
 from pathlib import Path
 
 FFMPEG_PATH = r"C:\ffmpeg-7.1.1-full_build\bin\ffmpeg.exe"  # macOS Homebrew 경로
+FFPROBE_PATH = r"C:\ffmpeg-7.1.1-full_build\bin\ffprobe.exe"  # 다운로드 결과 검증용
 FPS = 2.0  # 초당 추출할 프레임 수
 DOWNLOAD_DIR = Path('downloads')
 PITCH_DATA_DIR = Path('pitch_data')  # 피치 데이터 저장 디렉토리
 PITCH_REFERENCE_DIR = PITCH_DATA_DIR / 'reference'  # 기준 음성 피치
 TOKEN_DATA_DIR = Path('token_data')  # 토큰 저장 디렉토리
+CLIP_MARGIN_SEC = 2.0  # start/end 구간 다운로드 시 앞뒤로 더 받을 여유 구간 (초)
+MEDIA_CACHE_DIR = Path(__file__).parent / 'media_cache'  # 다운로드 미디어 캐시 (reset_folder 대상 아님)
+MEDIA_CACHE_MAX_BYTES = 20 * 1024 ** 3  # 캐시 용량 상한 (넘으면 LRU 삭제)
+INFO_CACHE_TTL_SEC = 3 * 60 * 60  # yt-dlp 메타데이터 캐시 유효 시간 (스트림 URL 만료 전에 갱신)
+MEDIA_CACHE_VERIFY_HASH = True  # 캐시 파일 수정 시각이 저장 때와 다르면 sha256 으로 재확인 (False 면 크기만 확인)
+DOWNLOAD_DURATION_TOLERANCE_SEC = 1.5  # 받은 파일 길이가 예상보다 이만큼 이상 짧으면 잘린 것으로 보고 재시도
+MAX_SOURCE_DURATION_SEC = None  # 구간 지정 없이 받을 수 있는 최대 영상 길이 (None 이면 제한 없음)
+SERVER_INGEST_DIR = None  # HTTP 요청에서 받을 수 있는 로컬 파일 폴더 (None 이면 로컬 경로는 CLI 에서만 허용)
+SERVER_S3_BUCKETS = ()  # HTTP 요청에서 받을 수 있는 s3 버킷 (비어 있으면 s3:// 키는 CLI 에서만 허용)
+
+# 배치 다운로드 스케줄러
+DOWNLOAD_MAX_WORKERS = 4  # 동시에 다운로드할 최대 작업 수
+DOWNLOAD_PER_HOST_LIMIT = 2  # 같은 호스트(youtube.com 등)로의 동시 다운로드 수
+DOWNLOAD_RETRIES = 3  # 다운로드 실패 시 재시도 횟수
+DOWNLOAD_BACKOFF_SEC = 2.0  # 재시도 대기 시간 (시도마다 2배씩 증가)
+DOWNLOAD_PREFETCH_AHEAD = 4  # 현재 작업 이후 몇 개의 작업을 미리 받아 둘지
+
+# 얼굴 기반 화자분리용 저해상도 프록시 영상
+PROXY_MIN_HEIGHT = 360  # face_recognition 이 안정적으로 동작하는 최소 세로 해상도 (px)
+
+# 긴 오디오(영화 한 편 등) 처리 시 한 번에 메모리에 올리는 버퍼 상한
+# (WAV 쓰기, MFCC 추출 등 청크 단위 처리 크기를 이 값에 맞춘다)
+AUDIO_MEMORY_LIMIT_MB = 256
+
+# Demucs 보컬 분리
+DEMUCS_MODEL = "htdemucs"  # 사용할 사전학습 모델
+DEMUCS_DEVICE = None  # None 이면 CUDA 가 있으면 cuda, 없으면 cpu
+DEMUCS_IN_PROCESS = True  # False 면 예전처럼 demucs CLI 를 subprocess 로 실행
+DEMUCS_STREAMING = False  # True 면 겹치는 구간(window)으로 나눠 분리해 메모리를 window 크기로 고정 (ASR_STREAMING 이면 끝난 조각부터 바로 전사)
+DEMUCS_STREAM_WINDOW_SEC = 30.0  # 스트리밍 분리 한 번에 처리하는 길이 (AUDIO_MEMORY_LIMIT_MB 로도 제한됨)
+DEMUCS_STREAM_OVERLAP_SEC = 2.0  # 이웃 window 끼리 겹치는 길이 (이 구간을 crossfade 로 이어붙임)
+DEMUCS_WORKERS = 1  # 2 이상이면 긴 입력을 겹치는 구간으로 나눠 프로세스 여러 개로 병렬 분리
+DEMUCS_THREADS_PER_WORKER = None  # 병렬 분리 워커당 torch 스레드 수 (None 이면 코어 수 / 워커 수)
+
+# 배경음악이 거의 없는 소스는 Demucs 생략 (music_detector)
+MUSIC_BYPASS = True  # True 면 배경음악이 거의 없을 때 Demucs 생략
+MUSIC_BYPASS_LEVEL_DB = -30.0  # 지속 성분(반주/지속음) 세기가 말소리보다 이만큼(dB) 이상 작으면 생략 (-20dB 음악 ≈ -24dB, 깨끗한 음성 ≈ -57dB)
+MUSIC_DETECT_WINDOWS = 24  # 판단에 쓰는 구간 수 (파일 전체에 고르게 배치)
+MUSIC_DETECT_WINDOW_SEC = 5.0  # 구간 하나의 길이 (초)
+
+# 음성 구간 검출 (vad.py, webrtcvad)
+DEMUCS_VAD_GATE = False  # True 면 음성 구간(+pad)에서만 Demucs 실행, 나머지는 vocals 무음 / no_vocals 원본
+VAD_AGGRESSIVENESS = 2  # webrtcvad 민감도 0~3 (클수록 음성으로 보는 기준이 엄격)
+VAD_PAD_SEC = 0.5  # 음성 구간 앞뒤로 붙일 여유 (초)
+VAD_MIN_GAP_SEC = 1.0  # 이보다 짧은 무음은 음성 구간에 포함
+VAD_MIN_SPEECH_SEC = 0.2  # 이보다 짧은 음성 구간은 무시
+
+# ASR (Whisper) 모델 저장소 (asr_models.py)
+ASR_BACKEND = "whisper_timestamped"  # 추론 엔진: "whisper_timestamped"(PyTorch) 또는 "faster_whisper"(CTranslate2, CPU int8)
+ASR_MODEL_NAME = "base"  # Whisper 모델 크기
+ASR_DEVICE = None  # None 이면 CUDA 가 있으면 cuda, 없으면 cpu
+ASR_COMPUTE_TYPE = None  # None 이면 엔진/장치 기본값 (GPU: float16, CPU: whisper float32 / faster_whisper int8)
+ASR_CPU_THREADS = None  # faster_whisper CPU 추론 스레드 수 (None 이면 코어 수)
+ASR_PRELOAD = True  # 서버 시작 시 기본 모델을 미리 로드
+ASR_MODEL_IDLE_EVICT_SEC = None  # 이 시간(초) 동안 안 쓴 모델은 메모리에서 내림 (None 이면 유지)
+ASR_PARALLEL_WORKERS = 1  # 2 이상이면 vocals 를 무음 기준으로 나눠 프로세스 여러 개로 병렬 전사
+ASR_THREADS_PER_WORKER = None  # 병렬 전사 워커당 스레드 수 (None 이면 코어 수 / 워커 수)
+ASR_CHUNK_MAX_SEC = 60.0  # 병렬 전사 조각 최대 길이 (음성 구간을 이 길이까지 묶음, 무음에서만 자름)
+ASR_STREAMING = False  # True 면 main_pipeline 이 확정된 문장부터 받아 다음 단계를 전사와 겹쳐 진행
+ASR_TWO_PASS = False  # True 면 greedy 로 먼저 전사하고 신뢰도가 낮은 문장만 beam search 로 다시 디코딩
+ASR_ESCALATE_LOGPROB = -0.8  # 문장 avg_logprob 가 이보다 낮으면 재디코딩
+ASR_ESCALATE_COMPRESSION = 2.4  # 문장 compression_ratio 가 이보다 높으면(반복/환각 의심) 재디코딩
+ASR_ESCALATE_WORD_PROB = 0.5  # 문장 내 단어 확률 평균이 이보다 낮으면 재디코딩
+
+# MFA 정렬 상주 워커 (mfa_daemon.py / mfa_client.py)
+MFA_IMAGE = "mmcauliffe/montreal-forced-aligner:latest"
+MFA_DAEMON_ENABLED = True  # True 면 상주 컨테이너에 정렬 작업을 보냄 (실패하면 docker run 1회 실행으로 대체)
+MFA_DAEMON_HOST = "127.0.0.1"
+MFA_DAEMON_PORT = 8765
+MFA_DAEMON_CONTAINER = "mfa-aligner"  # 상주 컨테이너 이름
+MFA_DAEMON_AUTOSTART = True  # 워커가 떠 있지 않으면 컨테이너를 새로 띄움
+MFA_DAEMON_START_TIMEOUT = 180  # 컨테이너 기동 + 워커 준비(MFA import) 대기 시간(초)
+MFA_JOB_TIMEOUT = 1800  # 정렬 작업 하나의 최대 시간(초), 넘으면 상주 컨테이너/docker run 컨테이너를 지우고 실패 처리
 
 
 USER_UPLOADS_DIR = Path('user_uploads')  # 유저 음성 업로드 디렉토리
@@ -1,28 +1,618 @@
+import atexit
 import subprocess
 import time
 import os
 import sys
+import threading
 from pathlib import Path
 
-def separate_vocals(audio_path: str, output_root="separated") -> str:
-    
+import numpy as np
+
+from config import DEMUCS_MODEL, DEMUCS_DEVICE, DEMUCS_IN_PROCESS, DEMUCS_STREAMING, DEMUCS_STREAM_WINDOW_SEC, DEMUCS_STREAM_OVERLAP_SEC, DEMUCS_WORKERS, DEMUCS_THREADS_PER_WORKER, MUSIC_BYPASS, DEMUCS_VAD_GATE
+
+
+class DemucsSeparator:
+    """
+    프로세스 안에서 Demucs 모델을 한 번만 로드해 두고 재사용하는 보컬 분리기
+
+    - 입력: 오디오 파일 경로 또는 배열 ((frames,) / (frames, channels), float32)
+    - 출력: vocals / no_vocals 배열 ((frames, channels), 모델 샘플레이트), 필요하면 WAV 파일도 저장
+    - 호출마다 모델 로드 시간(처음 한 번만 발생)과 추론 시간을 따로 보고
+    """
+
+    def __init__(self, model_name=DEMUCS_MODEL, device=DEMUCS_DEVICE):
+        self.model_name = model_name
+        self.device = device
+        self.model = None
+        self._lock = threading.Lock()
+
+    def load(self) -> float:
+        """
+        모델을 로드하고 걸린 시간(초)을 반환 (이미 로드돼 있으면 0)
+        """
+        with self._lock:
+            if self.model is not None:
+                return 0.0
+            import torch
+            from demucs.pretrained import get_model
+
+            t0 = time.time()
+            if self.device is None:
+                self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            model = get_model(self.model_name)
+            model.to(self.device)
+            model.eval()
+            self.model = model
+            load_sec = time.time() - t0
+            print(f"🧠 Demucs 모델 로드 완료: {self.model_name} ({self.device}, {load_sec:.2f}초)")
+            return load_sec
+
+    @property
+    def samplerate(self) -> int:
+        self.load()
+        return self.model.samplerate
+
+    def _as_model_array(self, audio, sr, msr=None, mch=None) -> np.ndarray:
+        """
+        경로/배열 입력을 모델 샘플레이트·채널의 (frames, channels) float32 배열로 변환
+        (경로 입력은 공유 오디오 저장소의 memmap 이라 필요한 구간만 메모리에 올라온다)
+        msr, mch 를 주면 모델을 로드하지 않고 그 포맷으로 변환 (병렬 분리의 부모 프로세스)
+        """
+        from audio_store import get_audio_store
+
+        if msr is None:
+            msr, mch = self.model.samplerate, self.model.audio_channels
+        if isinstance(audio, (str, os.PathLike)):
+            # 공유 오디오 저장소에서 모델 포맷 버전으로 바로 받는다 (파일 디코딩은 한 번)
+            arr = get_audio_store(audio).get(sr=msr, channels=mch)
+        else:
+            if sr is None:
+                raise ValueError("배열 입력에는 sr 이 필요합니다.")
+            arr = np.asarray(audio, dtype=np.float32)
+            arr = arr[:, None] if arr.ndim == 1 else arr
+            if sr != msr or arr.shape[1] != mch:
+                import torch
+                from demucs.audio import convert_audio
+                wav = convert_audio(torch.from_numpy(np.ascontiguousarray(arr.T)), sr, msr, mch)
+                arr = wav.numpy().T
+        return arr[:, None] if arr.ndim == 1 else arr
+
+    @staticmethod
+    def _mix_stats(arr, chunk=1 << 20):
+        """
+        CLI 와 같은 정규화용 mono 평균/표준편차 (청크 단위로 누적해서 전체를 한 번에 올리지 않음)
+        """
+        total, total_sq, n = 0.0, 0.0, 0
+        for i in range(0, arr.shape[0], chunk):
+            ref = np.asarray(arr[i:i + chunk], dtype=np.float64).mean(axis=1)
+            total += ref.sum()
+            total_sq += np.square(ref).sum()
+            n += ref.size
+        if n == 0:
+            return 0.0, 1.0
+        mean = total / n
+        var = max(total_sq / n - mean * mean, 0.0) * n / max(n - 1, 1)  # torch.std 와 같은 불편 분산
+        return mean, float(np.sqrt(var))
+
+    def _separate_array(self, arr, mean, std):
+        """
+        (frames, channels) 배열 한 덩어리를 분리해서 (vocals, no_vocals) 를 같은 shape 의 배열로 반환
+        """
+        import torch
+        from demucs.apply import apply_model
+
+        wav = torch.from_numpy(np.ascontiguousarray(np.asarray(arr, dtype=np.float32).T))
+        wav = (wav - mean) / (std + 1e-8)
+        with torch.no_grad():
+            sources = apply_model(self.model, wav[None], device=self.device, split=True, overlap=0.25, progress=False)[0]
+        sources = sources * std + mean
+
+        vocals = sources[self.model.sources.index("vocals")]
+        no_vocals = sources.sum(0) - vocals  # --two-stems vocals 와 동일: 나머지 소스 합
+        return vocals.cpu().numpy().T, no_vocals.cpu().numpy().T
+
+    def separate(self, audio, sr=None, output_dir=None, name=None) -> dict:
+        """
+        보컬/배경음 분리
+
+        audio: 파일 경로 또는 배열, sr: 배열 입력의 샘플레이트
+        output_dir 를 주면 output_dir/<name>/vocals.wav, no_vocals.wav 도 저장 (CLI 와 같은 레이아웃)
+        반환: {"vocals", "no_vocals", "sr", "paths", "load_sec", "infer_sec"}
+        """
+        load_sec = self.load()
+
+        t0 = time.time()
+        arr = self._as_model_array(audio, sr)
+        mean, std = self._mix_stats(arr)
+        vocals, no_vocals = self._separate_array(arr, mean, std)
+        infer_sec = time.time() - t0
+
+        paths = self._save_outputs(audio, output_dir, name, vocals, no_vocals)
+
+        print(f"🕒 Demucs 분리: 모델 로드 {load_sec:.2f}초 / 추론 {infer_sec:.2f}초")
+        return {
+            "vocals": vocals,
+            "no_vocals": no_vocals,
+            "sr": self.model.samplerate,
+            "paths": paths,
+            "load_sec": load_sec,
+            "infer_sec": infer_sec,
+        }
+
+    def _save_outputs(self, audio, output_dir, name, vocals, no_vocals, samplerate=None) -> dict:
+        """
+        output_dir 가 있으면 vocals.wav / no_vocals.wav 저장 (CLI 와 같은 16bit, rescale)
+        """
+        if output_dir is None:
+            return {}
+        samplerate = samplerate or self.model.samplerate
+        import torch
+        from demucs.audio import save_audio
+
+        paths = {}
+        track_dir = self._track_dir(audio, output_dir, name)
+        for stem, data in (("vocals", vocals), ("no_vocals", no_vocals)):
+            path = track_dir / f"{stem}.wav"
+            save_audio(torch.from_numpy(np.ascontiguousarray(data.T)), str(path), samplerate=samplerate, clip="rescale", bits_per_sample=16)
+            paths[stem] = str(path)
+        return paths
+
+    @staticmethod
+    def _track_dir(audio, output_dir, name) -> Path:
+        if name is None:
+            name = Path(audio).stem if isinstance(audio, (str, os.PathLike)) else "track"
+        track_dir = Path(output_dir) / name
+        track_dir.mkdir(parents=True, exist_ok=True)
+        return track_dir
+
+    def iter_separate(self, audio, sr=None, output_dir=None, name=None,
+                      window_sec=DEMUCS_STREAM_WINDOW_SEC, overlap_sec=DEMUCS_STREAM_OVERLAP_SEC):
+        """
+        스트리밍 분리: 입력을 겹치는 window 로 나눠 차례로 분리하고, 겹친 구간은 선형 crossfade 로 이어
+        확정된 조각부터 yield 한다 (Whisper 등 다음 단계가 전체 분리를 기다리지 않아도 됨).
+
+        메모리는 입력 길이와 무관하게 window 크기로 고정 (window 는 AUDIO_MEMORY_LIMIT_MB 로도 제한).
+        output_dir 를 주면 조각을 받는 대로 vocals.wav / no_vocals.wav 에 이어 쓴다.
+        각 조각: {"start", "end" (모델 샘플레이트 프레임), "vocals", "no_vocals", "sr", "paths"}
+        """
+        from audio_store import WavStreamWriter
+
+        load_sec = self.load()
+        t0 = time.time()
+        arr = self._as_model_array(audio, sr)
+        msr, n = self.model.samplerate, arr.shape[0]
+        mean, std = self._mix_stats(arr)
+
+        overlap = int(overlap_sec * msr)
+        window = max(min(int(window_sec * msr), self._budget_frames(arr.shape[1])), 2 * overlap + msr)
+        windows = _plan_windows(n, window, overlap)
+
+        paths, writers = {}, []
+        if output_dir is not None:
+            track_dir = self._track_dir(audio, output_dir, name)
+            for stem in ("vocals", "no_vocals"):
+                paths[stem] = str(track_dir / f"{stem}.wav")
+                writers.append(WavStreamWriter(paths[stem], msr, arr.shape[1]))
+
+        results = (
+            (start, self._separate_array(arr[start:end], mean, std), i == len(windows) - 1)
+            for i, (start, end) in enumerate(windows)
+        )
+        try:
+            for start, end, vocals, no_vocals in _stitch(results, overlap):
+                for writer, data in zip(writers, (vocals, no_vocals)):
+                    writer.write(data)
+                yield {
+                    "start": start,
+                    "end": end,
+                    "vocals": vocals,
+                    "no_vocals": no_vocals,
+                    "sr": msr,
+                    "paths": paths,
+                }
+        finally:
+            for writer in writers:
+                writer.close()
+
+        infer_sec = time.time() - t0
+        print(f"🕒 Demucs 스트리밍 분리: window {window / msr:.1f}초 x {len(windows)}개, 모델 로드 {load_sec:.2f}초 / 추론 {infer_sec:.2f}초")
+
+    def separate_gated(self, audio_path, regions, output_dir, name=None,
+                       window_sec=DEMUCS_STREAM_WINDOW_SEC, overlap_sec=DEMUCS_STREAM_OVERLAP_SEC) -> dict:
+        """
+        음성 구간만 분리: regions [(start_sec, end_sec), ...] 안에서만 모델을 돌리고
+        나머지 구간은 vocals = 무음, no_vocals = 원본으로 채운다 (출력 길이/레이아웃은 전체 분리와 동일).
+        긴 음성 구간은 스트리밍 모드와 같은 window + crossfade 로 나눠 메모리를 제한한다.
+        """
+        from audio_store import WavStreamWriter
+
+        load_sec = self.load()
+        t0 = time.time()
+        arr = self._as_model_array(audio_path, None)
+        msr, n, channels = self.model.samplerate, arr.shape[0], arr.shape[1]
+        mean, std = self._mix_stats(arr)  # 전체 기준 정규화 (구간마다 스케일이 달라지지 않도록)
+
+        overlap = int(overlap_sec * msr)
+        window = max(min(int(window_sec * msr), self._budget_frames(channels)), 2 * overlap + msr)
+        step = self._budget_frames(channels)
+
+        track_dir = self._track_dir(audio_path, output_dir, name)
+        paths = {stem: str(track_dir / f"{stem}.wav") for stem in ("vocals", "no_vocals")}
+        speech_frames = 0
+        with WavStreamWriter(paths["vocals"], msr, channels) as vocals_writer, \
+                WavStreamWriter(paths["no_vocals"], msr, channels) as no_vocals_writer:
+
+            def pass_through(lo, hi):
+                # 음성 없는 구간: vocals 는 무음, no_vocals 는 원본 그대로
+                for i in range(lo, hi, step):
+                    part = np.asarray(arr[i:min(hi, i + step)])
+                    vocals_writer.write(np.zeros_like(part))
+                    no_vocals_writer.write(part)
+
+            cursor = 0
+            for start_sec, end_sec in regions:
+                lo, hi = max(cursor, int(start_sec * msr)), min(n, int(end_sec * msr))
+                if hi <= lo:
+                    continue
+                pass_through(cursor, lo)
+                windows = [(lo + a, lo + b) for a, b in _plan_windows(hi - lo, window, overlap)]
+                results = (
+                    (start, self._separate_array(arr[start:end], mean, std), i == len(windows) - 1)
+                    for i, (start, end) in enumerate(windows)
+                )
+                for _, _, vocals, no_vocals in _stitch(results, overlap):
+                    vocals_writer.write(vocals)
+                    no_vocals_writer.write(no_vocals)
+                speech_frames += hi - lo
+                cursor = hi
+            pass_through(cursor, n)
+
+        infer_sec = time.time() - t0
+        speech_ratio = speech_frames / n if n else 0.0
+        print(f"🕒 Demucs 음성 구간 분리: {len(regions)}개 구간, 전체의 {speech_ratio:.0%}, 모델 로드 {load_sec:.2f}초 / 추론 {infer_sec:.2f}초")
+        return {"sr": msr, "paths": paths, "load_sec": load_sec, "infer_sec": infer_sec, "speech_ratio": speech_ratio}
+
+    def _budget_frames(self, channels, n_sources=None) -> int:
+        from audio_store import chunk_frames_for
+        # 입력 + 소스 4개 출력 + 정규화/패딩 버퍼 정도가 채널당 프레임마다 잡힌다
+        n_sources = len(self.model.sources) if n_sources is None else n_sources
+        return chunk_frames_for(4 * channels * (n_sources + 4))
+
+    def separate_parallel(self, audio, sr=None, output_dir=None, name=None, workers=DEMUCS_WORKERS,
+                          threads_per_worker=DEMUCS_THREADS_PER_WORKER, overlap_sec=DEMUCS_STREAM_OVERLAP_SEC) -> dict:
+        """
+        병렬 분리: 입력을 겹치는 시간 구간(shard)으로 나눠 프로세스 풀에서 동시에 분리하고 crossfade 로 이어붙인다.
+
+        - 워커 풀은 프로세스 전역으로 한 번 띄워 두고 작업 간에 재사용 (get_shard_pool)
+          워커마다 모델을 한 번 로드하고 torch 스레드 수를 threads_per_worker 로 고정 (기본: 코어 수 / 워커 수)
+        - 부모 프로세스는 모델을 로드하지 않는다 (샘플레이트 등은 워커에게 받아 씀)
+        - 입력은 raw float32 파일을 워커들이 memmap 으로 같이 읽는다 (프로세스 간에는 구간 번호만 전달)
+        - shard 는 워커 수의 2배 이상으로 나눠 고르게 분배, shard 크기는 메모리 예산으로도 제한
+        반환 형식은 separate() 와 같고 "workers", "threads_per_worker", "shards" 가 추가된다.
+        load_sec 은 이번 호출에서 풀을 새로 띄우는 데 걸린 시간 (워커 기동 + 모델 로드, 재사용이면 0)
+        """
+        from audio_store import shared_raw_file
+
+        workers = max(1, int(workers or 1))
+        threads = int(threads_per_worker or max(1, (os.cpu_count() or 1) // workers))
+        pool, (msr, mch, n_sources), load_sec = get_shard_pool(self.model_name, self.device, workers, threads)
+
+        t0 = time.time()
+        arr = self._as_model_array(audio, sr, msr, mch)
+        n, channels = arr.shape
+        mean, std = self._mix_stats(arr)
+
+        overlap = int(overlap_sec * msr)
+        window = max(min(-(-n // (workers * 2)) + overlap, self._budget_frames(channels, n_sources)), 2 * overlap + msr)
+        windows = _plan_windows(n, window, overlap)
+
+        raw_file, tmp_file = shared_raw_file(arr)
+        tasks = [(raw_file, arr.shape, start, end, mean, std) for start, end in windows]
+        vocals_parts, no_vocals_parts = [], []
+        try:
+            results = (
+                (start, outs, i == len(tasks) - 1)
+                for i, (start, outs) in enumerate(pool.imap(_separate_shard, tasks))
+            )
+            for _, _, vocals, no_vocals in _stitch(results, overlap):
+                vocals_parts.append(vocals)
+                no_vocals_parts.append(no_vocals)
+        finally:
+            if tmp_file is not None:
+                os.remove(tmp_file)
+
+        empty = np.zeros((0, channels), dtype=np.float32)
+        vocals = np.concatenate(vocals_parts) if vocals_parts else empty
+        no_vocals = np.concatenate(no_vocals_parts) if no_vocals_parts else empty
+        infer_sec = time.time() - t0
+
+        paths = self._save_outputs(audio, output_dir, name, vocals, no_vocals, msr)
+        print(f"🕒 Demucs 병렬 분리: 워커 {workers}개 x 스레드 {threads}, shard {len(tasks)}개, 풀 기동 {load_sec:.2f}초 / 추론 {infer_sec:.2f}초")
+        return {
+            "vocals": vocals,
+            "no_vocals": no_vocals,
+            "sr": msr,
+            "paths": paths,
+            "load_sec": load_sec,
+            "infer_sec": infer_sec,
+            "workers": workers,
+            "threads_per_worker": threads,
+            "shards": len(tasks),
+        }
+
+
+def _plan_windows(n, window, overlap):
+    """
+    [0, n) 을 길이 window, 이웃끼리 overlap 만큼 겹치는 (start, end) 구간들로 나눈다
+    """
+    windows = []
+    start = 0
+    while start < n:
+        end = min(n, start + window)
+        windows.append((start, end))
+        if end >= n:
+            break
+        start += window - overlap
+    return windows
+
+
+def _stitch(results, overlap):
+    """
+    순서대로 들어오는 (start, (vocals, no_vocals), last) 를 겹친 구간에서 선형 crossfade 로 이어
+    확정된 (start, end, vocals, no_vocals) 조각을 yield (마지막 overlap 은 다음 window 와 섞은 뒤 내보냄)
+    """
+    fade = np.linspace(0.0, 1.0, overlap, dtype=np.float32)[:, None]
+    tail = None
+    for start, outs, last in results:
+        outs = tuple(outs)
+        if tail is not None:
+            # 이전 window 의 꼬리(overlap)와 이번 window 의 머리를 crossfade
+            for out, prev in zip(outs, tail):
+                out[:overlap] = prev * (1.0 - fade) + out[:overlap] * fade
+        emit = outs[0].shape[0] if last else outs[0].shape[0] - overlap
+        tail = None if last else tuple(out[emit:].copy() for out in outs)
+        yield start, start + emit, outs[0][:emit], outs[1][:emit]
+        if last:
+            break
+
+
+def _init_shard_worker(model_name, device, threads):
+    """
+    병렬 분리 워커 초기화: 스레드 수를 고정하고 모델을 미리 로드 (워커당 한 번)
+    """
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+
+    global _separator
+    _separator = DemucsSeparator(model_name=model_name, device=device)
+    _separator.load()
+
+
+def _separate_shard(task):
+    raw_file, shape, start, end, mean, std = task
+    arr = np.memmap(raw_file, dtype=np.float32, mode="r", shape=tuple(shape))
+    return start, get_separator()._separate_array(arr[start:end], mean, std)
+
+
+def _shard_model_info(_=None):
+    model = get_separator().model
+    return model.samplerate, model.audio_channels, len(model.sources)
+
+
+_shard_pool = None
+_shard_pool_key = None
+_shard_pool_info = None
+_shard_pool_lock = threading.Lock()
+
+
+def get_shard_pool(model_name, device, workers, threads):
+    """
+    병렬 분리용 프로세스 전역 워커 풀 (처음 요청 때 띄우고 이후 작업은 재사용, 워커당 모델 로드는 한 번)
+    설정(모델/장치/워커 수/스레드 수)이 바뀌면 이전 풀을 닫고 새로 띄운다.
+    반환: (pool, (samplerate, audio_channels, 소스 수), 이번 호출의 풀 기동 시간(초))
+    """
+    import multiprocessing
+
+    global _shard_pool, _shard_pool_key, _shard_pool_info
+    key = (model_name, device, workers, threads)
+    with _shard_pool_lock:
+        if _shard_pool is not None and _shard_pool_key == key:
+            return _shard_pool, _shard_pool_info, 0.0
+        _close_shard_pool()
+        t0 = time.time()
+        # torch 는 fork 이후 스레드 풀이 꼬일 수 있어 spawn 사용
+        ctx = multiprocessing.get_context("spawn")
+        pool = ctx.Pool(workers, initializer=_init_shard_worker, initargs=(model_name, device, threads))
+        try:
+            # 워커 기동(모델 로드)을 여기서 기다려 풀 기동 시간을 추론 시간과 분리
+            infos = pool.map(_shard_model_info, range(workers), chunksize=1)
+        except BaseException:
+            pool.terminate()
+            raise
+        _shard_pool, _shard_pool_key, _shard_pool_info = pool, key, infos[0]
+        setup_sec = time.time() - t0
+        print(f"🧠 Demucs 병렬 분리 워커 풀 기동: 워커 {workers}개 x 스레드 {threads} ({setup_sec:.2f}초)")
+        return pool, infos[0], setup_sec
+
+
+def _close_shard_pool():
+    global _shard_pool, _shard_pool_key, _shard_pool_info
+    if _shard_pool is not None:
+        _shard_pool.close()
+        _shard_pool.join()
+    _shard_pool, _shard_pool_key, _shard_pool_info = None, None, None
+
+
+def shutdown_shard_pool():
+    """
+    병렬 분리 워커 풀 종료 (프로세스 종료 시 자동 호출)
+    """
+    with _shard_pool_lock:
+        _close_shard_pool()
+
+
+atexit.register(shutdown_shard_pool)
+
+
+_separator = None
+_separator_lock = threading.Lock()
+
+
+def get_separator() -> DemucsSeparator:
+    """
+    워커 프로세스 전역 DemucsSeparator (모델은 첫 분리 때 한 번만 로드)
+    """
+    global _separator
+    with _separator_lock:
+        if _separator is None:
+            _separator = DemucsSeparator()
+        return _separator
+
+
+def separate_vocals_stream(audio_path: str, output_root="separated", bypass_music: bool = MUSIC_BYPASS):
+    """
+    스트리밍 모드 보컬 분리: 확정된 조각을 차례로 yield 하면서 <output_root>/htdemucs/<stem>/ 에 이어 쓴다
+    (조각을 바로 소비하는 쪽에서 쓰는 API, 예: transcriber.iter_transcribe_separated. 파일 경로만 필요하면 separate_vocals 사용)
+    generator 를 끝까지 돌면 vocals.wav / no_vocals.wav 가 완성된다 (경로는 vocals_output_path 와 같음).
+    """
+    output_dir = Path(output_root)
+    output_dir.mkdir(exist_ok=True)
+
+    if bypass_music:
+        from music_detector import has_background_music
+        if not has_background_music(audio_path):
+            # 배경음악이 거의 없으면 분리 생략: 원본을 같은 모양의 조각으로 내보냄
+            track_dir = output_dir / DEMUCS_MODEL / Path(audio_path).stem
+            vocals_path = _write_passthrough(audio_path, track_dir)
+            print(f"⏭️ Demucs 생략 (원본을 vocals 로 사용) → {vocals_path}")
+            yield from _iter_passthrough(audio_path, track_dir)
+            return
+
+    separator = get_separator()
+    yield from separator.iter_separate(audio_path, output_dir=output_dir / separator.model_name)
+
+
+def vocals_output_path(audio_path: str, output_root="separated") -> str:
+    """
+    separate_vocals / separate_vocals_stream 이 vocals.wav 를 쓰는 경로 (CLI 와 같은 레이아웃)
+    """
+    return str(Path(output_root) / DEMUCS_MODEL / Path(audio_path).stem / "vocals.wav")
+
+
+def _iter_passthrough(audio_path, track_dir: Path, window_sec=DEMUCS_STREAM_WINDOW_SEC):
+    """
+    _write_passthrough 결과를 iter_separate 와 같은 모양의 조각으로 yield (vocals = 원본, no_vocals = 무음)
+    """
+    from audio_store import get_audio_store
+
+    store = get_audio_store(audio_path)
+    audio = store.get()
+    paths = {stem: str(track_dir / f"{stem}.wav") for stem in ("vocals", "no_vocals")}
+    step = max(1, int(window_sec * store.native_sr))
+    for start in range(0, len(audio), step):
+        vocals = np.array(audio[start:start + step])
+        yield {
+            "start": start,
+            "end": start + len(vocals),
+            "vocals": vocals,
+            "no_vocals": np.zeros_like(vocals),
+            "sr": store.native_sr,
+            "paths": paths,
+        }
+
+
+def _write_passthrough(audio_path, track_dir: Path) -> Path:
+    """
+    Demucs 없이 같은 레이아웃으로 결과 작성: vocals.wav = 원본, no_vocals.wav = 같은 길이의 무음
+    """
+    from audio_store import get_audio_store, write_wav, WavStreamWriter
+
+    track_dir.mkdir(parents=True, exist_ok=True)
+    store = get_audio_store(audio_path)
+    audio = store.get()
+    vocals_path = track_dir / "vocals.wav"
+    write_wav(vocals_path, audio, store.native_sr)
+
+    with WavStreamWriter(track_dir / "no_vocals.wav", store.native_sr, store.native_channels) as writer:
+        silence = np.zeros((writer.chunk_frames, store.native_channels), dtype=np.float32)
+        for i in range(0, len(audio), writer.chunk_frames):
+            writer.write(silence[:min(writer.chunk_frames, len(audio) - i)])
+    return vocals_path
+
+
+def separate_vocals(audio_path: str, output_root="separated", stream: bool = DEMUCS_STREAMING, workers: int = DEMUCS_WORKERS,
+                    bypass_music: bool = MUSIC_BYPASS, vad_gate: bool = DEMUCS_VAD_GATE) -> str:
+
     #해당 디렉토리가 존재하지 않으면 설치하겠다.
     output_dir = Path(output_root)
     output_dir.mkdir(exist_ok=True)
 
+    if bypass_music:
+        from music_detector import has_background_music
+        if not has_background_music(audio_path):
+            # 배경음악이 거의 없으면 분리 생략: main_pipeline 이 찾는 separated/htdemucs/<stem>/ 레이아웃 그대로 작성
+            vocals_path = _write_passthrough(audio_path, output_dir / DEMUCS_MODEL / Path(audio_path).stem)
+            print(f"⏭️ Demucs 생략 (원본을 vocals 로 사용) → {vocals_path}")
+            return str(vocals_path)
+
+    if not DEMUCS_IN_PROCESS:
+        return _separate_vocals_cli(audio_path, output_root)
+
+    mode = "vad-gated" if vad_gate else "streaming" if stream else (f"parallel x{workers}" if workers > 1 else "in-process")
+    print(f"🎧 Demucs로 보컬 분리 중... ({mode})")
+    start_time = time.time()  # ⏱️ 시작 시간
+
+    if vad_gate:
+        from vad import detect_speech_regions
+        regions = detect_speech_regions(audio_path)
+        separator = get_separator()
+        result = separator.separate_gated(audio_path, regions, output_dir=output_dir / separator.model_name)
+        vocals_path = Path(result["paths"]["vocals"])
+    elif stream:
+        # window 단위로 분리해서 바로 파일에 이어 씀 (입력 길이와 무관하게 메모리는 window 크기로 고정)
+        for _ in separate_vocals_stream(audio_path, output_root, bypass_music=False):
+            pass
+        vocals_path = Path(vocals_output_path(audio_path, output_root))
+    elif workers > 1:
+        separator = get_separator()
+        result = separator.separate_parallel(audio_path, output_dir=output_dir / separator.model_name, workers=workers)
+        vocals_path = Path(result["paths"]["vocals"])
+    else:
+        separator = get_separator()
+        result = separator.separate(audio_path, output_dir=output_dir / separator.model_name)
+        vocals_path = Path(result["paths"]["vocals"])
+
+    elapsed = time.time() - start_time  # ⏱️ 소요 시간
+    print(f"🕒 보컬 분리 소요 시간: {elapsed:.2f}초")
+
+    if not vocals_path.exists():
+        raise FileNotFoundError(f"❌ vocals.wav not found at {vocals_path}")
+
+    print(f"✅ 보컬 추출 완료 → {vocals_path}")
+    return str(vocals_path)
+
+
+def _separate_vocals_cli(audio_path: str, output_root="separated") -> str:
+    output_dir = Path(output_root)
+    output_dir.mkdir(exist_ok=True)
+
     print(f"🎧 Demucs로 보컬 분리 중...")
 
     start_time = time.time()  # ⏱️ 시작 시간
 
+    device = DEMUCS_DEVICE or "cpu"
     cmd = [
         "demucs",
+        "-n", DEMUCS_MODEL,
         "-o", str(output_root),
         "--two-stems", "vocals",
-        "--device", "cpu",
+        "--device", device,
         audio_path
     ]
-    
-    print(f"🚀 demucs 실행: demucs -o {output_root} --two-stems vocals --device cpu {Path(audio_path).name}")
+
+    print(f"🚀 demucs 실행: demucs -n {DEMUCS_MODEL} -o {output_root} --two-stems vocals --device {device} {Path(audio_path).name}")
     subprocess.run(cmd, check=True, text=True)
 
     elapsed = time.time() - start_time  # ⏱️ 소요 시간
@@ -35,8 +625,8 @@ def separate_vocals(audio_path: str, output_root="separated") -> str:
     #   └── test_audio/        ← 오디오 파일 이름 (확장자 제거)
     #      ├── vocals.wav     ← 🎤 추출된 보컬
     #     └── no_vocals.wav  ← 🎵 배경음
-    vocals_path = output_dir / "htdemucs" / basename / "vocals.wav"
-    
+    vocals_path = output_dir / DEMUCS_MODEL / basename / "vocals.wav"
+
     # 실제로 생성되었는지 검증
     import glob
     print(f"[DEBUG] vocals_path to check: {vocals_path}")
@@ -0,0 +1,104 @@
+"""
+배치 다운로드 스케줄러
+
+data.json 같은 여러 작업을 처리할 때, 현재 작업이 Demucs/Whisper/MFA 를 도는 동안
+다음 작업들의 미디어를 스레드 풀에서 미리 받아 둔다.
+
+- 전체 동시 작업 수: DOWNLOAD_MAX_WORKERS
+- 호스트별 동시 전송 수: DOWNLOAD_PER_HOST_LIMIT (같은 사이트에 요청이 몰리지 않도록)
+  작업 전체가 아니라 실제 전송 구간(host_slot())에서만 잡으므로 재시도 대기 중에는 자리를 비운다
+- 재시도는 downloader._cached_fetch 한 곳에서만 한다 (여기서 다시 감싸지 않음)
+- 같은 키로 다시 submit 하면 기존 Future 를 돌려준다 (중복 다운로드 방지)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from config import (
+    DOWNLOAD_MAX_WORKERS,
+    DOWNLOAD_PER_HOST_LIMIT,
+)
+
+_current = threading.local()
+
+
+@contextmanager
+def host_slot():
+    """
+    실제 전송을 감싸는 곳(downloader)에서 호출: 스케줄러 작업 안이면 그 호스트의 자리를 잡는다
+    (스케줄러 밖에서 부르면 제한 없음)
+    """
+    slot = getattr(_current, "slot", None)
+    if slot is None:
+        yield
+        return
+    with slot:
+        yield
+
+
+def _host_of(url):
+    host = (urlparse(url).hostname or "").lower()
+    # www.youtube.com / m.youtube.com / youtube.com 은 같은 호스트로 취급
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host or "local"
+
+
+class DownloadScheduler:
+    def __init__(self,
+                 max_workers=DOWNLOAD_MAX_WORKERS,
+                 per_host_limit=DOWNLOAD_PER_HOST_LIMIT):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self.per_host_limit = per_host_limit
+        self._host_slots = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _host_slot(self, url) -> threading.Semaphore:
+        host = _host_of(url)
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.Semaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def _run(self, key, url, fn, args, kwargs):
+        _current.slot = self._host_slot(url)
+        t0 = time.time()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            print(f"❌ prefetch 실패: {key} → {e}")
+            raise
+        finally:
+            _current.slot = None
+        print(f"📥 prefetch 완료: {key} ({time.time() - t0:.2f}초)")
+        return result
+
+    def submit(self, key, url, fn, *args, **kwargs) -> Future:
+        """
+        fn(*args, **kwargs) 를 백그라운드에서 실행 (fn 안의 host_slot() 구간은 url 의 호스트 기준으로 동시 실행 수 제한)
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._run, key, url, fn, args, kwargs)
+            self._futures[key] = future
+            return future
+
+    def wait(self, key):
+        """
+        key 작업이 끝날 때까지 기다리고 결과를 반환 (fn 이 재시도까지 모두 실패하면 예외)
+        """
+        with self._lock:
+            future = self._futures.get(key)
+        if future is None:
+            return None
+        return future.result()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
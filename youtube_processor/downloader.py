@@ -1,46 +1,547 @@
+import copy
 import os
+import random
+import subprocess
+import time
+from pathlib import Path
+import boto3
 from yt_dlp import YoutubeDL
-from config import FFMPEG_PATH, DOWNLOAD_DIR
-from utils import sanitize_filename
+from yt_dlp.utils import download_range_func, DownloadError
+from config import (
+    FFMPEG_PATH, FFPROBE_PATH, DOWNLOAD_DIR, CLIP_MARGIN_SEC, PROXY_MIN_HEIGHT,
+    DOWNLOAD_RETRIES, DOWNLOAD_BACKOFF_SEC, DOWNLOAD_DURATION_TOLERANCE_SEC,
+)
+from utils import sanitize_filename, extract_video_id, is_object_store_key, split_object_store_key
+from media_cache import get_media_cache, get_info_cache, make_cache_key
+from download_scheduler import host_slot
 
-def download_audio(url, video_id, video_filename):
+# yt-dlp 포맷 셀렉터 (캐시 키에도 사용)
+AUDIO_FORMAT = 'bestaudio/best'
+# 받은 오디오 스트림을 재인코딩 없이(stream copy) 담는 컨테이너 (opus/aac/vorbis 모두 담을 수 있고 캐시 확장자가 고정됨)
+AUDIO_CONTAINER = 'mka'
+VIDEO_FORMAT = 'bestvideo+bestaudio/best'
+
+# 끊긴 다운로드를 .part 파일에서 이어받도록 하는 공통 yt-dlp 옵션
+# (partial/ 폴더는 reset_folder 대상이 아니라서 작업이 실패해도 조각이 남는다)
+RESUME_OPTS = {
+    'continuedl': True,
+    'nopart': False,
+    'retries': 10,
+    'fragment_retries': 10,
+    'skip_unavailable_fragments': False,  # 빠진 조각이 있으면 잘린 파일 대신 실패로 처리
+}
+
+
+def proxy_video_format(min_height=PROXY_MIN_HEIGHT, with_audio=True):
+    """
+    얼굴 인식에 충분한 최소 해상도(min_height) 이상 중 가장 작은 영상 스트림 + 최고 음질 오디오.
+    조건을 만족하는 스트림이 없으면(원본이 더 작으면) 원래 포맷으로 대체.
+    with_audio=False 면 영상 스트림만 받는다 (오디오는 download_audio 로 따로 받는 경우).
+    """
+    if not with_audio:
+        return f'worstvideo[height>={min_height}]/bestvideo/best'
+    return f'worstvideo[height>={min_height}]+bestaudio/{VIDEO_FORMAT}'
+
+
+def section_origin(section, margin=CLIP_MARGIN_SEC):
+    """
+    구간 다운로드 시 받은 파일의 0초가 원본 영상에서 몇 초인지 반환
+    (section이 없으면 전체 다운로드이므로 0.0)
+    """
+    if section is None:
+        return 0.0
+    return max(0.0, float(section[0]) - margin)
+
+
+def _section_opts(section, margin=CLIP_MARGIN_SEC):
+    """
+    (start, end) 구간 + 앞뒤 margin 만 받도록 하는 yt-dlp 옵션
+    컷 지점에 키프레임을 강제해서 받은 파일의 0초가 section_origin() 과 정확히 일치하게 한다.
+    """
+    if section is None:
+        return {}
+    range_start = section_origin(section, margin)
+    range_end = float(section[1]) + margin
+    return {
+        'download_ranges': download_range_func(None, [(range_start, range_end)]),
+        'force_keyframes_at_cuts': True,
+    }
+
+
+def get_video_info(url, video_id=None, refresh=False):
+    """
+    yt-dlp info dict 를 캐시에서 가져온다 (없거나 TTL 지났으면 1회 추출 후 저장).
+    포맷 목록/길이/스트림 URL 이 들어있어서 이후 다운로드는 추출 왕복 없이 진행된다.
+    """
+    video_id = video_id or extract_video_id(url)
+    cache = get_info_cache()
+    info = None if refresh else cache.get(video_id)
+    if info is None:
+        print(f"🔎 메타데이터 추출: {video_id}")
+        with YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+            info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+        cache.put(video_id, info)
+    # 호출 측에서 yt-dlp 가 info 를 수정하므로 캐시 원본은 복사해서 넘긴다
+    return copy.deepcopy(info)
+
+
+def get_video_duration(url, video_id=None):
+    """
+    영상 길이(초), 알 수 없으면 0.0 (캐시된 메타데이터 사용)
+    """
+    return float(get_video_info(url, video_id).get('duration') or 0)
+
+
+def _download_with_info(ydl_opts, url, video_id):
+    """
+    캐시된 info dict 로 포맷 선택 + 다운로드 (추출 생략).
+    캐시된 스트림 URL 이 만료돼서 실패하면 메타데이터를 새로 추출해 한 번만 재시도한다.
+    """
+    with YoutubeDL(ydl_opts) as ydl:
+        try:
+            return ydl.process_ie_result(get_video_info(url, video_id), download=True)
+        except DownloadError as e:
+            print(f"⚠️ 캐시된 메타데이터로 다운로드 실패, 새로 추출해서 재시도: {e}")
+            get_info_cache().invalidate(video_id)
+            return ydl.process_ie_result(get_video_info(url, video_id, refresh=True), download=True)
+
+
+def probe_duration(path):
+    """
+    ffprobe 로 미디어 길이(초)를 읽는다. 열 수 없는 파일이면 예외
+    """
+    cmd = [
+        FFPROBE_PATH, "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        str(path),
+    ]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    return float(result.stdout.strip() or 0)
+
+
+def has_video_stream(path):
+    """
+    표지 이미지(attached picture)를 뺀 영상 스트림이 있는지 (ffprobe -select_streams V)
+    """
+    cmd = [
+        FFPROBE_PATH, "-v", "error",
+        "-select_streams", "V",
+        "-show_entries", "stream=index",
+        "-of", "csv=p=0",
+        str(path),
+    ]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    return bool(result.stdout.strip())
+
+
+def _expected_duration(url, video_id, section):
+    """
+    받은 파일이 가져야 할 길이(초), 알 수 없으면 None
+    """
+    try:
+        duration = get_video_duration(url, video_id)
+    except Exception:
+        return None
+    if duration <= 0:
+        return None
+    if section is None:
+        return duration
+    return min(duration, float(section[1]) + CLIP_MARGIN_SEC) - section_origin(section)
+
+
+def _verify_media(path, expected_duration=None):
+    """
+    다 받은 파일 검증: 존재/크기 > 0, ffprobe 로 열리는지, 길이가 예상보다 짧지 않은지
+    """
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        raise IOError(f"다운로드 결과 파일이 없거나 비어 있습니다: {path}")
+    actual = probe_duration(path)
+    if expected_duration is not None and actual < expected_duration - DOWNLOAD_DURATION_TOLERANCE_SEC:
+        raise IOError(f"다운로드 파일이 잘렸습니다: {path.name} ({actual:.1f}s < 예상 {expected_duration:.1f}s)")
+
+
+def new_download_stats() -> dict:
+    """
+    작업 하나의 다운로드 통계 (cache 는 {확장자: "hit" | "miss" | "skipped"}, 나머지는 작업 전체 누적 횟수/바이트/초)
+    fetches 는 실제로 받은 전송 수, saved_fetches 는 캐시 적중/생략/중복 제거로 받지 않은 전송 수
+    """
+    return {
+        "cache": {},
+        "fetches": 0,
+        "saved_fetches": 0,
+        "download_bytes": 0,
+        "saved_bytes": 0,
+        "extract_sec": 0.0,
+        "download_sec": 0.0,
+        "saved_sec": 0.0,
+    }
+
+
+def report_download_stats(stats):
+    """
+    작업의 다운로드/절약 통계 출력 (받은 것이 없으면 생략)
+    """
+    if not stats or not stats["cache"]:
+        return
+    cache = ", ".join(f"{ext} {state}" for ext, state in stats["cache"].items())
+    print(f"📊 다운로드 {stats['fetches']}회 {stats['download_bytes'] / 1e6:.1f}MB / {stats['download_sec']:.2f}초, "
+          f"절약 {stats['saved_fetches']}회 {stats['saved_bytes'] / 1e6:.1f}MB / 약 {stats['saved_sec']:.2f}초 (캐시 {cache})")
+
+
+def _cached_fetch(video_id, format_selector, section, outputs, fetch, expected_duration=None, stats=None):
+    """
+    캐시에 있으면 꺼내 쓰고, 없으면 fetch로 받아서 캐시에 넣은 뒤 작업 경로로 꺼낸다.
+
+    받다가 실패하면 작업 전체가 아니라 이 전송만 재시도한다 (DOWNLOAD_RETRIES 회, 지수 백오프).
+    yt-dlp 가 partial/ 에 남긴 .part 파일에서 이어받고, 완료된 파일은 ffprobe 로 길이를 확인한 뒤
+    캐시에 넣는다 (캐시는 sha256 을 기록해서 꺼낼 때 다시 확인).
+
+    Args:
+        outputs (dict): {확장자: 작업 경로} 예) {"mka": "downloads/abc.mka"}
+                        작업 경로가 None 이면 캐시에만 채워 둔다 (prefetch용)
+        fetch (callable): fetch(staging_base) → staging_base.<확장자> 파일들을 만든다
+        expected_duration (float): 완료 파일의 예상 길이(초), None 이면 길이 비교 생략
+        stats (dict): new_download_stats() 결과, 주면 받은/캐시에서 꺼낸 바이트와 시간을 더한다
+    Returns:
+        bool: 캐시 적중 여부
+    """
+    cache = get_media_cache()
+    key = make_cache_key(video_id, format_selector, section)
+    cached = {ext: cache.get(key, ext) for ext in outputs}
+    if all(cached.values()):
+        for ext, dest in outputs.items():
+            if dest is not None:
+                cache.materialize(cached[ext], dest)
+        print(f"♻️ 캐시 적중: {video_id} ({format_selector}, section={section})")
+        if stats is not None:
+            stats["saved_fetches"] += 1
+            for ext in outputs:
+                stats["cache"][ext] = "hit"
+                stats["saved_bytes"] += os.path.getsize(cached[ext])
+        return True
+
+    staging_base = cache.staging_dir / key
+    state = cache.load_staging_state(key)
+    if state["attempts"]:
+        print(f"⏯️ 이전에 끊긴 다운로드 이어받기: {video_id} (이전 시도 {state['attempts']}회, 오류: {state['last_error']})")
+    attempt = 0
+    t0 = time.time()
+    while True:
+        fetched = False
+        try:
+            with host_slot():  # 배치 선다운로드 중이면 호스트별 동시 전송 수 제한 (재시도 대기 중에는 자리 반납)
+                fetch(staging_base)
+            fetched = True
+            for ext in outputs:
+                _verify_media(f"{staging_base}.{ext}", expected_duration)
+            break
+        except Exception as e:
+            attempt += 1
+            state["attempts"] += 1
+            state["last_error"] = str(e)[:500]
+            cache.save_staging_state(key, state)
+            # 검증에 실패한 완성본은 지워야 다음 시도에서 다시 받는다
+            # (전송 중 끊긴 경우에는 .part 조각을 남겨서 이어받기)
+            if fetched:
+                for ext in outputs:
+                    Path(f"{staging_base}.{ext}").unlink(missing_ok=True)
+            if attempt > DOWNLOAD_RETRIES:
+                print(f"❌ 다운로드 실패 ({DOWNLOAD_RETRIES}회 재시도 후): {video_id} → {e}")
+                raise
+            # 지수 백오프 + 지터 (여러 작업이 동시에 재시도하지 않도록)
+            delay = DOWNLOAD_BACKOFF_SEC * (2 ** (attempt - 1)) * (1 + random.random() * 0.25)
+            print(f"⚠️ 다운로드 오류, {delay:.1f}초 후 이 전송만 재시도 ({attempt}/{DOWNLOAD_RETRIES}): {e}")
+            time.sleep(delay)
+
+    if stats is not None:
+        stats["fetches"] += 1
+        stats["download_sec"] += time.time() - t0
+        for ext in outputs:
+            stats["cache"][ext] = "miss"
+            stats["download_bytes"] += os.path.getsize(f"{staging_base}.{ext}")
+
+    for ext, dest in outputs.items():
+        stored = cache.put(key, ext, f"{staging_base}.{ext}", move=True)
+        if dest is not None:
+            cache.materialize(stored, dest)
+    cache.clear_staging(key)
+    print(f"📊 캐시 통계: {cache.stats()}")
+    return False
+
+
+def _make_audio_fetch(url, video_id, section):
+    def fetch(staging_base):
+        # 원본 오디오 스트림을 그대로 AUDIO_CONTAINER 에 옮겨 담는다 (mp3 재인코딩 없음, 음질 손실 없음)
+        ydl_opts = {
+            'format': AUDIO_FORMAT,
+            'outtmpl': str(staging_base) + '.%(ext)s',
+            'postprocessors': [{
+                'key': 'FFmpegVideoRemuxer',
+                'preferedformat': AUDIO_CONTAINER,
+            }],
+            'quiet': True,
+            'no_warnings': True,
+            'ffmpeg_location': FFMPEG_PATH,
+            **RESUME_OPTS,
+            **_section_opts(section),
+        }
+
+        print(f"🔻 Downloading audio: {video_id}")
+        _download_with_info(ydl_opts, url, video_id)
+
+    return fetch
+
+
+def _timed_expected_duration(url, video_id, section, stats):
+    # 메타데이터가 캐시에 없으면 여기서 추출되므로 그 시간을 extract_sec 로 센다
+    t0 = time.time()
+    expected = _expected_duration(url, video_id, section)
+    if stats is not None:
+        stats["extract_sec"] += time.time() - t0
+    return expected
+
+
+def download_audio(url, video_id, video_filename, section=None, stats=None):
+    """
+    오디오 스트림만 받아 downloads/<video_filename>.mka 로 둔다 (원본 코덱 그대로, 재인코딩 없음)
+    반환: (오디오 경로, 같은 이름의 영상 경로)
+    """
     DOWNLOAD_DIR.mkdir(exist_ok=True)
     
    # 💡 전달받은 video_filename을 그대로 사용
     output_path = DOWNLOAD_DIR / video_filename
+    audio_path = f"{output_path}.{AUDIO_CONTAINER}"
 
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'outtmpl': str(output_path),
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }],
-        'quiet': True,
-        'no_warnings': True,
-        'ffmpeg_location': FFMPEG_PATH
-    }
+    _cached_fetch(video_id, AUDIO_FORMAT, section, {AUDIO_CONTAINER: audio_path},
+                  _make_audio_fetch(url, video_id, section),
+                  expected_duration=_timed_expected_duration(url, video_id, section, stats),
+                  stats=stats)
+    return audio_path, str(output_path) + ".mp4"
 
-    print(f"🔻 Downloading audio: {video_id}")
-    with YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
-
-    return str(output_path) + ".mp3", str(output_path) + ".mp4"
-
-def download_video(url, output_path):
-    ydl_opts = {
-        'format': 'bestvideo+bestaudio/best',
-        'outtmpl': output_path,
-        'merge_output_format': 'mp4',
-        'postprocessors': [{               # ✅ 이거 추가
-            'key': 'FFmpegVideoConvertor',
-            'preferedformat': 'mp4',
-        }],    # ← 이 옵션을 추가하세요!
-        'quiet': True,
-        'no_warnings': True,
-        'ffmpeg_location': FFMPEG_PATH
+
+def _video_format(proxy, with_audio):
+    # proxy=True 면 얼굴 인식용 저해상도 스트림만 받는다
+    if proxy:
+        return proxy_video_format(with_audio=with_audio)
+    return VIDEO_FORMAT if with_audio else 'bestvideo/best'
+
+
+def _make_video_fetch(url, video_id, section, proxy, video_format):
+    def fetch(staging_base):
+        ydl_opts = {
+            'format': video_format,
+            'outtmpl': str(staging_base) + ".mp4",
+            'merge_output_format': 'mp4',
+            'postprocessors': [{               # ✅ 이거 추가
+                'key': 'FFmpegVideoConvertor',
+                'preferedformat': 'mp4',
+            }],    # ← 이 옵션을 추가하세요!
+            'quiet': True,
+            'no_warnings': True,
+            'ffmpeg_location': FFMPEG_PATH,
+            **RESUME_OPTS,
+            **_section_opts(section),
+        }
+        print(("🎥 Downloading full video..." if section is None else f"🎥 Downloading video section {section}...")
+              + (f" (proxy ≥{PROXY_MIN_HEIGHT}p)" if proxy else ""))
+        _download_with_info(ydl_opts, url, video_id)
+
+    return fetch
+
+
+def download_video(url, output_path, section=None, proxy=False, with_audio=True, stats=None):
+    video_id = extract_video_id(url)
+    video_format = _video_format(proxy, with_audio)
+    _cached_fetch(video_id, video_format, section, {"mp4": output_path},
+                  _make_video_fetch(url, video_id, section, proxy, video_format),
+                  expected_duration=_timed_expected_duration(url, video_id, section, stats),
+                  stats=stats)
+
+
+def _section_bytes(info, size, section):
+    # 구간 다운로드면 전체 스트림 크기를 받는 구간 길이 비율만큼 줄인다
+    duration = float(info.get('duration') or 0)
+    if section is not None and duration > 0:
+        range_sec = float(section[1]) + CLIP_MARGIN_SEC - section_origin(section)
+        size = int(size * min(1.0, range_sec / duration))
+    return size
+
+
+def _estimate_video_bytes(url, video_id, section, proxy):
+    """
+    받지 않은 영상 스트림의 크기 추정 (캐시된 메타데이터의 포맷 목록 기준, 모르면 0)
+    proxy 면 PROXY_MIN_HEIGHT 이상 중 가장 작은 스트림, 아니면 가장 큰 스트림을 고른다.
+    """
+    try:
+        info = get_video_info(url, video_id)
+    except Exception:
+        return 0
+    videos = [f for f in info.get('formats') or [] if f.get('vcodec') not in (None, 'none') and _stream_bytes(f)]
+    if not videos:
+        return 0
+    by_height = lambda f: (f.get('height') or 0, _stream_bytes(f))
+    large_enough = [f for f in videos if (f.get('height') or 0) >= PROXY_MIN_HEIGHT]
+    chosen = min(large_enough, key=by_height) if proxy and large_enough else max(videos, key=by_height)
+    return _section_bytes(info, _stream_bytes(chosen), section)
+
+
+def _estimate_audio_bytes(url, video_id, section):
+    """
+    bestaudio 스트림의 크기 추정 (캐시된 메타데이터 기준, 모르면 0): 오디오 전용 스트림 중 비트레이트가 가장 높은 것
+    """
+    try:
+        info = get_video_info(url, video_id)
+    except Exception:
+        return 0
+    audios = [f for f in info.get('formats') or []
+              if f.get('vcodec') in (None, 'none') and f.get('acodec') not in (None, 'none') and _stream_bytes(f)]
+    if not audios:
+        return 0
+    chosen = max(audios, key=lambda f: (f.get('abr') or 0, _stream_bytes(f)))
+    return _section_bytes(info, _stream_bytes(chosen), section)
+
+
+class LazyVideo:
+    """
+    프레임이 실제로 필요해질 때 처음 한 번만 영상을 받는 핸들.
+
+    os.fspath(handle) 또는 handle.path 로 경로를 꺼내는 순간 다운로드가 일어난다.
+    str()/repr()/로그 출력은 다운로드하지 않는다 (경로 문자열만 보여줌).
+    화자 1명 작업처럼 프레임을 쓰지 않는 경로에서는 영상 I/O 가 전혀 없다.
+    오디오는 download_audio 로 따로 받으므로 기본값은 영상 스트림만(with_audio=False) 받는다.
+    stats 를 주면 받은 영상 통계를 더하고, 작업이 끝날 때 record_savings() 로 받지 않은 전송을 절약분으로 더한다.
+    """
+
+    def __init__(self, url, output_path, section=None, proxy=True, with_audio=False, stats=None):
+        self.url = url
+        self.output_path = str(output_path)
+        self.section = section
+        self.proxy = proxy
+        self.with_audio = with_audio
+        self.stats = stats
+        self._resolved = False
+
+    @property
+    def resolved(self) -> bool:
+        return self._resolved
+
+    def resolve(self) -> str:
+        if not self._resolved:
+            print(f"🎥 프레임 추출에 영상이 필요해서 지금 받습니다: {self.output_path}")
+            download_video(self.url, self.output_path, section=self.section,
+                           proxy=self.proxy, with_audio=self.with_audio, stats=self.stats)
+            self._resolved = True
+        return self.output_path
+
+    @property
+    def path(self) -> str:
+        return self.resolve()
+
+    def record_savings(self):
+        """
+        작업이 끝날 때 받지 않은 전송을 stats 에 절약분으로 더한다 (크기는 메타데이터 추정, 시간은 이번 작업 처리량 기준)
+        - with_audio=False: 영상+오디오 합본을 받았다면 download_audio 와 겹쳤을 오디오 스트림 재전송
+        - 끝까지 resolve 되지 않음: 영상 스트림 전송 자체
+        """
+        if self.stats is None:
+            return
+        video_id = extract_video_id(self.url)
+        if not self.with_audio:
+            self._add_saved(_estimate_audio_bytes(self.url, video_id, self.section))
+        if not self._resolved:
+            self.stats["cache"]["mp4"] = "skipped"
+            self._add_saved(_estimate_video_bytes(self.url, video_id, self.section, self.proxy))
+
+    def _add_saved(self, size):
+        throughput = self.stats["download_bytes"] / self.stats["download_sec"] if self.stats["download_sec"] > 0 else 0
+        self.stats["saved_fetches"] += 1
+        self.stats["saved_bytes"] += size
+        self.stats["saved_sec"] += size / throughput if throughput else 0.0
+
+    def __fspath__(self):
+        return self.resolve()
+
+    def __str__(self):
+        # 로그/f-string 에서 다운로드가 일어나지 않도록 경로 문자열만 돌려준다
+        return self.output_path
+
+    def __repr__(self):
+        state = "resolved" if self._resolved else "pending"
+        return f"LazyVideo({self.output_path!r}, {state})"
+
+
+def _stream_bytes(fmt):
+    # yt-dlp가 알려주는 스트림 크기 (정확값이 없으면 추정값)
+    return int(fmt.get('filesize') or fmt.get('filesize_approx') or 0)
+
+
+def prefetch_media(url, video_id, section=None, proxy=True, video=True):
+    """
+    main_pipeline 이 쓰는 것과 같은 키(download_audio / LazyVideo)로 미디어 캐시만 채워 둔다.
+    downloads/ 에는 꺼내지 않는다. 배치 처리 시 다음 작업의 미디어를 미리 받아 두는 용도.
+
+    video=False 면 오디오만 받는다 (화자 1명 작업은 영상을 쓰지 않음).
+    """
+    expected = _expected_duration(url, video_id, section)
+    result = {
+        "audio": "hit" if _cached_fetch(video_id, AUDIO_FORMAT, section, {AUDIO_CONTAINER: None},
+                                        _make_audio_fetch(url, video_id, section),
+                                        expected_duration=expected) else "miss",
     }
-    print("🎥 Downloading full video...")
-    with YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
+    if video:
+        video_format = _video_format(proxy, with_audio=False)
+        hit = _cached_fetch(video_id, video_format, section, {"mp4": None},
+                            _make_video_fetch(url, video_id, section, proxy, video_format),
+                            expected_duration=expected)
+        result["video"] = "hit" if hit else "miss"
+    return result
+
+
+def fetch_object_store(source):
+    """
+    s3://bucket/key 객체를 미디어 캐시에 받아 두고 캐시 경로를 반환 (같은 키는 다시 받지 않음)
+    """
+    bucket, key = split_object_store_key(source)
+    ext = Path(key).suffix.lstrip(".").lower() or "bin"
+    cache = get_media_cache()
+    cache_key = make_cache_key(source, "object-store")
+    cached = cache.get(cache_key, ext)
+    if cached is not None:
+        print(f"♻️ 캐시 적중: {source}")
+        return cached
+
+    staging = cache.staging_dir / f"{cache_key}.{ext}"
+    print(f"☁️ 오브젝트 스토리지에서 받는 중: {source}")
+    with host_slot():
+        boto3.client('s3', region_name='ap-northeast-2').download_file(bucket, key, str(staging))
+    return cache.put(cache_key, ext, staging, move=True)
+
+
+def ingest_local_media(source, video_filename):
+    """
+    로컬 파일(디스크/NFS) 또는 s3://bucket/key 를 YouTube 다운로드와 같은 계약으로 준비한다.
+    네트워크 추출/다운로드도, mp3 재인코딩도 없이 원본 파일을 오디오/영상 경로로 그대로 쓴다
+    (구간 자르기와 공유 오디오 저장소는 ffmpeg 로 원본에서 바로 디코딩한다).
+
+    원본 전체를 그대로 쓰므로 받은 파일의 0초 = 원본 0초 (origin 0.0).
+
+    Returns:
+        tuple: (audio_path, video_path) — 영상 스트림이 없는 오디오 파일이면 video_path 는 None
+    """
+    if is_object_store_key(source):
+        # 캐시 항목은 LRU 로 지워질 수 있으므로 작업 폴더로 꺼내서 쓴다 (하드링크라 복사 비용 없음)
+        DOWNLOAD_DIR.mkdir(exist_ok=True)
+        cached = Path(fetch_object_store(source))
+        src_path = Path(get_media_cache().materialize(cached, str(DOWNLOAD_DIR / video_filename) + cached.suffix))
+    else:
+        src_path = Path(source)
+        if not src_path.exists():
+            raise FileNotFoundError(f"❌ 입력 파일을 찾을 수 없습니다: {source}")
+
+    print(f"📁 로컬 소스 사용 (다운로드/재인코딩 생략): {source}")
+    video_path = str(src_path) if has_video_stream(src_path) else None
+    if video_path is None:
+        print("🎧 영상 스트림이 없는 소스입니다 (프레임 추출 생략)")
+    return str(src_path), video_path
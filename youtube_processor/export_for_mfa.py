@@ -1,7 +1,9 @@
 from pathlib import Path
-from pydub import AudioSegment
 import re
+import shutil
+import wave
 from utils import run_mfa_align
+from audio_store import get_audio_store, write_wav
 
 
 def normalize_text(text: str) -> str:
@@ -38,6 +40,15 @@ def split_into_sentences(text: str) -> list[str]:
     return re.split(r'(?<=[.?!])\s+', text)
 
 
+def _is_mfa_ready_wav(path) -> bool:
+    # 이미 16kHz mono 16bit PCM WAV 면 디코딩 없이 그대로 복사해서 쓴다
+    try:
+        with wave.open(str(path), "rb") as wf:
+            return wf.getframerate() == 16000 and wf.getnchannels() == 1 and wf.getsampwidth() == 2
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
 def export_segments_for_mfa(vocal_path: str, segments: list, output_base: str = "mfa/corpus", filename: str = "full", actor_name: str = 'none', token_num: int = 0):
     """
     전체 음성 + 전체 자막을 1쌍으로 저장하여 MFA 분석 성능을 점검하기 위한 함수
@@ -45,18 +56,21 @@ def export_segments_for_mfa(vocal_path: str, segments: list, output_base: str =
     output_dir = Path(output_base)
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    ready = _is_mfa_ready_wav(vocal_path)
     try:
-        full_audio = AudioSegment.from_file(vocal_path)
+        # 공유 오디오 저장소의 16k mono 버전 사용 (다른 단계와 디코딩/리샘플링 공유)
+        clip = None if ready else get_audio_store(vocal_path).get(sr=16000, channels=1)
     except Exception as e:
         print(f"❌ WAV 파일 로드 실패: {e}")
         return
 
     try:
-        # 오디오 변환 및 저장
-        clip = full_audio.set_channels(1).set_frame_rate(16000)
         # 항상 token_num을 붙여서 파일명 생성
         clip_path = output_dir / f"{filename}{token_num}.wav"
-        clip.export(clip_path, format="wav", parameters=["-acodec", "pcm_s16le"])
+        if ready:
+            shutil.copyfile(vocal_path, clip_path)
+        else:
+            write_wav(clip_path, clip, 16000)  # 16bit PCM mono
 
         # 전체 텍스트 정제 및 문장 분리
         # 기존: raw_text = " ".join(seg["text"].strip().upper() for seg in segments if seg.get("text"))
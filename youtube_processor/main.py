@@ -7,15 +7,16 @@ from typing import Optional
 import glob
 
 #다운로드 관련(Youtube)
-from downloader import download_audio, download_video # 유튜브 영상 및 오디오 다운로드
+from downloader import download_audio, prefetch_media, section_origin, get_video_duration, ingest_local_media, fetch_object_store, LazyVideo, new_download_stats, report_download_stats # 유튜브 영상 및 오디오 다운로드
+from download_scheduler import DownloadScheduler  # 배치 작업용 미디어 선다운로드
+from config import DOWNLOAD_PREFETCH_AHEAD, MAX_SOURCE_DURATION_SEC, ASR_STREAMING, DEMUCS_STREAMING, DEMUCS_IN_PROCESS, DEMUCS_VAD_GATE
 
 #오디오 처리/분리
-from demucs_wrapper import separate_vocals  # 배경음/음성 분리 (Demucs 사용)
-from pydub import AudioSegment  # mp3/wav 변환 등 오디오 조작
-from speaker_diarization.split_mp3 import split_audio_by_token  # Token 단위로 오디오 나누기
+from demucs_wrapper import separate_vocals, separate_vocals_stream, vocals_output_path  # 배경음/음성 분리 (Demucs 사용)
+from speaker_diarization.split_mp3 import split_audio_by_tokens  # Token 단위로 오디오 나누기
 
 #자막 생성 및 처리
-from transcriber import transcribe_audio #, transcribe_audio_check  # Whisper 등으로 자막 생성
+from transcriber import transcribe_audio, iter_transcribe_segments, iter_transcribe_separated #, transcribe_audio_check  # Whisper 등으로 자막 생성
 from level_up_textgrid import generate_sentence_json  # TextGrid 자막 → 문장 JSON 변환
 from export_for_mfa import export_segments_for_mfa  # MFA 학습용 자막/음성 데이터 포맷팅
 from format_segments_for_output import format_segments_for_output
@@ -34,7 +35,7 @@ from upload_file_to_s3 import upload_file_to_s3  # AWS S3 업로드
 
 
 #유틸 함수 모음
-from utils import sanitize_filename, extract_video_id, reset_folder, run_mfa_align, generate_presigned_url   # 경로 정리, 유튜브 ID 추출, 폴더 초기화 등
+from utils import sanitize_filename, extract_video_id, extract_source_id, is_remote_url, is_object_store_key, reset_folder, run_mfa_align, generate_presigned_url   # 경로 정리, 유튜브 ID 추출, 폴더 초기화 등
 
 #토큰 및 db관련 로직
 from token_generator import create_token  # Token 생성 (음성+자막 묶음)
@@ -53,6 +54,7 @@ from postgres.database import engine  # SQLAlchemy DB 엔진
 # from collections import defaultdict # defaultdict가 없다면 추가
 # from pyannote.audio.pipelines import SpeakerDiarization
 from speaker_diarizer import diarize_main_speaker
+from audio_store import begin_audio_store_job, release_audio_stores, trim_audio  # 작업 단위 공유 디코딩 오디오
 import json # 다운로드용
 
 import torch
@@ -72,76 +74,120 @@ def adjust_segment_boundaries_forward(segments):
     if not segments:
         return segments
     
-    adjusted_segments = []
-    
-    for i, seg in enumerate(segments):
-        current_start = seg['start']
-        current_end = seg['end']
-        
-        # 다음 문장과의 간격을 현재 문장에 붙이기
-        if i < len(segments) - 1:
-            next_start = segments[i+1]['start']
-            gap = next_start - current_end
-            if gap > 0:  # 텀이 있으면
-                current_end += gap  # 현재 문장 끝을 뒤로 확장
-                print(f"[DEBUG] 문장 {i+1}: 텀 {gap:.2f}초를 앞 문장에 붙임 ({current_start:.2f}s - {current_end:.2f}s)")
-        
-        adjusted_segments.append({
-            **seg,
-            'start': current_start,
-            'end': current_end
-        })
-    
-    return adjusted_segments
+    return list(iter_adjust_segment_boundaries_forward(segments))
+
+def iter_adjust_segment_boundaries_forward(segments):
+    """
+    adjust_segment_boundaries_forward 의 스트리밍 버전: 다음 문장이 들어오면 앞 문장을 확정해서 yield
+    (segments 는 리스트든 generator 든 상관없음)
+    """
+    prev = None
+    i = 0
+    for seg in segments:
+        if prev is not None:
+            yield _attach_gap(prev, seg['start'], i)
+            i += 1
+        prev = seg
+    if prev is not None:
+        yield {**prev, 'start': prev['start'], 'end': prev['end']}
+
+def _attach_gap(seg, next_start, i):
+    current_start = seg['start']
+    current_end = seg['end']
+
+    # 다음 문장과의 간격을 현재 문장에 붙이기
+    gap = next_start - current_end
+    if gap > 0:  # 텀이 있으면
+        current_end += gap  # 현재 문장 끝을 뒤로 확장
+        print(f"[DEBUG] 문장 {i+1}: 텀 {gap:.2f}초를 앞 문장에 붙임 ({current_start:.2f}s - {current_end:.2f}s)")
+
+    return {
+        **seg,
+        'start': current_start,
+        'end': current_end
+    }
 
 def main_pipeline(youtube_url: str, movie_name: Optional[str] = None, actor_name: Optional[str] = None, start: Optional[float] = None, end: Optional[float] = None, n_speakers: Optional[int] = None, token_name: Optional[str] = None) -> Optional[list[int]]:
+    download_stats = new_download_stats()  # 작업 단위 다운로드/절약 통계
+    audio_job = begin_audio_store_job()  # 이 작업이 연 공유 오디오 저장소만 끝날 때 정리 (서버의 다른 작업 것은 유지)
+    mp4_path = None
     try:
         print(f"[DEBUG] main_pipeline called with start={start}, end={end}")
         start_time = time.time()  # ⏱️ 시작 시간
 
-        video_id = extract_video_id(youtube_url)
+        video_id = extract_source_id(youtube_url)
         video_filename = sanitize_filename(video_id)
         print({video_id})
         print({video_filename})
-        mp4_path = os.path.join("downloads", video_filename + ".mp4")
-        download_video(youtube_url, mp4_path)
-        mp3_path, _ = download_audio(youtube_url, video_id, video_filename)
+        # start/end가 있으면 해당 구간(+여유 margin)만 받는다
+        section = (start, end) if start is not None and end is not None else None
+
+        if not is_remote_url(youtube_url):
+            # 로컬 파일/오브젝트 스토리지 키: 네트워크 추출/재인코딩 없이 원본을 오디오/영상 경로로 사용 (영상이 없으면 mp4_path=None)
+            mp3_path, mp4_path = ingest_local_media(youtube_url, video_filename)
+            origin = 0.0
+        else:
+            # 다운로드 전에 캐시된 메타데이터로 길이 확인 (이후 다운로드도 같은 메타데이터 재사용)
+            duration = get_video_duration(youtube_url, video_id)
+            print(f"[DEBUG] 영상 길이: {duration:.1f}초")
+            if section is not None and duration > 0 and float(start) >= duration:
+                raise ValueError(f"start({start}s)가 영상 길이({duration:.1f}s)를 넘습니다.")
+            if section is None and MAX_SOURCE_DURATION_SEC is not None and duration > MAX_SOURCE_DURATION_SEC:
+                raise ValueError(f"영상 길이 {duration:.1f}s 가 제한 {MAX_SOURCE_DURATION_SEC}s 를 넘습니다. start/end 구간을 지정하세요.")
+            mp3_path, _ = download_audio(youtube_url, video_id, video_filename, section=section, stats=download_stats)
+            origin = section_origin(section)  # 받은 파일의 0초 = 원본의 origin초
+            # 영상은 얼굴 인식용 프레임 추출에만 쓰이므로, 프레임이 실제로 필요할 때
+            # 저해상도 프록시 영상 스트림만 받는다 (화자 1명 작업은 영상 I/O 없음)
+            mp4_path = LazyVideo(youtube_url, os.path.join("downloads", video_filename + ".mp4"), section=section, proxy=True, stats=download_stats)
+        print(f"[DEBUG] origin={origin}, video={mp4_path!r}")
         
-        # start~end 구간만 잘리기
+        # start~end 구간만 잘리기 (받은 파일 기준으로 origin만큼 당겨서 자름)
         if start is not None and end is not None:
             print(f"🔪 오디오 {start}~{end}초 구간만 추출합니다.")
-            audio = AudioSegment.from_file(mp3_path)
-            trimmed = audio[int(start * 1000):int(end * 1000)]  # ms 단위
-            trimmed_path = os.path.join("downloads", f"{video_filename}_trimmed_{start}_{end}.mp3")
-            trimmed.export(trimmed_path, format="mp3")
-            mp3_path = trimmed_path  # 이후 분리/분석에 이 파일 사용
+            # ffmpeg 탐색으로 구간만 디코딩해서 WAV(무손실 PCM)로 저장 → Demucs 전에 mp3 재인코딩 없음
+            trimmed_path = os.path.join("downloads", f"{video_filename}_trimmed_{start}_{end}.wav")
+            trim_audio(mp3_path, trimmed_path, start - origin, end - origin)
+            mp3_path = trimmed_path  # 이후 분리/분석에 이 파일 사용 (Demucs 출력 폴더명은 stem 기준이라 그대로)
             print(f"✅ 잘린 오디오 저장: {trimmed_path}")
 
-        if not os.path.exists(mp4_path):
-            download_video(youtube_url, mp4_path)
-        else:
-            print(f"✅ 영상 파일 이미 존재: {mp4_path}")
-
         # 2-1  Demucs로 보컬 추출
+        # 스트리밍 분리 + 스트리밍 전사: 분리가 끝난 보컬 조각부터 바로 전사 (vocals.wav 는 루프가 끝나면 완성됨)
+        separate_while_transcribing = ASR_STREAMING and DEMUCS_STREAMING and DEMUCS_IN_PROCESS and not DEMUCS_VAD_GATE
         start_time = time.time()
-        print(f"🕒 보컬 추출 측정시작")
-        vocal_path = separate_vocals(mp3_path)
-        elapsed = time.time() - start_time  # ⏱️ 소요 시간
-        print(f"🕒 보컬 추출 전처리 소요 시간: {elapsed:.2f}초")
-
-        start_time = time.time()
-        print(f"🕒 자막 추출 측정시작")
-        segments = transcribe_audio(vocal_path)
-        print("🗣️ 정밀분석:")
-        for seg in segments:
-            print(f"[{seg.get('start', 0):.1f}s - {seg.get('end', 0):.1f}s]: {seg.get('text', '')}")
-        
-        # 문장 간 텀을 앞 문장에 붙이기
-        print("🔧 문장 간 텀을 앞 문장에 붙이는 중...")
-        segments = adjust_segment_boundaries_forward(segments)
-        print("🗣️ 텀 조정 후:")
-        for seg in segments:
-            print(f"[{seg.get('start', 0):.1f}s - {seg.get('end', 0):.1f}s]: {seg.get('text', '')}")
+        if separate_while_transcribing:
+            vocal_path = vocals_output_path(mp3_path)
+            segment_source = iter_transcribe_separated(separate_vocals_stream(mp3_path))
+            print("🕒 보컬 추출 + 자막 추출 측정시작 (분리된 조각부터 전사)")
+        else:
+            print(f"🕒 보컬 추출 측정시작")
+            vocal_path = separate_vocals(mp3_path)
+            elapsed = time.time() - start_time  # ⏱️ 소요 시간
+            print(f"🕒 보컬 추출 전처리 소요 시간: {elapsed:.2f}초")
+
+            start_time = time.time()
+            print(f"🕒 자막 추출 측정시작")
+            segment_source = iter_transcribe_segments(vocal_path) if ASR_STREAMING else None
+        if ASR_STREAMING:
+            # 확정된 문장부터 받아서 텀 조정/출력 포맷팅을 전사와 겹쳐 진행
+            segments, word_list = [], []
+            print("🗣️ 정밀분석(스트리밍, 텀 조정 후):")
+            for seg in iter_adjust_segment_boundaries_forward(segment_source):
+                print(f"[{seg.get('start', 0):.1f}s - {seg.get('end', 0):.1f}s]: {seg.get('text', '')}")
+                segments.append(seg)
+                word_list.extend(format_segments_for_output([seg]))
+        else:
+            segments = transcribe_audio(vocal_path)
+            print("🗣️ 정밀분석:")
+            for seg in segments:
+                print(f"[{seg.get('start', 0):.1f}s - {seg.get('end', 0):.1f}s]: {seg.get('text', '')}")
+            
+            # 문장 간 텀을 앞 문장에 붙이기
+            print("🔧 문장 간 텀을 앞 문장에 붙이는 중...")
+            segments = adjust_segment_boundaries_forward(segments)
+            print("🗣️ 텀 조정 후:")
+            for seg in segments:
+                print(f"[{seg.get('start', 0):.1f}s - {seg.get('end', 0):.1f}s]: {seg.get('text', '')}")
+            word_list = None
         
         selected = segments[:]
 
@@ -149,7 +195,8 @@ def main_pipeline(youtube_url: str, movie_name: Optional[str] = None, actor_name
             print("❌ No speech detected.")
             return None
 
-        word_list = format_segments_for_output(segments)
+        if word_list is None:
+            word_list = format_segments_for_output(segments)
 
         # === 화자 수가 1명일 때: 화자분리/이미지 추출 등 스킵 ===
         if n_speakers == 1:
@@ -284,16 +331,23 @@ def main_pipeline(youtube_url: str, movie_name: Optional[str] = None, actor_name
         pprint(speaker_diarization_data)
         print("여기 출력값은 정확히 화자분리를 위한 문장 타임 스템프로 활용된다.")
 
-        extract_frames_per_segment(mp4_path, speaker_diarization_data, output_folder="tmp_frames")
-        print("✅ 세그먼트별 프레임 이미지 추출 완료: tmp_frames/")
-
         from speaker_diarization.who_is_speaker import analyze_speakers_with_clustering, print_speaker_dialogue
         from speaker_diarization.voice_analyzer import analyze_voice_speakers_with_clustering
-        face_labels, _ = analyze_speakers_with_clustering(
-            len(speaker_diarization_data),
-            folder="tmp_frames",
-            n_speakers=2
-        )
+        if mp4_path is None:
+            # 영상 스트림이 없는 로컬 오디오 소스: 얼굴 분석 없이 음성 기반으로만 화자분리
+            print("⏭️ 영상이 없어 프레임 추출/얼굴 기반 화자분리를 건너뜁니다.")
+            face_labels = ["UNKNOWN"] * len(speaker_diarization_data)
+        else:
+            # 세그먼트 시간은 잘린 오디오(start) 기준 → 영상 파일 기준으로 (start - origin)만큼 밀어서 추출
+            frame_offset = float(start) - origin if start is not None else 0.0
+            extract_frames_per_segment(mp4_path, speaker_diarization_data, output_folder="tmp_frames", time_offset=frame_offset)
+            print("✅ 세그먼트별 프레임 이미지 추출 완료: tmp_frames/")
+
+            face_labels, _ = analyze_speakers_with_clustering(
+                len(speaker_diarization_data),
+                folder="tmp_frames",
+                n_speakers=2
+            )
         n_speakers = 0
         # FastAPI에서는 입력 대신 기본값/추론 사용
         n_speakers = len(set([l for l in face_labels if l != "UNKNOWN"]))
@@ -406,6 +460,11 @@ def main_pipeline(youtube_url: str, movie_name: Optional[str] = None, actor_name
         print(f"[DEBUG] demucs_dir: {demucs_dir}")
         print(f"[DEBUG] vocal_path: {vocal_path}")
         print(f"[DEBUG] bgvoice_path: {bgvoice_path}")
+        # 모든 화자의 토큰 오디오를 한 번에 생성 (vocals/no_vocals 각각 한 번만 디코딩)
+        if os.path.exists(vocal_path) and os.path.exists(bgvoice_path):
+            split_audio_by_tokens([vocal_path, bgvoice_path], speakers, video_filename)
+        else:
+            print(f"[ERROR] split_audio_by_tokens에 넘길 파일이 부족합니다: {vocal_path}, {bgvoice_path}")
         for s3_data in speakers:
             actor = s3_data["actor"]
             # Demucs 분리 폴더 자동 탐색
@@ -437,13 +496,8 @@ def main_pipeline(youtube_url: str, movie_name: Optional[str] = None, actor_name
                         "token_id": s3_data["token_id"]
                     }
                 )
-            # split_audio_by_token에 전체 구간 파일 경로 전달
-            if vocal_path is not None and bgvoice_path is not None and os.path.exists(vocal_path) and os.path.exists(bgvoice_path):
-                split_audio_by_token([vocal_path, bgvoice_path], s3_data, video_filename)
-            else:
-                print(f"[ERROR] split_audio_by_token에 넘길 파일이 부족합니다: {vocal_path}, {bgvoice_path}")
             segments = s3_data["segments"]
-            vocal_path_token = f"./split_tokens/vocals_{video_filename}_token_{s3_data['token_id']}.mp3"
+            vocal_path_token = f"./split_tokens/vocals_{video_filename}_token_{s3_data['token_id']}.wav"
             export_segments_for_mfa(
                 vocal_path=vocal_path_token,
                 segments=segments,
@@ -578,6 +632,11 @@ def main_pipeline(youtube_url: str, movie_name: Optional[str] = None, actor_name
         print("❌ main_pipeline 내부 예외 발생:", e)
         traceback.print_exc()
         raise
+    finally:
+        if isinstance(mp4_path, LazyVideo):
+            mp4_path.record_savings()  # 중복 제거한 오디오 재전송, 프레임을 안 써서 받지 않은 영상 스트림을 절약분으로 집계
+        report_download_stats(download_stats)
+        release_audio_stores(audio_job)  # 이 작업의 공유 오디오 저장소 통계 출력 + 임시 PCM 정리
 
 # 기존 main()은 FastAPI 등에서 필요 없으므로 생략하거나, 아래처럼 남겨둘 수 있습니다.
 if __name__ == "__main__":
@@ -588,32 +647,68 @@ if __name__ == "__main__":
         try:
             with open("data.json", encoding="utf-8") as f:
                 data = json.load(f)
-            for item in data:
-                url = item["url"]
-                start = item["start"]
-                end = item["end"]
-                n_speakers = item["n_speakers"]
-                token_name = item.get("token_name", "")
-
-                if n_speakers == 1:
-                    actor = item["actor"]
-                    print(f"\n==== {actor} ({url}) {start}~{end}s, 화자수: {n_speakers} ====")
-                    main_pipeline(url, actor_name=actor, start=start, end=end, n_speakers=n_speakers, token_name=token_name)
-                elif n_speakers == 2:
-                    actor1 = item["actor1"]
-                    actor2 = item["actor2"]
-                    print(f"\n==== {actor1}, {actor2} ({url}) {start}~{end}s, 화자수: {n_speakers} ====")
-                    # 두 명의 이름을 콤마로 연결해서 넘김
-                    main_pipeline(
-                        url,
-                        actor_name=f"{actor1},{actor2}",
-                        start=start,
-                        end=end,
-                        n_speakers=n_speakers,
-                        token_name=token_name
-                    )
-                else:
-                    print(f"지원하지 않는 화자 수: {n_speakers}")
+
+            # 현재 작업이 CPU 단계를 도는 동안 다음 작업들의 미디어를 미리 캐시에 받아 둔다
+            scheduler = DownloadScheduler()
+
+            def prefetch_key(item):
+                section = (item["start"], item["end"]) if item.get("start") is not None and item.get("end") is not None else None
+                return (item["url"], section)
+
+            def schedule_prefetch(idx):
+                if idx < len(data):
+                    url, section = prefetch_key(data[idx])
+                    if is_remote_url(url):
+                        # 화자 1명 작업은 영상을 쓰지 않으므로 오디오만 미리 받는다
+                        need_video = data[idx].get("n_speakers") != 1
+                        scheduler.submit((url, section), url, prefetch_media, url, extract_video_id(url), section, proxy=True, video=need_video)
+                    elif is_object_store_key(url):
+                        scheduler.submit((url, section), url, fetch_object_store, url)
+                    # 로컬 파일은 미리 받을 것이 없다
+
+            completed = False
+            try:
+                for idx in range(DOWNLOAD_PREFETCH_AHEAD + 1):
+                    schedule_prefetch(idx)
+
+                for i, item in enumerate(data):
+                    schedule_prefetch(i + DOWNLOAD_PREFETCH_AHEAD)
+                    url = item["url"]
+                    start = item["start"]
+                    end = item["end"]
+                    n_speakers = item["n_speakers"]
+                    token_name = item.get("token_name", "")
+
+                    # 이 작업의 미디어가 준비될 때까지 대기 (재시도까지 실패하면 이 작업만 건너뜀)
+                    try:
+                        scheduler.wait(prefetch_key(item))
+                    except Exception as e:
+                        print(f"❌ 미디어 준비 실패, 작업 건너뜀: {url} → {e}")
+                        continue
+
+                    if n_speakers == 1:
+                        actor = item["actor"]
+                        print(f"\n==== {actor} ({url}) {start}~{end}s, 화자수: {n_speakers} ====")
+                        main_pipeline(url, actor_name=actor, start=start, end=end, n_speakers=n_speakers, token_name=token_name)
+                    elif n_speakers == 2:
+                        actor1 = item["actor1"]
+                        actor2 = item["actor2"]
+                        print(f"\n==== {actor1}, {actor2} ({url}) {start}~{end}s, 화자수: {n_speakers} ====")
+                        # 두 명의 이름을 콤마로 연결해서 넘김
+                        main_pipeline(
+                            url,
+                            actor_name=f"{actor1},{actor2}",
+                            start=start,
+                            end=end,
+                            n_speakers=n_speakers,
+                            token_name=token_name
+                        )
+                    else:
+                        print(f"지원하지 않는 화자 수: {n_speakers}")
+                completed = True
+            finally:
+                # 예외로 빠져나가면 아직 시작 안 한 선다운로드는 취소 (남은 스레드 때문에 프로세스가 멈추지 않도록)
+                scheduler.shutdown(wait=completed)
         except FileNotFoundError:
             print("data.json 파일이 없습니다. 기존 input() 방식으로 실행합니다.")
             # youtube_url = input("📺 URL 입력을 바랍니다.: ").strip()
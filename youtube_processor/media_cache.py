@@ -0,0 +1,404 @@
+"""
+다운로드 미디어 캐시 모듈
+
+영상 id + yt-dlp 포맷 셀렉터(+구간)로 키를 만들어 받은 오디오(mka)/영상(mp4)을 보관한다.
+같은 영상에서 토큰을 여러 번 자를 때 매번 다시 받지 않도록 하기 위함.
+
+- 용량 상한(MEDIA_CACHE_MAX_BYTES)을 넘으면 가장 오래 안 쓴 항목부터 삭제 (LRU)
+- 파일/인덱스 모두 임시 파일에 쓴 뒤 os.replace 로 교체 (중간에 죽어도 깨진 항목이 남지 않음)
+- 인덱스는 파일 lock 을 잡고 디스크에서 다시 읽은 뒤 고쳐 쓴다 (같은 캐시를 쓰는 서버/CLI 프로세스끼리 항목을 잃지 않음)
+- 적중/실패/삭제 횟수 통계를 인덱스에 누적
+- 저장 시 sha256/크기/수정 시각을 기록하고, 꺼낼 때는 크기/수정 시각만 확인
+  (수정 시각이 바뀐 경우에만 lock 밖에서 sha256 을 다시 계산, 깨진 항목은 버리고 다시 받음)
+- 받다가 끊긴 파일(.part)과 시도 기록은 partial/ 에 남겨 다음 시도에서 이어받는다
+
+yt-dlp 메타데이터(info dict)도 영상 id 기준으로 TTL 동안 보관한다 (InfoCache).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from config import MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES, INFO_CACHE_TTL_SEC, MEDIA_CACHE_VERIFY_HASH
+
+
+def make_cache_key(video_id, format_selector, section=None):
+    """
+    영상 id + 포맷 셀렉터 + 구간으로 캐시 키(sha256 앞 32자리) 생성
+    """
+    section_str = "full" if section is None else f"{float(section[0]):.3f}-{float(section[1]):.3f}"
+    raw = f"{video_id}|{format_selector}|{section_str}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class _FileLock:
+    """
+    프로세스 간 배타 lock (POSIX: fcntl.flock, Windows: msvcrt.locking), 재진입 불가
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                try:
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK 은 약 10초 뒤 포기하므로 잡힐 때까지 다시 시도
+        else:
+            import fcntl
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if os.name == "nt":
+                import msvcrt
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class MediaCache:
+    INDEX_NAME = "index.json"
+    LOCK_NAME = ".index.lock"
+
+    def __init__(self, root=MEDIA_CACHE_DIR, max_bytes=MEDIA_CACHE_MAX_BYTES, verify_hash=MEDIA_CACHE_VERIFY_HASH):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.verify_hash = verify_hash
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._index_lock():
+            self._index = self._load_index()
+
+    @property
+    def staging_dir(self) -> Path:
+        # 다운로드 중인 파일을 두는 곳 (reset_folder 대상이 아님)
+        return self.root / "partial"
+
+    # ───────────────────────── 인덱스 ─────────────────────────
+    def _index_path(self) -> Path:
+        return self.root / self.INDEX_NAME
+
+    def _load_index(self) -> dict:
+        index = {"entries": {}, "stats": {"hits": 0, "misses": 0, "evictions": 0}}
+        path = self._index_path()
+        if path.exists():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    loaded = json.load(f)
+                index["entries"].update(loaded.get("entries", {}))
+                index["stats"].update(loaded.get("stats", {}))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 캐시 인덱스 로드 실패, 새로 만듭니다: {e}")
+        # 인덱스에는 있는데 실제 파일이 없는 항목 정리
+        index["entries"] = {
+            name: entry for name, entry in index["entries"].items()
+            if (self.root / name).exists()
+        }
+        return index
+
+    def _save_index(self):
+        tmp_path = self.root / f".{self.INDEX_NAME}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._index_path())
+
+    @contextmanager
+    def _index_lock(self):
+        with self._lock, _FileLock(self.root / self.LOCK_NAME):
+            yield
+
+    @contextmanager
+    def _transaction(self):
+        """
+        스레드/파일 lock 을 잡고 디스크의 최신 인덱스를 다시 읽어 self._index 로 두고, 끝나면 저장
+        """
+        with self._index_lock():
+            self._index = self._load_index()
+            yield self._index
+            self._save_index()
+
+    # ───────────────────────── 조회/저장 ─────────────────────────
+    def get(self, key, ext) -> Optional[Path]:
+        """
+        캐시에 있으면 경로를 돌려주고 마지막 사용 시각을 갱신, 없으면 None
+        """
+        name = f"{key}.{ext}"
+        path = self.root / name
+        with self._transaction() as index:
+            entry = index["entries"].get(name)
+            state = self._quick_check(path, entry)
+            if state == "ok":
+                return self._hit(index, entry, path)
+            if state != "rehash":
+                self._drop(index, name, path, corrupt=state == "corrupt")
+                return None
+            expected = entry["sha256"]
+
+        # 크기는 같은데 수정 시각이 바뀜 → 파일 전체 sha256 은 lock 밖에서 (다른 조회를 막지 않도록)
+        try:
+            mtime = path.stat().st_mtime
+            ok = file_sha256(path) == expected
+        except FileNotFoundError:
+            ok = False
+        with self._transaction() as index:
+            entry = index["entries"].get(name)
+            if entry is None or entry.get("sha256") != expected:
+                # 해시를 계산하는 사이에 다른 작업이 항목을 바꾸거나 지웠다
+                index["stats"]["misses"] += 1
+                return None
+            if not ok:
+                self._drop(index, name, path, corrupt=True)
+                return None
+            entry["mtime"] = mtime
+            return self._hit(index, entry, path)
+
+    def put(self, key, ext, src_path, move=False) -> Path:
+        """
+        src_path 파일을 캐시에 원자적으로 저장하고 경로를 반환
+        move=True 면 복사 대신 이동 (staging 디렉토리에서 받은 파일용)
+        """
+        name = f"{key}.{ext}"
+        dest = self.root / name
+        tmp_path = self.root / f".{name}.{uuid.uuid4().hex}.tmp"
+        if move:
+            shutil.move(str(src_path), tmp_path)
+        else:
+            shutil.copy2(src_path, tmp_path)
+        digest = file_sha256(tmp_path)
+        os.replace(tmp_path, dest)
+        stat = dest.stat()
+
+        with self._transaction() as index:
+            index["entries"][name] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "sha256": digest,
+                "last_access": time.time(),
+            }
+            self._evict(keep=name)
+        return dest
+
+    def _quick_check(self, path, entry) -> str:
+        """
+        stat 만으로 하는 적중 판정: "missing" | "corrupt" | "ok" | "rehash"(sha256 확인 필요)
+        """
+        if entry is None:
+            return "missing"
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return "missing"
+        if stat.st_size != entry.get("size"):
+            return "corrupt"
+        if not self.verify_hash or not entry.get("sha256") or stat.st_mtime == entry.get("mtime"):
+            return "ok"
+        return "rehash"
+
+    @staticmethod
+    def _hit(index, entry, path) -> Path:
+        entry["last_access"] = time.time()
+        index["stats"]["hits"] += 1
+        return path
+
+    def _drop(self, index, name, path, corrupt=False):
+        """
+        항목을 인덱스에서 빼고 miss 로 센다. corrupt 면 파일도 지운다 (_transaction 안에서 호출)
+        """
+        if corrupt:
+            print(f"⚠️ 캐시 파일 검증 실패, 다시 받습니다: {path.name}")
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            index["stats"]["corrupt"] = index["stats"].get("corrupt", 0) + 1
+        index["entries"].pop(name, None)
+        index["stats"]["misses"] += 1
+
+    # ───────────────────────── 이어받기 상태 ─────────────────────────
+    def _staging_state_path(self, key) -> Path:
+        return self.staging_dir / f"{key}.state.json"
+
+    def load_staging_state(self, key) -> dict:
+        """
+        끊긴 다운로드의 시도 기록 (attempts, last_error, updated_at)
+        """
+        path = self._staging_state_path(key)
+        if path.exists():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {"attempts": 0, "last_error": None, "updated_at": None}
+
+    def save_staging_state(self, key, state):
+        path = self._staging_state_path(key)
+        tmp_path = self.staging_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({**state, "updated_at": time.time()}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def clear_staging(self, key):
+        """
+        완료된 다운로드의 시도 기록과 남은 조각 파일 정리
+        """
+        for leftover in self.staging_dir.glob(f"{key}*"):
+            if leftover.is_file():
+                leftover.unlink()
+
+    def _evict(self, keep=None):
+        """
+        총 용량이 max_bytes 이하가 될 때까지 가장 오래 안 쓴 항목부터 삭제 (_transaction 안에서 호출)
+        """
+        entries = self._index["entries"]
+        total = sum(e["size"] for e in entries.values())
+        for name in sorted(entries, key=lambda n: entries[n]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                (self.root / name).unlink()
+            except FileNotFoundError:
+                pass
+            total -= entries.pop(name)["size"]
+            self._index["stats"]["evictions"] += 1
+            print(f"🗑️ 캐시 삭제(LRU): {name}")
+
+    @staticmethod
+    def materialize(cached_path, dest_path) -> str:
+        """
+        캐시 파일을 작업 경로(downloads/...)에 하드링크(불가하면 복사)로 꺼낸다.
+        작업 폴더를 지워도 캐시 원본은 남는다.
+        """
+        dest_path = Path(dest_path)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        if dest_path.exists():
+            dest_path.unlink()
+        try:
+            os.link(cached_path, dest_path)
+        except OSError:
+            shutil.copy2(cached_path, dest_path)
+        return str(dest_path)
+
+    def stats(self) -> dict:
+        with self._index_lock():
+            self._index = self._load_index()
+            entries = self._index["entries"]
+            return {
+                **self._index["stats"],
+                "entries": len(entries),
+                "total_bytes": sum(e["size"] for e in entries.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+
+class InfoCache:
+    """
+    yt-dlp 메타데이터(info dict) 캐시 (영상 id 기준, TTL 만료)
+
+    포맷 목록, 길이, 선택된 스트림 URL 이 들어있어서 포맷 선택/길이 확인/구간 다운로드를
+    추출 왕복 없이 할 수 있다. 스트림 URL 은 몇 시간 뒤 만료되므로 TTL 을 그보다 짧게 둔다.
+    """
+
+    def __init__(self, root=MEDIA_CACHE_DIR / "info", ttl=INFO_CACHE_TTL_SEC):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._memory = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, video_id) -> Path:
+        return self.root / f"{video_id}.json"
+
+    def get(self, video_id) -> Optional[dict]:
+        with self._lock:
+            record = self._memory.get(video_id)
+            if record is None and self._path(video_id).exists():
+                try:
+                    with open(self._path(video_id), encoding="utf-8") as f:
+                        record = json.load(f)
+                except (OSError, ValueError):
+                    record = None
+            if record is None or time.time() - record["fetched_at"] > self.ttl:
+                self._memory.pop(video_id, None)
+                self.misses += 1
+                return None
+            self._memory[video_id] = record
+            self.hits += 1
+            return record["info"]
+
+    def put(self, video_id, info):
+        record = {"fetched_at": time.time(), "info": info}
+        tmp_path = self.root / f".{video_id}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        with self._lock:
+            os.replace(tmp_path, self._path(video_id))
+            self._memory[video_id] = record
+
+    def invalidate(self, video_id):
+        with self._lock:
+            self._memory.pop(video_id, None)
+            try:
+                self._path(video_id).unlink()
+            except FileNotFoundError:
+                pass
+
+
+_media_cache = None
+_media_cache_lock = threading.Lock()
+_info_cache = None
+
+
+def get_media_cache() -> MediaCache:
+    """
+    프로세스 전역 MediaCache 인스턴스
+    """
+    global _media_cache
+    with _media_cache_lock:
+        if _media_cache is None:
+            _media_cache = MediaCache()
+        return _media_cache
+
+
+def get_info_cache() -> InfoCache:
+    """
+    프로세스 전역 InfoCache 인스턴스
+    """
+    global _info_cache
+    with _media_cache_lock:
+        if _info_cache is None:
+            _info_cache = InfoCache()
+        return _info_cache
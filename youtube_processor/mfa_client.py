@@ -0,0 +1,148 @@
+"""
+MFA 정렬 상주 워커 클라이언트
+
+컨테이너 하나(MFA_DAEMON_CONTAINER)에 mfa_daemon.py 를 띄워 두고 정렬 작업을 로컬 소켓으로 보낸다.
+- 워커가 응답하지 않으면 (MFA_DAEMON_AUTOSTART) 컨테이너를 새로 띄우고 워커가 응답할 때까지 기다린다
+- 한 번 띄운 컨테이너는 계속 살아 있어서 다음 작업부터는 컨테이너 기동/MFA import 비용이 없다
+- 작업마다 그 작업의 output 폴더에 만들어진 TextGrid 경로(호스트 기준)를 돌려준다
+- 작업이 MFA_JOB_TIMEOUT 안에 끝나지 않으면 컨테이너를 지워 진행 중인 정렬을 끝내고 MFAAlignError 를 던진다
+  (버려진 작업이 워커를 계속 붙잡거나 다음 작업과 겹치지 않도록, 다음 작업 때 새로 띄움.
+   같은 작업을 docker run 으로 다시 돌리면 또 그만큼 막히므로 대체 실행하지 않는다)
+워커를 쓸 수 없으면 MFADaemonUnavailable 을 던지고, utils.run_mfa_align 이 docker run 1회 실행으로 대체한다.
+"""
+
+import json
+import socket
+import subprocess
+import time
+import uuid
+from pathlib import Path, PurePosixPath
+
+from config import (
+    MFA_IMAGE, MFA_DAEMON_HOST, MFA_DAEMON_PORT, MFA_DAEMON_CONTAINER, MFA_DAEMON_AUTOSTART,
+    MFA_DAEMON_START_TIMEOUT, MFA_JOB_TIMEOUT,
+)
+
+CONTAINER_DATA_DIR = "/data"
+DAEMON_SCRIPT = Path(__file__).parent / "mfa_daemon.py"
+
+
+class MFADaemonUnavailable(RuntimeError):
+    pass
+
+
+class MFAAlignError(RuntimeError):
+    pass
+
+
+def host_mount_path(path: Path) -> str:
+    """
+    docker -v 에 넘길 호스트 경로 (Windows 경로는 /c/... 형태로)
+    """
+    return str(Path(path).resolve()).replace('C:', '/c').replace('\\', '/')
+
+
+def _request(payload: dict, timeout: float) -> dict:
+    with socket.create_connection((MFA_DAEMON_HOST, MFA_DAEMON_PORT), timeout=timeout) as sock:
+        sock.settimeout(timeout)
+        sock.sendall((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("MFA 워커가 응답 없이 연결을 끊었습니다")
+    return json.loads(line.decode("utf-8"))
+
+
+def ping(timeout: float = 2.0):
+    """
+    워커 상태 ({"jobs", "uptime", "engine"}) 반환, 응답이 없으면 None
+    """
+    try:
+        response = _request({"cmd": "ping"}, timeout)
+    except (OSError, ValueError):
+        return None
+    return response if response.get("ok") else None
+
+
+def stop_daemon():
+    """
+    상주 컨테이너를 지운다 (진행 중인 정렬 작업도 같이 끝남)
+    """
+    subprocess.run(["docker", "rm", "-f", MFA_DAEMON_CONTAINER], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def start_daemon(mfa_data_path: Path):
+    """
+    상주 컨테이너를 (다시) 띄운다. 같은 이름의 멈춘 컨테이너가 있으면 지우고 새로 만든다.
+    """
+    stop_daemon()
+    command = [
+        "docker", "run", "-d", "--name", MFA_DAEMON_CONTAINER, "--platform", "linux/amd64",
+        "-p", f"127.0.0.1:{MFA_DAEMON_PORT}:{MFA_DAEMON_PORT}",
+        "-v", f"{host_mount_path(mfa_data_path)}:{CONTAINER_DATA_DIR}",
+        "-v", f"{host_mount_path(DAEMON_SCRIPT)}:/app/mfa_daemon.py:ro",
+        MFA_IMAGE,
+        "python", "/app/mfa_daemon.py", "--port", str(MFA_DAEMON_PORT),
+    ]
+    print(f"🚀 MFA 상주 컨테이너 시작: {MFA_DAEMON_CONTAINER}")
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+
+
+def ensure_daemon(mfa_data_path: Path) -> dict:
+    """
+    워커가 떠 있는지 확인하고, 없으면 띄운 뒤 응답할 때까지 기다린다
+    """
+    status = ping()
+    if status is not None:
+        return status
+    if not MFA_DAEMON_AUTOSTART:
+        raise MFADaemonUnavailable(f"MFA 워커 응답 없음: {MFA_DAEMON_HOST}:{MFA_DAEMON_PORT}")
+    try:
+        start_daemon(mfa_data_path)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise MFADaemonUnavailable(f"MFA 상주 컨테이너를 띄우지 못했습니다: {e}") from e
+
+    deadline = time.time() + MFA_DAEMON_START_TIMEOUT
+    while time.time() < deadline:
+        status = ping()
+        if status is not None:
+            print(f"✅ MFA 워커 준비 완료 ({status.get('engine')})")
+            return status
+        time.sleep(1.0)
+    raise MFADaemonUnavailable(f"MFA 워커가 {MFA_DAEMON_START_TIMEOUT}초 안에 준비되지 않았습니다")
+
+
+def align(mfa_data_path: Path, corpus: str = "corpus", output: str = "mfa_output", timeout: float = MFA_JOB_TIMEOUT,
+          job_id: str = None) -> list:
+    """
+    mfa_data_path/corpus 를 정렬해 mfa_data_path/output 에 TextGrid 를 쓴다 (둘 다 mfa_data_path 기준 상대 경로).
+    output 에 만들어진 TextGrid 의 호스트 경로 목록을 반환.
+    """
+    ensure_daemon(mfa_data_path)
+    job_id = job_id or uuid.uuid4().hex[:8]
+    t0 = time.time()
+    try:
+        response = _request({
+            "cmd": "align",
+            "job_id": job_id,
+            "corpus": f"{CONTAINER_DATA_DIR}/{PurePosixPath(corpus)}",
+            "output": f"{CONTAINER_DATA_DIR}/{PurePosixPath(output)}",
+        }, timeout)
+    except socket.timeout as e:
+        # 워커는 아직 이 작업을 정렬 중이므로 컨테이너를 지워 끝낸다 (다음 작업 때 새로 띄움)
+        print(f"⚠️ MFA 정렬 시간 초과 (job={job_id}, {timeout}초), 상주 컨테이너를 재시작합니다")
+        stop_daemon()
+        raise MFAAlignError(f"MFA 정렬 시간 초과 (job={job_id}, {timeout}초)") from e
+    except (OSError, ValueError) as e:
+        raise MFADaemonUnavailable(f"MFA 워커 통신 실패: {e}") from e
+    if not response.get("ok"):
+        raise MFAAlignError(f"MFA 정렬 실패 (job={job_id}): {response.get('error')}")
+
+    textgrids = [
+        Path(mfa_data_path) / PurePosixPath(p).relative_to(CONTAINER_DATA_DIR)
+        for p in response.get("textgrids", [])
+    ]
+    timings = response.get("timings")
+    print(f"🕒 MFA 정렬 (상주 워커): job={job_id}, TextGrid {len(textgrids)}개, {time.time() - t0:.2f}초"
+          + (f" (setup {timings['setup_sec']}초 / align {timings['align_sec']}초 / export {timings['export_sec']}초)" if timings else ""))
+    return textgrids
@@ -0,0 +1,199 @@
+"""
+MFA(Montreal Forced Aligner) 정렬 상주 워커 — MFA 컨테이너 안에서 실행된다
+
+run_mfa_align 이 호출마다 `docker run --rm ... mfa align --clean` 으로 컨테이너를 새로 띄우던 것을
+컨테이너 하나를 계속 살려두고, 이 워커가 로컬 소켓으로 정렬 작업을 받아 처리하도록 바꾼다.
+
+- 시작 시 MFA 를 한 번 import 하고 음향 모델 압축을 한 번만 풀어 둔다 (작업마다 컨테이너 기동/파이썬·MFA import,
+  모델 압축 해제 비용 X). PretrainedAligner 에는 풀어 둔 폴더를 넘겨 작업마다 다시 풀지 않게 한다
+- 사전은 작업마다 다시 읽힌다: MFA 3 은 발음 사전을 corpus 별 DB 에 넣어 쓰고, 사전을 유지한 채 corpus 만
+  바꾸는 공개 API 가 없다. 대신 작업마다 setup(사전 + corpus + 특징 추출) / align / export 시간을 재서
+  응답과 ping 에 싣는다 (남는 비용을 보이게)
+- 작업이 끝나면 그 작업의 MFA 임시 폴더/DB 를 지운다 (작업마다 corpus 이름이 달라 쌓이지 않도록)
+- 작업은 한 번에 하나씩 처리 (MFA 임시 폴더/DB 를 공유하므로 순차 실행)
+- 작업마다 corpus/output 폴더가 따로 온다 (클라이언트가 만듦). output 에 있는 TextGrid 가 모두 이번 작업 결과
+- 클라이언트는 시간 초과 시 컨테이너를 지워서 진행 중인 작업을 끝낸다 (다음 작업 때 새로 띄움)
+- 프로토콜: TCP 한 줄 JSON 요청 → 한 줄 JSON 응답
+    {"cmd": "align", "job_id": "...", "corpus": "/data/jobs/corpus_<id>", "output": "/data/jobs/output_<id>"}
+    → {"ok": true, "job_id": "...", "textgrids": ["/data/jobs/output_<id>/xxx.TextGrid", ...], "elapsed": 1.2}
+       (API 경로면 "timings": {"setup_sec", "align_sec", "export_sec"} 도 포함)
+    {"cmd": "ping"} → {"ok": true, "jobs": 3, "uptime": 120.0, "engine": "api" | "cli",
+                       "model_prepare_sec": 4.1, "timings": {"setup_sec": ..., ...}}  # timings 는 API 작업 평균
+- MFA Python API 를 쓸 수 없는 버전이면 컨테이너 안에서 `mfa align` CLI 로 처리 (컨테이너 기동 비용은 여전히 없음)
+
+컨테이너 실행 예:
+    docker run -d --name mfa-aligner -p 127.0.0.1:8765:8765 -v <syncdata/mfa>:/data \
+        -v <youtube_processor/mfa_daemon.py>:/app/mfa_daemon.py \
+        mmcauliffe/montreal-forced-aligner:latest python /app/mfa_daemon.py --port 8765
+"""
+
+import argparse
+import json
+import socketserver
+import subprocess
+import threading
+import time
+import traceback
+from pathlib import Path
+
+# API(PretrainedAligner 인자)와 CLI(--옵션)에 같은 값을 넘긴다
+ALIGN_OPTIONS = {"beam": 100, "retry_beam": 400, "phone_boundary_method": "strict"}
+OUTPUT_FORMAT = "long_textgrid"
+
+
+class Aligner:
+    def __init__(self, dictionary_path, acoustic_model_path):
+        self.dictionary_path = str(dictionary_path)
+        self.acoustic_model_path = str(acoustic_model_path)
+        self.lock = threading.Lock()
+        self.jobs = 0
+        self.started_at = time.time()
+        self.model_prepare_sec = 0.0
+        self._timing_totals = {"setup_sec": 0.0, "align_sec": 0.0, "export_sec": 0.0}
+        self._timed_jobs = 0
+        self._api = self._load_api()
+        self._model_dir = self._prepare_acoustic_model() if self._api is not None else self.acoustic_model_path
+
+    @property
+    def engine(self):
+        return "api" if self._api is not None else "cli"
+
+    def _load_api(self):
+        """
+        MFA Python API 를 미리 import (실패하면 CLI 로 처리)
+        """
+        try:
+            t0 = time.time()
+            from montreal_forced_aligner import config as mfa_config
+            from montreal_forced_aligner.alignment import PretrainedAligner
+            mfa_config.FINAL_CLEAN = True  # cleanup() 때 작업의 임시 폴더/DB 삭제
+            print(f"✅ MFA Python API 로드 완료 ({time.time() - t0:.2f}초)", flush=True)
+            return PretrainedAligner
+        except Exception as e:
+            print(f"⚠️ MFA Python API 를 쓸 수 없어 CLI 로 처리합니다: {e}", flush=True)
+            return None
+
+    def _prepare_acoustic_model(self) -> str:
+        """
+        음향 모델 압축을 한 번 풀어 두고 그 폴더를 반환 (이미 폴더면 그대로, 실패하면 원래 경로)
+        """
+        try:
+            t0 = time.time()
+            from montreal_forced_aligner.models import AcousticModel
+            model = AcousticModel(self.acoustic_model_path)
+            self.model_prepare_sec = time.time() - t0
+            print(f"✅ 음향 모델 준비 완료: {model.dirname} ({self.model_prepare_sec:.2f}초)", flush=True)
+            return str(model.dirname)
+        except Exception as e:
+            print(f"⚠️ 음향 모델을 미리 풀지 못해 작업마다 읽습니다: {type(e).__name__}: {e}", flush=True)
+            return self.acoustic_model_path
+
+    def _align_api(self, corpus, output) -> dict:
+        timings = {}
+        t0 = time.time()
+        aligner = self._api(
+            corpus_directory=corpus,
+            dictionary_path=self.dictionary_path,
+            acoustic_model_path=self._model_dir,  # 풀어 둔 폴더: 작업마다 압축 해제 X
+            **ALIGN_OPTIONS,
+        )
+        try:
+            aligner.setup()  # 사전 + corpus 적재, 특징 추출 (align() 안에서 하던 것을 따로 잼)
+            timings["setup_sec"] = time.time() - t0
+            t0 = time.time()
+            aligner.align()
+            timings["align_sec"] = time.time() - t0
+            t0 = time.time()
+            aligner.export_files(output, output_format=OUTPUT_FORMAT)
+            timings["export_sec"] = time.time() - t0
+        finally:
+            aligner.cleanup()
+        for key, value in timings.items():
+            self._timing_totals[key] += value
+        self._timed_jobs += 1
+        return {key: round(value, 2) for key, value in timings.items()}
+
+    def timing_averages(self) -> dict:
+        if not self._timed_jobs:
+            return {}
+        return {key: round(total / self._timed_jobs, 2) for key, total in self._timing_totals.items()}
+
+    def _align_cli(self, corpus, output):
+        command = [
+            "mfa", "align", corpus, self.dictionary_path, self.acoustic_model_path, output,
+            "--clean", *(arg for key, value in ALIGN_OPTIONS.items() for arg in (f"--{key}", str(value))),
+            "--output_format", OUTPUT_FORMAT,
+        ]
+        subprocess.run(command, check=True)
+
+    def align(self, job_id, corpus, output) -> dict:
+        with self.lock:
+            t0 = time.time()
+            out_dir = Path(output)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            timings = None
+            if self._api is not None:
+                try:
+                    timings = self._align_api(corpus, output)
+                except Exception as e:
+                    # API 경로에서 어떤 오류가 나도 이번 작업은 CLI 로 다시 처리
+                    print(f"⚠️ MFA API 호출 실패, CLI 로 처리합니다: {type(e).__name__}: {e}", flush=True)
+                    if isinstance(e, (TypeError, AttributeError, ImportError)):
+                        # 설치된 MFA 버전과 API 가 맞지 않음 → 이후 작업도 CLI 로
+                        self._api = None
+                    self._align_cli(corpus, output)
+            else:
+                self._align_cli(corpus, output)
+            self.jobs += 1
+            textgrids = sorted(str(p) for p in out_dir.glob("*.TextGrid"))
+            elapsed = time.time() - t0
+            print(f"✅ 정렬 완료: job={job_id}, TextGrid {len(textgrids)}개 ({elapsed:.2f}초, {timings or 'cli'})", flush=True)
+            response = {"ok": True, "job_id": job_id, "textgrids": textgrids, "elapsed": elapsed}
+            if timings is not None:
+                response["timings"] = timings
+            return response
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line.decode("utf-8"))
+            cmd = request.get("cmd", "align")
+            aligner = self.server.aligner
+            if cmd == "ping":
+                response = {
+                    "ok": True, "jobs": aligner.jobs, "uptime": time.time() - aligner.started_at, "engine": aligner.engine,
+                    "model_prepare_sec": round(aligner.model_prepare_sec, 2), "timings": aligner.timing_averages(),
+                }
+            elif cmd == "align":
+                response = aligner.align(request.get("job_id"), request["corpus"], request["output"])
+            else:
+                response = {"ok": False, "error": f"unknown cmd: {cmd}"}
+        except Exception as e:
+            traceback.print_exc()
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+class Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MFA 정렬 상주 워커")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dictionary", default="/data/english_us_arpa.dict")
+    parser.add_argument("--acoustic-model", default="/data/english_us_arpa")
+    args = parser.parse_args()
+
+    server = Server((args.host, args.port), Handler)
+    server.aligner = Aligner(args.dictionary, args.acoustic_model)
+    print(f"🚀 MFA 정렬 워커 대기 중: {args.host}:{args.port} ({server.aligner.engine})", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+배경음악 존재 여부 추정 (Demucs 생략 판단용)
+
+인터뷰처럼 배경음악이 거의 없는 소스는 Demucs 를 돌려도 vocals ≈ 원본이라 분리 비용만 든다.
+디코딩된 16k mono 에서 몇 초짜리 구간을 고르게 뽑아, 시간 방향으로 오래 유지되는 성분
+(음악 반주, 지속음) 의 에너지 비율을 잰다.
+
+- 말소리의 배음은 0.1~0.2초 단위로 바뀌어서 시간축 median filter(약 1초)를 거치면 대부분 사라지고,
+  반주/지속음은 남는다
+- 에너지 비율(지속 성분 / 전체)은 말소리 에너지에 묻혀 작은 반주를 못 잡으므로 (-20dB 음악 아래 음성 ≈ 0.03),
+  세기를 비교한다 → sustained_level_db = 프레임별 지속 성분 에너지의 중앙값 / 큰 소리(상위 5%) 프레임 에너지 (dB).
+  말 사이 쉬는 구간에도 반주는 남아 있어 중앙값이 반주 세기를 따라간다
+- 전체를 분석하지 않고 MUSIC_DETECT_WINDOWS 개 구간만 보므로 길이에 거의 무관하게 빠르다
+"""
+
+import numpy as np
+from scipy.ndimage import median_filter
+
+from audio_store import get_audio_store
+from config import MUSIC_DETECT_WINDOWS, MUSIC_DETECT_WINDOW_SEC, MUSIC_BYPASS_LEVEL_DB
+
+ANALYSIS_SR = 16000
+N_FFT = 1024
+HOP = 256
+SUSTAIN_SEC = 1.0  # 이 길이 이상 유지되는 성분을 배경음으로 본다
+LOUD_PERCENTILE = 95  # 말소리 세기 기준으로 쓰는 프레임 에너지 백분위
+
+
+def _magnitude(y):
+    """
+    (frames,) → |STFT| (bins x frames), hann window
+    """
+    if len(y) < N_FFT:
+        y = np.pad(y, (0, N_FFT - len(y)))
+    n_frames = 1 + (len(y) - N_FFT) // HOP
+    idx = np.arange(N_FFT)[None, :] + HOP * np.arange(n_frames)[:, None]
+    frames = y[idx] * np.hanning(N_FFT).astype(np.float32)
+    return np.abs(np.fft.rfft(frames, axis=1)).T
+
+
+def _frame_energies(y, kernel):
+    """
+    (frames,) → (지속 성분 에너지, 전체 에너지), 둘 다 STFT 프레임별
+    """
+    S = _magnitude(np.asarray(y, dtype=np.float32))
+    H = np.minimum(median_filter(S, size=(1, kernel), mode="nearest"), S)
+    return np.sum(H ** 2, axis=0), np.sum(S ** 2, axis=0)
+
+
+def _summarize(sustained, total) -> dict:
+    loud = float(np.percentile(total, LOUD_PERCENTILE)) if len(total) else 0.0
+    floor = float(np.median(sustained)) if len(sustained) else 0.0
+    if loud <= 0 or floor <= 0:
+        level_db = -np.inf
+    else:
+        level_db = 10 * np.log10(floor / loud)
+    ratio = float(np.sum(sustained) / np.sum(total)) if np.sum(total) > 0 else 0.0
+    return {"sustained_level_db": float(level_db), "sustained_ratio": ratio}
+
+
+def sustained_level(y, sr=ANALYSIS_SR) -> dict:
+    """
+    16k mono 배열 하나를 통째로 분석 (estimate_music_presence 의 구간 하나와 같은 계산)
+
+    반환: {"sustained_level_db": 지속 성분 세기(말소리 대비 dB, 무음이면 -inf), "sustained_ratio": 0~1}
+    """
+    if sr != ANALYSIS_SR:
+        raise ValueError(f"sustained_level 은 {ANALYSIS_SR}Hz 입력만 받음 (sr={sr})")
+    kernel = max(3, int(SUSTAIN_SEC * ANALYSIS_SR / HOP) | 1)
+    return _summarize(*_frame_energies(y, kernel))
+
+
+def estimate_music_presence(audio_path, n_windows=MUSIC_DETECT_WINDOWS, window_sec=MUSIC_DETECT_WINDOW_SEC) -> dict:
+    """
+    배경음악/지속 배경음 세기 추정
+
+    반환: {"sustained_level_db": 말소리 대비 dB, "sustained_ratio": 0~1,
+           "windows": 분석한 구간 수, "analyzed_sec": 분석 길이}
+    """
+    y = get_audio_store(audio_path).get(sr=ANALYSIS_SR, channels=1)
+    win = int(window_sec * ANALYSIS_SR)
+    kernel = max(3, int(SUSTAIN_SEC * ANALYSIS_SR / HOP) | 1)
+
+    if len(y) <= win:
+        starts = [0]
+    else:
+        starts = np.linspace(0, len(y) - win, num=max(1, n_windows)).astype(int).tolist()
+
+    sustained, total = [], []
+    for start in starts:
+        h, s = _frame_energies(y[start:start + win], kernel)
+        sustained.append(h)
+        total.append(s)
+
+    return {
+        **_summarize(np.concatenate(sustained), np.concatenate(total)),
+        "windows": len(starts),
+        "analyzed_sec": min(len(y), win * len(starts)) / ANALYSIS_SR,
+    }
+
+
+def has_background_music(audio_path, level_db=MUSIC_BYPASS_LEVEL_DB) -> bool:
+    """
+    지속 성분 세기가 level_db(말소리 대비 dB) 이상이면 True (Demucs 필요), 아니면 False (분리 생략 가능)
+    """
+    info = estimate_music_presence(audio_path)
+    music = info["sustained_level_db"] >= level_db
+    print(f"🎼 배경음 추정: 지속 성분 {info['sustained_level_db']:.1f}dB (기준 {level_db}dB, 에너지 비율 {info['sustained_ratio']:.3f})"
+          f" → {'음악 있음' if music else '음악 거의 없음'} [{info['windows']}개 구간, {info['analyzed_sec']:.0f}초 분석]")
+    return music
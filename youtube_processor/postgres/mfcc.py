@@ -36,6 +36,37 @@ import librosa
 import numpy as np
 from pathlib import Path
 from sklearn.metrics.pairwise import cosine_similarity
+from audio_store import get_audio_store, chunk_frames_for
+
+def _mfcc_chunked(y: np.ndarray, sr: int, n_mfcc: int = 13, n_fft: int = 2048, hop_length: int = 512, top_db: float = 80.0) -> np.ndarray:
+    """
+    librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n_mfcc) 와 같은 결과를 청크 단위로 계산 (shape: n_mfcc x frames)
+
+    전체 STFT 를 한 번에 만들면 2시간 16kHz 기준 수 GB 가 필요하므로, center=True 의 zero padding 을
+    직접 맞춰 프레임 구간별로 mel 파워를 구한다. top_db 클리핑은 전체 최댓값 기준이라
+    log-mel(프레임당 n_mels 개)만 모아둔 뒤 마지막에 한 번 적용하고 DCT 한다.
+    """
+    pad = n_fft // 2
+    n_frames = 1 + len(y) // hop_length
+    chunk = chunk_frames_for((n_fft // 2 + 1) * 8 * 3, minimum=64)  # STFT(complex64) + 파워 + 작업 버퍼
+
+    log_mels = []
+    for f0 in range(0, n_frames, chunk):
+        f1 = min(n_frames, f0 + chunk)
+        # 패딩된 신호 기준 [f0*hop, (f1-1)*hop + n_fft) → 원본 기준으로 pad 만큼 당긴 구간
+        lo = f0 * hop_length - pad
+        hi = (f1 - 1) * hop_length + n_fft - pad
+        block = np.zeros(hi - lo, dtype=np.float32)
+        src_lo, src_hi = max(lo, 0), min(hi, len(y))
+        if src_hi > src_lo:
+            block[src_lo - lo:src_hi - lo] = y[src_lo:src_hi]
+        mel = librosa.feature.melspectrogram(y=block, sr=sr, n_fft=n_fft, hop_length=hop_length, center=False)
+        log_mels.append(librosa.power_to_db(mel, top_db=None))
+
+    S = np.concatenate(log_mels, axis=1) if log_mels else np.zeros((128, 0), dtype=np.float32)
+    if S.size and top_db is not None:
+        S = np.maximum(S, S.max() - top_db)
+    return librosa.feature.mfcc(S=S, n_mfcc=n_mfcc)
 
 def extract_mfcc_from_audio(audio_path: str, sr: int = 16000, start_time_offset: float = 0.0) -> tuple[np.ndarray, np.ndarray]:
     """
@@ -43,11 +74,13 @@ def extract_mfcc_from_audio(audio_path: str, sr: int = 16000, start_time_offset:
     """
     print(f"[MFCC_DEBUG] extract_mfcc_from_audio 시작 - 파일: {audio_path}")
     
-    y, _ = librosa.load(audio_path, sr=sr)
-    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+    # 공유 오디오 저장소의 sr mono 버전 사용 (librosa 재디코딩/리샘플링 생략)
+    y = get_audio_store(audio_path).get(sr=sr, channels=1)
+    # 긴 소스도 AUDIO_MEMORY_LIMIT_MB 안에서 처리되도록 청크 단위로 추출
+    mfcc = _mfcc_chunked(y, sr, n_mfcc=13)
     mfcc = mfcc.T
 
-    duration = librosa.get_duration(y=y, sr=sr)
+    duration = len(y) / float(sr)
     n_frames = mfcc.shape[0]
     frame_times = np.linspace(0, duration, num=n_frames)
     
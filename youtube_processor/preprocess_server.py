@@ -1,17 +1,49 @@
 import os
-from fastapi import FastAPI, BackgroundTasks
+from pathlib import Path
+from fastapi import FastAPI, BackgroundTasks, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
 import requests
 from main import main_pipeline
+from asr_models import get_asr_registry, preload_asr_models
+from config import SERVER_INGEST_DIR, SERVER_S3_BUCKETS
+from utils import is_remote_url, is_object_store_key, split_object_store_key
 
 app = FastAPI()
 
 # 실행 디렉토리 보정 (항상 youtube_processor에서 실행되도록)
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+@app.on_event("startup")
+def preload_models():
+    # 첫 요청이 Whisper 가중치 로딩을 기다리지 않도록 서버 시작 시 미리 로드
+    preload_asr_models()
+
+@app.get("/models")
+def model_stats():
+    # 로드된 ASR 모델 목록, 메모리, 사용 횟수
+    return get_asr_registry().stats()
+
+def check_server_source(source):
+    """
+    인증 없는 HTTP 요청으로 들어온 소스 검사: URL 은 그대로, s3:// 는 허용 버킷만,
+    로컬 경로는 SERVER_INGEST_DIR 안의 파일만 허용 (그 외 로컬 경로/s3 키는 CLI 에서만)
+    """
+    if is_remote_url(source):
+        return
+    if is_object_store_key(source):
+        bucket, _ = split_object_store_key(source)
+        if bucket not in SERVER_S3_BUCKETS:
+            raise HTTPException(status_code=400, detail=f"허용되지 않은 s3 버킷입니다: {bucket}")
+        return
+    if SERVER_INGEST_DIR is None:
+        raise HTTPException(status_code=400, detail="로컬 파일 경로는 서버 요청으로 받을 수 없습니다")
+    ingest_dir = Path(SERVER_INGEST_DIR).resolve()
+    if not Path(source).resolve().is_relative_to(ingest_dir):
+        raise HTTPException(status_code=400, detail=f"로컬 파일은 {ingest_dir} 안에 있어야 합니다")
+
 class PreprocessRequest(BaseModel):
-    youtube_url: str
+    youtube_url: str  # YouTube URL, s3://bucket/key (SERVER_S3_BUCKETS) 또는 SERVER_INGEST_DIR 안의 로컬 파일
     movie_name: Optional[str] = None
     actor_name: Optional[str] = None
     webhook_url: Optional[str] = None  # 결과를 보낼 콜백 URL
@@ -28,6 +60,8 @@ def process_youtube(
     req: PreprocessRequest,
     background_tasks: BackgroundTasks
 ):
+    check_server_source(req.youtube_url)
+
     # 백그라운드에서 파이프라인 실행 및 결과 webhook 전송
     def run_pipeline_and_callback():
         try:
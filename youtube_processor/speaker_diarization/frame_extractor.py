@@ -1,3 +1,4 @@
+import os
 import subprocess
 from pathlib import Path
 import shutil
@@ -5,7 +6,10 @@ from config import FFMPEG_PATH
 import numpy as np
 
 
-def extract_frames_per_segment(video_path, segments, output_folder="tmp_frames"):
+def extract_frames_per_segment(video_path, segments, output_folder="tmp_frames", time_offset=0.0):
+    # time_offset: 세그먼트 시간(잘린 오디오 기준)에 더해야 영상 파일 기준 시간이 되는 값 (초)
+    # video_path 가 LazyVideo 면 여기서 처음으로 영상을 받는다
+    video_path = os.fspath(video_path)
     output_dir = Path(output_folder)
     print(f"[DEBUG] video_path: {video_path}, exists: {Path(video_path).exists()}")
     print(f"[DEBUG] FFMPEG_PATH: {FFMPEG_PATH}, exists: {Path(FFMPEG_PATH).exists()}")
@@ -29,7 +33,7 @@ def extract_frames_per_segment(video_path, segments, output_folder="tmp_frames")
 
         for i, ts in enumerate(timestamps):
             out_file = output_dir / f"{idx:03d}_{i+1}.jpg"
-            cmd = f'"{FFMPEG_PATH}" -ss {ts:.3f} -i "{video_path}" -frames:v 1 -q:v 2 "{out_file}" -y -loglevel quiet'
+            cmd = f'"{FFMPEG_PATH}" -ss {ts + time_offset:.3f} -i "{video_path}" -frames:v 1 -q:v 2 "{out_file}" -y -loglevel quiet'
             try:
                 subprocess.run(cmd, shell=True, check=True)
             except Exception as e:
@@ -1,24 +1,37 @@
-from pydub import AudioSegment  # 이걸 추가해야 함
 from pathlib import Path
+from audio_store import get_audio_store, write_wav_ranges
 
-def split_audio_by_token(mp3_paths, speaker_data, video_filename, output_dir="split_tokens"):
+
+def split_audio_by_tokens(audio_paths, speakers, video_filename, output_dir="split_tokens"):
+    """
+    여러 화자(token)의 구간을 한 번에 잘라 토큰별 WAV(16bit PCM)로 저장
+
+    - 소스 파일(vocals.wav, no_vocals.wav 등)은 공유 오디오 저장소로 한 번만 디코딩
+    - 화자마다 구간을 이어붙인 버퍼를 만들지 않고 구간별로 청크 단위로 바로 기록
+    - 무손실 WAV 로 저장하므로 export_segments_for_mfa 가 재인코딩/mp3 디코딩 없이 사용
+    """
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
 
-    for mp3_path in mp3_paths:
-        audio = AudioSegment.from_file(mp3_path)
-        audio_type = Path(mp3_path).stem  # 파일명만 뽑아서 구분용
+    saved = {}
+    for audio_path in audio_paths:
+        store = get_audio_store(audio_path)
+        audio = store.get()  # 원본 샘플레이트/채널, memmap (복사 없음)
+        sr = store.native_sr
+        audio_type = Path(audio_path).stem  # 파일명만 뽑아서 구분용
 
-        token_id = speaker_data["token_id"]
-        segments = speaker_data.get("segments", [])
+        for speaker_data in speakers:
+            token_id = speaker_data["token_id"]
+            segments = speaker_data.get("segments", [])
+            ranges = [(int(seg["start"] * sr), int(seg["end"] * sr)) for seg in segments]
 
-        # 여러 구간을 이어붙이기
-        merged = AudioSegment.empty()
-        for seg in segments:
-            start_ms = int(seg["start"] * 1000)
-            end_ms = int(seg["end"] * 1000)
-            merged += audio[start_ms:end_ms]
+            filename = f"{audio_type}_{video_filename}_token_{token_id}.wav"
+            write_wav_ranges(output_path / filename, audio, sr, ranges)
+            saved.setdefault(token_id, {})[audio_type] = str(output_path / filename)
+            print(f"🎧 Saved: {filename} (구간 수: {len(segments)})")
+    return saved
 
-        filename = f"{audio_type}_{video_filename}_token_{token_id}.mp3"
-        merged.export(output_path / filename, format="mp3")
-        print(f"🎧 Saved: {filename} (구간 수: {len(segments)})")
\ No newline at end of file
+
+def split_audio_by_token(mp3_paths, speaker_data, video_filename, output_dir="split_tokens"):
+    # 화자 1명용 (기존 호출 호환)
+    return split_audio_by_tokens(mp3_paths, [speaker_data], video_filename, output_dir)
@@ -1,38 +1,57 @@
 # voice_analyzer.py
 from resemblyzer import VoiceEncoder, preprocess_wav
 import numpy as np
-import os
 from tempfile import NamedTemporaryFile
-from pydub import AudioSegment
 from sklearn.cluster import KMeans
+from audio_store import get_audio_store, write_wav
+
+SEGMENT_SR = 16000  # Resemblyzer 입력 샘플레이트
 
 # 세그먼트 별로 음성 잘라내기 (wav 단위)
 # def extract_segment_audio(full_audio_path, start, end):
 #     audio = AudioSegment.from_wav(full_audio_path)
 def extract_segment_audio(full_audio_path, start, end):
-    # MP3든 WAV든 포맷 자동 감지
-    audio = AudioSegment.from_file(full_audio_path)
-    segment_audio = audio[start * 1000:end * 1000]  # pydub: milliseconds 단위
+    # 임시 WAV 경로가 꼭 필요한 경우용. 분석 함수들은 preprocess_segments 를 쓴다
+    sr = SEGMENT_SR
+    audio = get_audio_store(full_audio_path).get(sr=sr, channels=1)
+    segment_audio = audio[int(start * sr):int(end * sr)]
 
     tmp = NamedTemporaryFile(delete=False, suffix=".wav")
-    segment_audio.export(tmp.name, format="wav")
+    tmp.close()
+    write_wav(tmp.name, segment_audio, sr)
     return tmp.name
 
+def preprocess_segments(audio: np.ndarray, sr: int, ranges: list) -> list:
+    """
+    한 번 디코딩된 mono 배열과 (start, end) 초 단위 구간 목록을 받아
+    Resemblyzer 전처리(볼륨 정규화, 긴 무음 제거)된 세그먼트 배열 목록을 반환 (실패한 구간은 None)
+    """
+    results = []
+    for i, (start, end) in enumerate(ranges):
+        try:
+            segment = np.asarray(audio[int(start * sr):int(end * sr)], dtype=np.float32)
+            if segment.size == 0:
+                raise ValueError(f"빈 구간 ({start}~{end}초)")
+            results.append(preprocess_wav(segment, source_sr=sr))
+        except Exception as e:
+            print(f"⚠️ 세그먼트 {i}: 음성 추출 실패 → {e}")
+            results.append(None)
+    return results
+
 def analyze_voice_speakers(vocal_audio_path: str, segments: list[dict], threshold: float = 0.75):
     encoder = VoiceEncoder()
 
     print("\n🔊 Resemblyzer 로딩 완료, 음성 화자 분석 시작...")
     segment_embeddings = []
 
-    for i, seg in enumerate(segments):
+    # 전체 음성은 한 번만 디코딩하고, 세그먼트는 메모리에서 잘라 바로 임베딩
+    audio = get_audio_store(vocal_audio_path).get(sr=SEGMENT_SR, channels=1)
+    ranges = [(seg.get('start', 0), seg.get('end', 0)) for seg in segments]
+    for i, wav in enumerate(preprocess_segments(audio, SEGMENT_SR, ranges)):
         try:
-            seg_wav_path = extract_segment_audio(vocal_audio_path, seg.get('start', 0), seg.get('end', 0))
-            wav = preprocess_wav(seg_wav_path)
-            embed = encoder.embed_utterance(wav)
-            segment_embeddings.append(embed)
-            os.remove(seg_wav_path)
+            segment_embeddings.append(None if wav is None else encoder.embed_utterance(wav))
         except Exception as e:
-            print(f"⚠️ 세그먼트 {i}: 음성 추출 실패 → {e}")
+            print(f"⚠️ 세그먼트 {i}: 임베딩 실패 → {e}")
             segment_embeddings.append(None)
 
     # 세그먼트 간 화자 비교
@@ -56,15 +75,14 @@ def analyze_voice_speakers_with_clustering(vocal_audio_path: str, segments: list
     print("\n🔊 Resemblyzer 로딩 완료, 음성 화자 클러스터링 시작...")
     segment_embeddings = []
 
-    for i, seg in enumerate(segments):
+    # 전체 음성은 한 번만 디코딩하고, 세그먼트는 메모리에서 잘라 바로 임베딩
+    audio = get_audio_store(vocal_audio_path).get(sr=SEGMENT_SR, channels=1)
+    ranges = [(seg.get('start', 0), seg.get('end', 0)) for seg in segments]
+    for i, wav in enumerate(preprocess_segments(audio, SEGMENT_SR, ranges)):
         try:
-            seg_wav_path = extract_segment_audio(vocal_audio_path, seg.get('start', 0), seg.get('end', 0))
-            wav = preprocess_wav(seg_wav_path)
-            embed = encoder.embed_utterance(wav)
-            segment_embeddings.append(embed)
-            os.remove(seg_wav_path)
+            segment_embeddings.append(None if wav is None else encoder.embed_utterance(wav))
         except Exception as e:
-            print(f"⚠️ 세그먼트 {i}: 음성 추출 실패 → {e}")
+            print(f"⚠️ 세그먼트 {i}: 임베딩 실패 → {e}")
             segment_embeddings.append(None)
 
     # None 값 제거 및 인덱스 매핑
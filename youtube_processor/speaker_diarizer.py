@@ -2,12 +2,11 @@
 # speaker_diarizer.py
 from collections import defaultdict
 from typing import List, Dict, Any
-from pathlib import Path
 import torch
-from pydub import AudioSegment
 from pyannote.audio import Pipeline
 from pyannote.core import Annotation
 from pyannote.audio import Inference
+from audio_store import get_audio_store
 
 
 def diarize_main_speaker(
@@ -21,16 +20,10 @@ def diarize_main_speaker(
     """Whisper 세그먼트(post_word_data)에 화자 라벨을 달고
        대사량이 가장 긴 화자를 반환한다."""
 
-    # ───────────────────────── 0. 입력 WAV 확보 ─────────────────────────
-    src = Path(vocal_path)
-    if src.suffix.lower() != ".wav":            # MP3 → WAV 16 kHz mono
-        wav = src.with_suffix(".wav").with_name(f"{src.stem}_16k_mono.wav")
-        if not wav.exists():
-            print(f"🔄 {src.name} → {wav.name} (16 kHz mono)")
-            AudioSegment.from_file(src).set_frame_rate(16_000)\
-                                        .set_channels(1)\
-                                        .export(wav, format="wav")
-        vocal_path = str(wav)
+    # ───────────────────────── 0. 입력 파형 확보 ─────────────────────────
+    # 공유 오디오 저장소의 16 kHz mono 버전을 메모리 파형으로 바로 넘긴다 (WAV 재export 없음)
+    audio_16k = get_audio_store(vocal_path).get(sr=16_000, channels=1)
+    waveform = torch.from_numpy(audio_16k).unsqueeze(0)  # (channel=1, time)
     # ──────────────────────────────────────────────────────────────────
 
     print("🔊 diarization start")
@@ -68,7 +61,7 @@ def diarize_main_speaker(
         pipeline.to(device)
 
         diar = pipeline(
-            {"audio": vocal_path},
+            {"waveform": waveform, "sample_rate": 16_000},
             min_speakers=min_speakers,
             max_speakers=max_speakers,
         )
@@ -0,0 +1,118 @@
+import threading
+import time
+
+from asr_models import ASRModelRegistry, _ctranslate2_model_bytes
+
+
+class _FakeModel:
+    pass
+
+
+def _registry(sizer=None):
+    registry = ASRModelRegistry(idle_evict_sec=None)
+    registry.register_loader("fake", lambda name, device, compute_type: _FakeModel(), sizer)
+    return registry
+
+
+def test_sizer_result_is_recorded_in_stats():
+    registry = _registry(lambda model, name, compute_type: (1234, "parameters"))
+    registry.preload([("tiny", "cpu", "float32", "fake")])
+
+    stats = registry.stats()
+
+    assert stats["models"][0]["bytes"] == 1234
+    assert stats["models"][0]["bytes_source"] == "parameters"
+    assert stats["total_bytes"] == 1234
+    assert stats["unmeasured"] == []
+
+
+def test_backend_without_sizer_is_reported_unmeasured():
+    registry = _registry()
+    registry.preload([("tiny", "cpu", "float32", "fake")])
+
+    stats = registry.stats()
+
+    assert stats["models"][0]["bytes"] is None
+    assert stats["models"][0]["bytes_source"] == "unmeasured"
+    assert stats["unmeasured"] == ["fake/tiny/cpu/float32"]
+
+
+def test_failing_sizer_is_reported_unmeasured():
+    def sizer(model, name, compute_type):
+        raise OSError("no model.bin")
+
+    registry = _registry(sizer)
+    registry.preload([("tiny", "cpu", "float32", "fake")])
+
+    assert registry.stats()["unmeasured"] == ["fake/tiny/cpu/float32"]
+
+
+def test_ctranslate2_size_is_scaled_by_compute_type(tmp_path):
+    (tmp_path / "model.bin").write_bytes(b"\0" * 1000)  # float16 로 저장된 가중치
+
+    assert _ctranslate2_model_bytes(None, str(tmp_path), "int8") == (500, "disk_estimate")
+    assert _ctranslate2_model_bytes(None, str(tmp_path), "int8_float16") == (500, "disk_estimate")
+    assert _ctranslate2_model_bytes(None, str(tmp_path), "float32") == (2000, "disk_estimate")
+    assert _ctranslate2_model_bytes(None, str(tmp_path), "default") == (1000, "disk")
+
+
+def _run_with_timeout(fn, timeout=5.0):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", fn()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "중첩 use() 가 멈춤"
+    return result["value"]
+
+
+def test_nested_use_in_same_thread_while_generator_holds_model():
+    registry = _registry()
+
+    def stream():
+        with registry.use("tiny", "cpu", "float32", "fake") as model:
+            for i in range(3):
+                yield i, model
+
+    def consume():
+        seen = []
+        for i, model in stream():
+            # 스트리밍 generator 가 모델을 잡은 채로 같은 모델을 다시 빌림 (2단계 재디코딩과 같은 모양)
+            with registry.use("tiny", "cpu", "float32", "fake") as again:
+                seen.append((i, again is model))
+        return seen
+
+    assert _run_with_timeout(consume) == [(0, True), (1, True), (2, True)]
+
+
+def _wait_until(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def test_idle_model_is_evicted_without_further_calls():
+    registry = ASRModelRegistry(idle_evict_sec=0.1)
+    registry.register_loader("fake", lambda name, device, compute_type: _FakeModel())
+    try:
+        registry.preload([("tiny", "cpu", "float32", "fake")])
+        assert len(registry.stats()["models"]) == 1
+
+        # 이후 get()/use() 호출 없이도 내림 스레드가 내린다
+        assert _wait_until(lambda: not registry.stats()["models"])
+    finally:
+        registry.close()
+
+
+def test_model_in_use_is_not_evicted():
+    registry = ASRModelRegistry(idle_evict_sec=0.05)
+    registry.register_loader("fake", lambda name, device, compute_type: _FakeModel())
+    try:
+        with registry.use("tiny", "cpu", "float32", "fake"):
+            time.sleep(0.3)
+            assert len(registry.stats()["models"]) == 1
+        assert _wait_until(lambda: not registry.stats()["models"])
+    finally:
+        registry.close()
@@ -0,0 +1,57 @@
+import numpy as np
+
+from asr_parallel import plan_chunks, quiet_cut, shift_result, merge_results
+
+
+def test_plan_chunks_groups_regions_up_to_max_sec():
+    regions = [(0.0, 10.0), (12.0, 30.0), (31.0, 55.0), (58.0, 70.0)]
+    assert plan_chunks(regions, max_sec=60.0) == [(0.0, 55.0), (58.0, 70.0)]
+
+
+def test_plan_chunks_keeps_long_region_whole():
+    assert plan_chunks([(0.0, 5.0), (6.0, 100.0), (101.0, 110.0)], max_sec=30.0) == [(0.0, 5.0), (6.0, 100.0), (101.0, 110.0)]
+
+
+def test_plan_chunks_empty():
+    assert plan_chunks([], max_sec=60.0) == []
+
+
+def test_shift_result_moves_segments_words_and_seek():
+    result = {"segments": [{
+        "start": 1.0, "end": 2.5, "seek": 0,
+        "words": [{"word": "hi", "start": 1.0, "end": 1.4}, {"word": "there", "start": 1.5, "end": 2.5}],
+    }]}
+
+    shifted = shift_result(result, 30.0)
+
+    seg = shifted["segments"][0]
+    assert (seg["start"], seg["end"], seg["seek"]) == (31.0, 32.5, 3000)
+    assert [(w["start"], w["end"]) for w in seg["words"]] == [(31.0, 31.4), (31.5, 32.5)]
+
+
+def test_shift_result_without_words_or_seek():
+    shifted = shift_result({"segments": [{"start": 0.5, "end": 1.0, "words": None}]}, 2.0)
+    assert shifted["segments"][0] == {"start": 2.5, "end": 3.0, "words": None}
+
+
+def test_merge_results_renumbers_ids_in_order():
+    merged = merge_results([
+        {"language": "en", "segments": [{"id": 0, "text": " a"}, {"id": 1, "text": " b"}]},
+        {"language": "en", "segments": [{"id": 0, "text": " c"}]},
+    ])
+    assert [s["id"] for s in merged["segments"]] == [0, 1, 2]
+    assert merged["text"] == " a b c"
+    assert merged["language"] == "en"
+
+
+def test_quiet_cut_picks_quietest_frame_in_range():
+    sr = 1000
+    audio = np.ones(10 * sr, dtype=np.float32)
+    audio[4500:4530] = 0.0  # 범위 밖의 무음은 무시
+    audio[7200:7230] = 0.01
+    assert quiet_cut(audio, sr, 6000, 9000) == 7215
+
+
+def test_quiet_cut_short_range_returns_hi():
+    audio = np.ones(100, dtype=np.float32)
+    assert quiet_cut(audio, 1000, 90, 100) == 100
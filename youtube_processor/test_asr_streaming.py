@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+pytest.importorskip("torch")
+
+import numpy as np
+
+import transcriber
+from asr_backends import ASRBackend
+from asr_models import get_asr_registry
+
+SR = 16000
+
+
+def _fake_model(n_samples, greedy):
+    # 0.5초마다 segment 하나, 1차(greedy)는 신뢰도가 낮아 전부 재디코딩 대상이 된다
+    segments = []
+    duration = n_samples / SR
+    t = 0.0
+    while t + 0.5 <= duration + 1e-9:
+        segments.append({
+            "start": t, "end": t + 0.5, "text": " w",
+            "avg_logprob": -3.0 if greedy else -0.1, "compression_ratio": 1.0,
+            "words": [{"word": "w", "start": t, "end": t + 0.4, "probability": 0.9}],
+        })
+        t += 0.5
+    return segments
+
+
+class _FakeStreamingBackend(ASRBackend):
+    """
+    faster_whisper 처럼 모델을 잡은 채로 segment 를 하나씩 내주는 엔진
+    """
+    name = "fake_streaming"
+    streams_segments = True
+
+    def transcribe(self, audio, **options):
+        return {"segments": list(self.iter_segments(audio, **options))}
+
+    def iter_segments(self, audio, **options):
+        with self._use_model() as model:
+            for i, seg in enumerate(model(len(audio), options.get("beam_size") is None)):
+                yield {**seg, "id": i}
+
+
+class _FakeStore:
+    def __init__(self, audio):
+        self.audio = audio
+
+    def get(self, sr=None, channels=None):
+        return self.audio
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    get_asr_registry().register_loader(_FakeStreamingBackend.name, lambda name, device, compute_type: _fake_model)
+    backend = _FakeStreamingBackend(model_name="tiny", device="cpu", compute_type="float32")
+    monkeypatch.setattr(transcriber, "get_asr_backend", lambda *args, **kwargs: backend)
+    return backend
+
+
+def _collect(make_iter, timeout=10.0):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("segments", list(make_iter())), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "스트리밍 + 2단계 디코딩이 멈춤"
+    return result["segments"]
+
+
+def test_streaming_two_pass_redecodes_while_backend_streams(backend, monkeypatch):
+    monkeypatch.setattr(transcriber, "get_audio_store", lambda path: _FakeStore(np.zeros(3 * SR, dtype=np.float32)))
+
+    segments = _collect(lambda: transcriber.iter_transcribe_segments("vocals.wav", workers=1, two_pass=True))
+
+    assert [seg["id"] for seg in segments] == list(range(len(segments)))
+    assert len(segments) >= 6
+    assert all(seg["avg_logprob"] == -0.1 for seg in segments)  # 재디코딩 결과로 교체됨
+
+
+def test_separated_stream_two_pass_redecodes_while_backend_streams(backend):
+    pytest.importorskip("torchaudio")
+    # Demucs 스트리밍 조각 모양: (frames, channels), 조각 경계는 전사 조각 경계와 맞지 않음
+    chunks = [{"vocals": np.zeros((int(0.7 * SR), 2), dtype=np.float32), "sr": SR} for _ in range(5)]
+
+    segments = _collect(lambda: transcriber.iter_transcribe_separated(iter(chunks), two_pass=True, max_sec=1.0))
+
+    assert [seg["id"] for seg in segments] == list(range(len(segments)))
+    assert segments and all(seg["avg_logprob"] == -0.1 for seg in segments)
+    # 조각 기준 시간이 원본 기준으로 옮겨져 시간순으로 이어진다
+    starts = [seg["start"] for seg in segments]
+    assert starts == sorted(starts) and segments[-1]["end"] <= 3.5 + 1e-6
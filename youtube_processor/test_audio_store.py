@@ -0,0 +1,29 @@
+import os
+
+import numpy as np
+
+from audio_store import shared_raw_file
+
+
+def _raw_memmap(tmp_path, frames=100, channels=2):
+    path = tmp_path / "pcm.f32"
+    data = np.arange(frames * channels, dtype=np.float32).reshape(frames, channels)
+    data.tofile(path)
+    return np.memmap(path, dtype=np.float32, mode="c", shape=(frames, channels)), data
+
+
+def test_shared_raw_file_reuses_whole_memmap(tmp_path):
+    arr, _ = _raw_memmap(tmp_path)
+    raw_file, tmp_file = shared_raw_file(arr)
+    assert str(raw_file) == str(tmp_path / "pcm.f32")
+    assert tmp_file is None
+
+
+def test_shared_raw_file_copies_row_slice_of_memmap(tmp_path):
+    arr, data = _raw_memmap(tmp_path)
+    raw_file, tmp_file = shared_raw_file(arr[40:])
+    try:
+        assert tmp_file == raw_file
+        np.testing.assert_array_equal(np.fromfile(raw_file, dtype=np.float32).reshape(-1, 2), data[40:])
+    finally:
+        os.remove(tmp_file)
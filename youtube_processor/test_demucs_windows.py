@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from demucs_wrapper import _plan_windows, _stitch
+
+
+@pytest.mark.parametrize("n, window, overlap", [(10, 4, 1), (100, 30, 5), (30, 30, 5), (5, 30, 5), (61, 30, 10)])
+def test_plan_windows_covers_input_with_overlap(n, window, overlap):
+    windows = _plan_windows(n, window, overlap)
+
+    assert windows[0][0] == 0
+    assert windows[-1][1] == n
+    assert all(end - start <= window for start, end in windows)
+    for (_, prev_end), (start, _) in zip(windows, windows[1:]):
+        assert prev_end - start == overlap
+
+
+def test_plan_windows_empty_input():
+    assert _plan_windows(0, 10, 2) == []
+
+
+def _separate_identity(signal, windows):
+    # 모델 대신 입력을 그대로 vocals 로, 2배를 no_vocals 로 돌려주는 분리
+    for i, (start, end) in enumerate(windows):
+        part = signal[start:end].copy()
+        yield start, (part, part * 2), i == len(windows) - 1
+
+
+@pytest.mark.parametrize("n, window, overlap", [(1000, 300, 50), (300, 300, 50), (1001, 256, 64)])
+def test_stitch_reconstructs_identity_separation(n, window, overlap):
+    signal = np.random.default_rng(0).standard_normal((n, 2)).astype(np.float32)
+    windows = _plan_windows(n, window, overlap)
+
+    pieces = list(_stitch(_separate_identity(signal, windows), overlap))
+
+    # 조각은 빈틈/겹침 없이 이어지고 전체 길이를 덮는다
+    assert pieces[0][0] == 0 and pieces[-1][1] == n
+    for prev, cur in zip(pieces, pieces[1:]):
+        assert prev[1] == cur[0]
+    vocals = np.concatenate([p[2] for p in pieces])
+    no_vocals = np.concatenate([p[3] for p in pieces])
+    # 같은 값끼리의 crossfade 는 원래 값을 그대로 돌려준다
+    np.testing.assert_allclose(vocals, signal, atol=1e-6)
+    np.testing.assert_allclose(no_vocals, signal * 2, atol=1e-6)
+
+
+def test_stitch_crossfades_overlap_linearly():
+    overlap = 4
+    first = np.ones((8, 1), dtype=np.float32)
+    second = np.zeros((8, 1), dtype=np.float32)
+    results = [(0, (first, first.copy()), False), (4, (second, second.copy()), True)]
+
+    pieces = list(_stitch(results, overlap))
+
+    assert [(p[0], p[1]) for p in pieces] == [(0, 4), (4, 12)]
+    np.testing.assert_allclose(pieces[1][2][:overlap, 0], 1.0 - np.linspace(0.0, 1.0, overlap))
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("yt_dlp")
+pytest.importorskip("boto3")
+
+import downloader
+
+INFO = {
+    "duration": 100.0,
+    "formats": [
+        {"format_id": "251", "vcodec": "none", "acodec": "opus", "abr": 130, "filesize": 1_600_000},
+        {"format_id": "140", "vcodec": "none", "acodec": "mp4a.40.2", "abr": 128, "filesize": 1_500_000},
+        {"format_id": "134", "vcodec": "avc1", "acodec": "none", "height": 360, "filesize": 5_000_000},
+        {"format_id": "137", "vcodec": "avc1", "acodec": "none", "height": 1080, "filesize": 40_000_000},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def cached_info(monkeypatch):
+    monkeypatch.setattr(downloader, "get_video_info", lambda url, video_id=None, refresh=False: INFO)
+
+
+def _job_stats():
+    # download_audio 로 오디오 1회(1.6MB / 2초)를 받은 뒤의 통계
+    stats = downloader.new_download_stats()
+    stats.update(fetches=1, download_bytes=1_600_000, download_sec=2.0, cache={"mka": "miss"})
+    return stats
+
+
+def test_unresolved_video_saves_audio_refetch_and_video_stream():
+    stats = _job_stats()
+    video = downloader.LazyVideo("https://youtu.be/abcdefghijk", "downloads/x.mp4", stats=stats)
+
+    video.record_savings()
+
+    assert stats["cache"]["mp4"] == "skipped"
+    assert stats["saved_fetches"] == 2
+    assert stats["saved_bytes"] == 1_600_000 + 5_000_000  # bestaudio 재전송 + 360p 프록시 영상
+    assert stats["saved_sec"] == pytest.approx(2.0 + 6.25)
+
+
+def test_resolved_video_only_counts_audio_refetch(monkeypatch):
+    stats = _job_stats()
+    monkeypatch.setattr(downloader, "download_video", lambda *args, **kwargs: None)
+    video = downloader.LazyVideo("https://youtu.be/abcdefghijk", "downloads/x.mp4", section=(10.0, 60.0), stats=stats)
+    video.resolve()
+
+    video.record_savings()
+
+    assert "mp4" not in stats["cache"]
+    assert stats["saved_fetches"] == 1
+    range_sec = 60.0 + downloader.CLIP_MARGIN_SEC - downloader.section_origin((10.0, 60.0))
+    assert stats["saved_bytes"] == int(1_600_000 * range_sec / 100.0)
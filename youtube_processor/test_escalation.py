@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("torch")
+
+from config import ASR_ESCALATE_LOGPROB, ASR_ESCALATE_COMPRESSION, ASR_ESCALATE_WORD_PROB
+from transcriber import escalation_reasons
+
+
+def _seg(avg_logprob=0.0, compression_ratio=1.0, word_probs=(0.99,)):
+    return {
+        "avg_logprob": avg_logprob,
+        "compression_ratio": compression_ratio,
+        "words": [{"word": "w", "start": 0.0, "end": 0.1, "probability": p} for p in word_probs],
+    }
+
+
+def test_confident_segment_is_kept():
+    assert escalation_reasons(_seg()) == []
+
+
+def test_each_threshold_triggers_its_reason():
+    assert escalation_reasons(_seg(avg_logprob=ASR_ESCALATE_LOGPROB - 0.1)) == ["avg_logprob"]
+    assert escalation_reasons(_seg(compression_ratio=ASR_ESCALATE_COMPRESSION + 0.1)) == ["compression_ratio"]
+    assert escalation_reasons(_seg(word_probs=(ASR_ESCALATE_WORD_PROB - 0.1,))) == ["word_probability"]
+
+
+def test_thresholds_are_exclusive():
+    seg = _seg(avg_logprob=ASR_ESCALATE_LOGPROB, compression_ratio=ASR_ESCALATE_COMPRESSION,
+               word_probs=(ASR_ESCALATE_WORD_PROB,))
+    assert escalation_reasons(seg) == []
+
+
+def test_word_probability_uses_the_mean():
+    low, high = ASR_ESCALATE_WORD_PROB - 0.2, ASR_ESCALATE_WORD_PROB + 0.3
+    assert escalation_reasons(_seg(word_probs=(low, high))) == []
+    assert escalation_reasons(_seg(word_probs=(low, low, high))) == ["word_probability"]
+
+
+def test_missing_fields_are_ignored():
+    assert escalation_reasons({"words": []}) == []
+    assert escalation_reasons({"avg_logprob": None, "words": [{"word": "w", "probability": None}]}) == []
+
+
+def test_all_reasons_reported_together():
+    seg = _seg(avg_logprob=-5.0, compression_ratio=10.0, word_probs=(0.0,))
+    assert escalation_reasons(seg) == ["avg_logprob", "compression_ratio", "word_probability"]
@@ -0,0 +1,74 @@
+import os
+
+import media_cache
+from media_cache import MediaCache
+
+
+def _put(cache, tmp_path, key, size):
+    src = tmp_path / f"src_{key}"
+    src.write_bytes(b"0" * size)
+    return cache.put(key, "mp3", src)
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = MediaCache(tmp_path / "cache", max_bytes=250)
+    _put(cache, tmp_path, "a", 100)
+    _put(cache, tmp_path, "b", 100)
+    assert cache.get("a", "mp3") is not None  # a 를 최근 사용으로
+
+    _put(cache, tmp_path, "c", 100)  # 300 > 250 → 가장 오래 안 쓴 b 삭제
+
+    assert cache.get("b", "mp3") is None
+    assert cache.get("a", "mp3") is not None
+    assert cache.get("c", "mp3") is not None
+    assert not (tmp_path / "cache" / "b.mp3").exists()
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entry_larger_than_limit_is_kept(tmp_path):
+    cache = MediaCache(tmp_path / "cache", max_bytes=50)
+    _put(cache, tmp_path, "big", 100)
+    assert cache.get("big", "mp3") is not None
+
+
+def test_instances_sharing_a_directory_keep_each_others_entries(tmp_path):
+    # 같은 캐시 폴더를 쓰는 두 프로세스(서버/CLI) 상황
+    first = MediaCache(tmp_path / "cache", max_bytes=1000)
+    second = MediaCache(tmp_path / "cache", max_bytes=1000)
+    _put(first, tmp_path, "a", 100)
+    _put(second, tmp_path, "b", 100)
+
+    assert first.get("b", "mp3") is not None
+    assert second.get("a", "mp3") is not None
+    assert MediaCache(tmp_path / "cache").stats()["entries"] == 2
+
+
+def test_corrupt_entry_is_dropped(tmp_path):
+    cache = MediaCache(tmp_path / "cache", max_bytes=1000)
+    path = _put(cache, tmp_path, "a", 100)
+    path.write_bytes(b"1" * 10)
+    assert cache.get("a", "mp3") is None
+    assert not path.exists()
+
+
+def test_hit_does_not_rehash_unchanged_file(tmp_path, monkeypatch):
+    cache = MediaCache(tmp_path / "cache", max_bytes=1000)
+    _put(cache, tmp_path, "a", 100)
+
+    calls = []
+    original = media_cache.file_sha256
+    monkeypatch.setattr(media_cache, "file_sha256", lambda path: calls.append(path) or original(path))
+    assert cache.get("a", "mp3") is not None
+    assert calls == []
+
+
+def test_same_size_modification_is_caught_by_hash(tmp_path):
+    cache = MediaCache(tmp_path / "cache", max_bytes=1000)
+    path = _put(cache, tmp_path, "a", 100)
+    path.write_bytes(b"1" * 100)
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert cache.get("a", "mp3") is None
+    assert not path.exists()
+    assert cache.stats()["corrupt"] == 1
@@ -0,0 +1,21 @@
+import librosa
+import numpy as np
+import pytest
+
+import postgres.mfcc as mfcc
+
+
+@pytest.mark.parametrize("n_samples", [2500, 16000 * 3 + 123, 16000 * 7])
+@pytest.mark.parametrize("chunk", [64, 10 ** 6])
+def test_mfcc_chunked_matches_librosa(monkeypatch, n_samples, chunk):
+    # chunk=64 프레임이면 여러 청크로 나뉘어 경계 패딩까지 확인된다
+    monkeypatch.setattr(mfcc, "chunk_frames_for", lambda *args, **kwargs: chunk)
+    rng = np.random.default_rng(n_samples)
+    t = np.arange(n_samples) / 16000
+    y = (0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(n_samples)).astype(np.float32)
+
+    expected = librosa.feature.mfcc(y=y, sr=16000, n_mfcc=13)
+    actual = mfcc._mfcc_chunked(y, 16000, n_mfcc=13)
+
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-3)
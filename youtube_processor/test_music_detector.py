@@ -0,0 +1,93 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+import music_detector
+from config import MUSIC_BYPASS_LEVEL_DB
+
+SR = 16000
+SEC = 30
+
+
+def _rms(y, level=0.1):
+    voiced = y[np.abs(y) > 1e-4]
+    return (y / np.sqrt(np.mean(voiced ** 2)) * level).astype(np.float32)
+
+
+def _speech(sec=SEC, seed=0):
+    # 0.12~0.3초 음절(피치가 미끄러지는 배음) 2~5개 + 0.3~0.8초 쉼
+    rng = np.random.default_rng(seed)
+    y = np.zeros(int(sec * SR), dtype=np.float32)
+    t = 0.0
+    while t < sec - 0.5:
+        for _ in range(rng.integers(2, 6)):
+            dur = rng.uniform(0.12, 0.3)
+            i = int(t * SR)
+            n = min(len(y) - i, int(dur * SR))
+            tt = np.arange(n) / SR
+            f0 = rng.uniform(100, 220) * (1 + 0.3 * rng.choice([-1, 1]) * tt / dur)
+            phase = 2 * np.pi * np.cumsum(f0) / SR
+            syllable = sum(np.sin(k * phase) / k for k in range(1, 20))
+            y[i:i + n] += syllable * np.hanning(n)
+            t += dur + rng.uniform(0.02, 0.08)
+        t += rng.uniform(0.3, 0.8)
+    return _rms(y)
+
+
+def _music(sec=SEC, seed=1):
+    # 2초씩 유지되는 3음 화음
+    rng = np.random.default_rng(seed)
+    notes = [220, 247, 262, 294, 330, 349, 392]
+    y = np.zeros(int(sec * SR), dtype=np.float32)
+    for i in range(0, len(y), 2 * SR):
+        n = min(len(y) - i, 2 * SR)
+        tt = np.arange(n) / SR
+        chord = rng.choice(notes, 3, replace=False)
+        env = np.minimum(1, np.minimum(tt / 0.05, (n / SR - tt) / 0.05))
+        y[i:i + n] += env * sum(np.sin(2 * np.pi * f * k * tt) / k for f in chord for k in (1, 2, 3))
+    return _rms(y)
+
+
+def _db(gain_db):
+    return 10 ** (gain_db / 20)
+
+
+def test_clean_speech_is_not_music():
+    level = music_detector.sustained_level(_speech())["sustained_level_db"]
+    assert level < MUSIC_BYPASS_LEVEL_DB - 10
+
+
+def test_speech_over_quiet_music_is_music():
+    # 말소리보다 20dB 작은 반주: 에너지 비율로는 놓치던 경우
+    info = music_detector.sustained_level(_speech() + _music() * _db(-20))
+    assert info["sustained_level_db"] >= MUSIC_BYPASS_LEVEL_DB
+    assert info["sustained_ratio"] < 0.08
+
+
+def test_music_only_is_music():
+    level = music_detector.sustained_level(_music())["sustained_level_db"]
+    assert level > -10
+
+
+def test_silence_is_not_music():
+    assert music_detector.sustained_level(np.zeros(SR, dtype=np.float32))["sustained_level_db"] == -np.inf
+
+
+class _FakeStore:
+    def __init__(self, audio):
+        self.audio = audio
+
+    def get(self, sr=None, channels=None):
+        return self.audio
+
+
+@pytest.mark.parametrize("make, expected", [
+    (lambda: _speech(), False),
+    (lambda: _speech() + _music() * _db(-20), True),
+    (lambda: _music(), True),
+])
+def test_has_background_music_over_windows(monkeypatch, make, expected):
+    audio = make()
+    monkeypatch.setattr(music_detector, "get_audio_store", lambda path: _FakeStore(audio))
+    assert music_detector.has_background_music("audio.wav") is expected
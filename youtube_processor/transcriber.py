@@ -1,6 +1,11 @@
-import whisper_timestamped as wts
-import json
+import asyncio
+import contextvars
+import numpy as np
 import torch
+from audio_store import get_audio_store
+from asr_backends import get_asr_backend
+from asr_parallel import transcribe_chunked, iter_transcribe_chunked, plan_chunks, quiet_cut, shift_result
+from config import ASR_PARALLEL_WORKERS, ASR_CHUNK_MAX_SEC, ASR_TWO_PASS, ASR_ESCALATE_LOGPROB, ASR_ESCALATE_COMPRESSION, ASR_ESCALATE_WORD_PROB
 
 device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
 print(f"Using device: {device}")                  # cuda:0 여야 합니다
@@ -73,11 +78,96 @@ def split_long_segment(seg,
     return results
 
 
-def transcribe_audio(vocals_path):
+# transcribe_audio / iter_transcribe_segments 공통 디코딩 옵션
+TRANSCRIBE_OPTIONS = dict(
+    word_timestamps=True,
+    language="en",
+    temperature=0.0,
+    best_of=3,
+    beam_size=3,
+    compression_ratio_threshold=float('inf'),
+    logprob_threshold=-5,
+    no_speech_threshold=0.5
+)
+
+
+# 2단계 디코딩의 1차(greedy) 옵션
+GREEDY_OPTIONS = dict(TRANSCRIBE_OPTIONS, beam_size=None, best_of=None)
+
+
+def escalation_reasons(seg) -> list:
+    """
+    segment 를 beam search 로 다시 디코딩해야 하는 이유 목록 (비어 있으면 1차 결과 유지)
+    """
+    reasons = []
+    if seg.get('avg_logprob') is not None and seg['avg_logprob'] < ASR_ESCALATE_LOGPROB:
+        reasons.append("avg_logprob")
+    if seg.get('compression_ratio') is not None and seg['compression_ratio'] > ASR_ESCALATE_COMPRESSION:
+        reasons.append("compression_ratio")
+    probs = [w['probability'] for w in seg.get('words', []) if w.get('probability') is not None]
+    if probs and sum(probs) / len(probs) < ASR_ESCALATE_WORD_PROB:
+        reasons.append("word_probability")
+    return reasons
+
+
+def _mean_logprob(segments):
+    values = [s['avg_logprob'] for s in segments if s.get('avg_logprob') is not None]
+    return sum(values) / len(values) if values else float('-inf')
+
+
+def redecode_low_confidence(audio, segments, backend=None, sr=16000, pad_sec=0.2, **options):
+    """
+    신뢰도가 낮은 segment 만 그 구간(앞뒤 pad_sec 포함) 오디오로 다시 디코딩 (기본: TRANSCRIBE_OPTIONS 의 beam search).
+    재디코딩 결과의 avg_logprob 가 더 좋을 때만 교체하고, 시간은 원래 segment 범위 안으로 자른다.
+    반환: (새 segments, {"total", "escalated", "replaced", "reasons"})
+    """
+    backend = backend or get_asr_backend()
+    options = {**TRANSCRIBE_OPTIONS, **options}
+    duration = len(audio) / sr
+
+    refined = []
+    stats = {"total": len(segments), "escalated": 0, "replaced": 0, "reasons": {}}
+    for seg in segments:
+        reasons = escalation_reasons(seg)
+        if not reasons:
+            refined.append(seg)
+            continue
+        stats["escalated"] += 1
+        for reason in reasons:
+            stats["reasons"][reason] = stats["reasons"].get(reason, 0) + 1
+
+        lo = max(0.0, float(seg['start']) - pad_sec)
+        hi = min(duration, float(seg['end']) + pad_sec)
+        result = shift_result(backend.transcribe(np.array(audio[int(lo * sr):int(hi * sr)]), **options), lo)
+        candidates = []
+        for new in result.get('segments', []):
+            start, end = max(new['start'], seg['start']), min(new['end'], seg['end'])
+            if end <= start:
+                continue
+            words = [
+                {**w, 'start': max(w['start'], start), 'end': min(w['end'], end)}
+                for w in new.get('words', []) or []
+                if w['end'] > start and w['start'] < end
+            ]
+            candidates.append({**new, 'start': start, 'end': end, 'words': words})
+
+        if candidates and _mean_logprob(candidates) > _mean_logprob([seg]):
+            refined.extend(candidates)
+            stats["replaced"] += 1
+        else:
+            refined.append(seg)
+
+    for i, seg in enumerate(refined):
+        seg['id'] = i
+    return refined, stats
+
+
+def transcribe_audio(vocals_path, workers=ASR_PARALLEL_WORKERS, two_pass=ASR_TWO_PASS):
     print("🎙️자막추출 기본 모델 호출 ")
-    model = wts.load_model("base").to(device)
 
     print("🧠 음성 데이터 텍스트 변환중...")
+    # 공유 오디오 저장소의 16k mono 버전을 그대로 넘긴다 (Whisper 내부 ffmpeg 재디코딩 생략)
+    audio = get_audio_store(vocals_path).get(sr=16000, channels=1)
     # result = model.transcribe(
     #     vocals_path,
     #     word_timestamps=True,
@@ -89,21 +179,24 @@ def transcribe_audio(vocals_path):
     #     logprob_threshold= -5,                       # 확률 기준 비활성화
     #     no_speech_threshold=0.5                      # 무음 제거 기준 비활성화
     # )
-    result = model.transcribe(
-        vocals_path,
-        word_timestamps=True,
-        language="en",
-        temperature=0.0,
-        best_of=3,
-        beam_size=3,
-        compression_ratio_threshold=float('inf'),
-        logprob_threshold=-5,
-        no_speech_threshold=0.5
-    )
+    # 2단계 모드: 1차는 greedy 로 전체를 빠르게, 신뢰도 낮은 문장만 아래에서 beam search 로 다시 디코딩
+    options = dict(GREEDY_OPTIONS if two_pass else TRANSCRIBE_OPTIONS)
+    if workers > 1:
+        # 무음 기준 조각으로 나눠 여러 프로세스에서 동시에 전사 (시간은 원본 기준으로 합쳐짐)
+        result = transcribe_chunked(vocals_path, workers=workers, **options)
+    else:
+        # config 의 ASR_BACKEND 엔진 사용 (모델은 프로세스 전역 저장소에서 빌려 씀, 호출마다 재로딩 X)
+        result = get_asr_backend().transcribe(audio, **options)
 
     segments = result.get("segments", [])
     print(f"📝 총 {len(segments)} 개의 문장 추출.")
 
+    if two_pass:
+        # 단어 확률은 타임스탬프 보정 전에만 남아 있으므로 여기서 판단
+        segments, stats = redecode_low_confidence(audio, segments)
+        print(f"🔁 2단계 디코딩: {stats['total']}개 중 {stats['escalated']}개 재디코딩 "
+              f"({stats['replaced']}개 교체), 사유 {stats['reasons']}")
+
     # 각 segment 내 단어 타임스탬프 검사 및 보정
     for seg in segments:
         words = seg.get('words', [])
@@ -129,13 +222,156 @@ def transcribe_audio(vocals_path):
     
     return segments
 
+def iter_transcribe_segments(vocals_path, workers=ASR_PARALLEL_WORKERS, two_pass=ASR_TWO_PASS, **overrides):
+    """
+    확정된 segment 를 디코딩되는 대로 하나씩 yield (단어 타임스탬프 보정 완료, 시간은 원본 기준, id 는 0부터)
+    뒤쪽을 전사하는 동안 앞쪽 segment 로 다음 단계(포맷팅, 경계 조정 등)를 진행할 수 있다.
+
+    transcribe_audio 와 같은 설정(ASR_PARALLEL_WORKERS, ASR_TWO_PASS)을 따른다:
+    - workers > 1: transcribe_audio 와 같은 무음 기준 조각으로 병렬 전사하고 앞 조각부터 차례로 내보냄
+    - 엔진이 segment 를 바로 내주면(faster_whisper) 전체 오디오를 한 번에 전사 (문장 분할도 transcribe_audio 와 같음)
+    - 그 외(whisper_timestamped, 워커 1개)는 스트리밍을 위해 무음 기준 조각으로 나눠 차례로 전사하므로
+      문장 분할이 조각 경계를 따라 transcribe_audio 결과와 다를 수 있다
+    - two_pass: 1차 greedy segment 가 나오는 대로 신뢰도를 판단해 낮은 것만 beam search 로 다시 디코딩
+    """
+    options = {**(GREEDY_OPTIONS if two_pass else TRANSCRIBE_OPTIONS), **overrides}
+    backend = get_asr_backend()
+    audio = get_audio_store(vocals_path).get(sr=16000, channels=1)
+    first_pass = ((seg, audio, 0.0) for seg in _iter_first_pass(vocals_path, audio, backend, workers, options))
+    yield from _refine_segments(first_pass, backend, two_pass)
+
+
+def iter_transcribe_separated(vocal_chunks, two_pass=ASR_TWO_PASS, max_sec=ASR_CHUNK_MAX_SEC, **overrides):
+    """
+    Demucs 스트리밍 분리 조각(demucs_wrapper.separate_vocals_stream)을 받는 대로 전사해서
+    확정된 segment 를 yield (분리가 끝나기 전에 앞부분 문장부터 나옴, 형식은 iter_transcribe_segments 와 같음)
+
+    - 조각의 vocals 를 mono 로 모아 max_sec 이상 쌓이면 뒤쪽 1/4 안의 가장 조용한 곳에서 잘라
+      16k 로 바꿔 전사하고, 남은 부분은 다음 조각과 이어 붙인다
+    - 메모리는 max_sec 분량 버퍼 + 분리 window 크기로 고정 (전체 16k 오디오를 올리지 않음)
+    - two_pass 재디코딩은 그 조각 오디오 안에서 한다
+    - 조각은 분리되는 순서대로 이 프로세스에서 전사한다 (ASR_PARALLEL_WORKERS 는 쓰지 않음)
+    문장 분할이 조각 경계를 따라 transcribe_audio 결과와 다를 수 있다.
+    """
+    options = {**(GREEDY_OPTIONS if two_pass else TRANSCRIBE_OPTIONS), **overrides}
+    backend = get_asr_backend()
+
+    def first_pass():
+        pending, offset, sr = np.zeros(0, dtype=np.float32), 0, None
+        for chunk in vocal_chunks:
+            sr = chunk["sr"]
+            vocals = np.asarray(chunk["vocals"], dtype=np.float32)
+            pending = np.concatenate([pending, vocals.mean(axis=1) if vocals.ndim > 1 else vocals])
+            limit = int(max_sec * sr)
+            while len(pending) >= limit:
+                cut = quiet_cut(pending, sr, limit * 3 // 4, limit)
+                yield from _transcribe_piece(pending[:cut], sr, offset / sr, backend, options)
+                pending, offset = pending[cut:], offset + cut
+        if len(pending):
+            yield from _transcribe_piece(pending, sr, offset / sr, backend, options)
+
+    yield from _refine_segments(first_pass(), backend, two_pass)
+
+
+def _transcribe_piece(piece, sr, offset_sec, backend, options):
+    """
+    iter_transcribe_separated 의 1차 디코딩: 모델 샘플레이트 mono 조각을 16k 로 바꿔 전사하고
+    (segment, 조각 16k 오디오, 원본 기준 오프셋 초) 를 yield (segment 시간은 조각 기준)
+    """
+    import torchaudio
+
+    audio = torchaudio.functional.resample(torch.from_numpy(np.ascontiguousarray(piece)), sr, 16000).numpy()
+    for seg in backend.iter_segments(audio, **options):
+        yield seg, audio, offset_sec
+
+
+def _refine_segments(first_pass, backend, two_pass):
+    """
+    (segment, segment 시간 기준 16k 오디오, 원본 기준 오프셋 초) 를 받아 2단계 재디코딩, 시간 이동,
+    단어 타임스탬프 보정을 하고 id 를 0부터 매겨 yield
+    """
+    stats = {"total": 0, "escalated": 0, "replaced": 0, "reasons": {}}
+    next_id = 0
+    for seg, audio, offset_sec in first_pass:
+        refined = [seg]
+        if two_pass:
+            # 단어 확률은 타임스탬프 보정 전에만 남아 있으므로 여기서 판단
+            refined, seg_stats = redecode_low_confidence(audio, [seg], backend)
+            for key in ("total", "escalated", "replaced"):
+                stats[key] += seg_stats[key]
+            for reason, count in seg_stats["reasons"].items():
+                stats["reasons"][reason] = stats["reasons"].get(reason, 0) + count
+        if offset_sec:
+            refined = shift_result({"segments": refined}, offset_sec)["segments"]
+        for seg in refined:
+            seg['words'] = validate_and_fix_timestamps(seg.get('words', []))
+            seg['id'] = next_id
+            next_id += 1
+            yield seg
+
+    print(f"📝 총 {next_id} 개의 문장 추출.")
+    if two_pass:
+        print(f"🔁 2단계 디코딩: {stats['total']}개 중 {stats['escalated']}개 재디코딩 "
+              f"({stats['replaced']}개 교체), 사유 {stats['reasons']}")
+
+
+def _iter_first_pass(vocals_path, audio, backend, workers, options):
+    """
+    iter_transcribe_segments 의 1차 디코딩: 원본 기준 시간의 segment 를 확정되는 대로 yield
+    """
+    if workers > 1:
+        for result in iter_transcribe_chunked(vocals_path, workers=workers, **options):
+            yield from result.get('segments', [])
+        return
+    if backend.streams_segments:
+        yield from backend.iter_segments(audio, **options)
+        return
+
+    from vad import detect_speech_regions
+
+    print("ℹ️ 스트리밍 전사: 무음 기준 조각 단위로 전사 (문장 분할이 전체 전사와 다를 수 있음)")
+    for start, end in plan_chunks(detect_speech_regions(vocals_path)):
+        chunk = np.array(audio[int(start * 16000):int(end * 16000)])
+        for seg in backend.iter_segments(chunk, **options):
+            yield shift_result({"segments": [seg]}, start)["segments"][0]
+
+
+async def atranscribe_segments(vocals_path, **overrides):
+    """
+    iter_transcribe_segments 의 async 버전: 전사는 스레드에서 돌리고 확정된 segment 를 await 로 받는다
+        async for seg in atranscribe_segments(path): ...
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+
+    def produce():
+        try:
+            for seg in iter_transcribe_segments(vocals_path, **overrides):
+                loop.call_soon_threadsafe(queue.put_nowait, seg)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    # 작업 단위 오디오 저장소 기록(contextvar)이 전사 스레드에도 이어지도록 context 를 복사해서 실행
+    producer = loop.run_in_executor(None, contextvars.copy_context().run, produce)
+    while True:
+        item = await queue.get()
+        if item is done:
+            break
+        if isinstance(item, Exception):
+            raise item
+        yield item
+    await producer
+
+
 def transcribe_audio_check(vocals_path):
     print("🎙️자막추출 기본 모델 호출 ")
-    model = wts.load_model("base").to(device)
 
     print("🧠 음성 데이터 텍스트 변환중...")
-    result = model.transcribe(
-        vocals_path, 
+    result = get_asr_backend().transcribe(
+        get_audio_store(vocals_path).get(sr=16000, channels=1),
         word_timestamps=True,
         language="en"
     )
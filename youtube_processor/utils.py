@@ -105,10 +105,13 @@
 import re
 import shutil
 import subprocess
+import threading
+import uuid
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs
 import boto3
 from botocore.exceptions import ClientError
+from config import MEDIA_CACHE_DIR, MFA_IMAGE, MFA_DAEMON_ENABLED, MFA_JOB_TIMEOUT
 
 
 def sanitize_filename(name):
@@ -123,10 +126,45 @@ def extract_video_id(youtube_url):
     return params.get('v', [None])[0]
 
 
+def is_object_store_key(source):
+    # s3://bucket/key 형태의 오브젝트 스토리지 키
+    return urlparse(str(source)).scheme == "s3"
+
+
+def is_remote_url(source):
+    # http(s) URL 이면 yt-dlp 로 받는 원격 소스
+    return urlparse(str(source)).scheme in ("http", "https")
+
+
+def split_object_store_key(source):
+    # s3://bucket/path/to/file.mp4 → ("bucket", "path/to/file.mp4")
+    parsed = urlparse(str(source))
+    return parsed.netloc, parsed.path.lstrip("/")
+
+
+def extract_source_id(source):
+    """
+    입력 소스의 식별자 (파일명/폴더명에 사용)
+    - YouTube URL: 영상 id
+    - s3://bucket/key, 로컬 경로: 파일명(확장자 제외)
+    """
+    if is_remote_url(source):
+        return extract_video_id(source)
+    if is_object_store_key(source):
+        _, key = split_object_store_key(source)
+        return sanitize_filename(Path(key).stem)
+    return sanitize_filename(Path(source).stem)
+
+
 def reset_folder(*folders, remove_only_files=False):
     for folder in folders:
         path = Path(__file__).parent / folder
         print(f"📂 Resetting folder: {path.resolve()}")
+        # 미디어 캐시는 작업 간에 유지해야 하므로 절대 지우지 않는다
+        cache_root = MEDIA_CACHE_DIR.resolve()
+        if path.resolve() == cache_root or path.resolve() in cache_root.parents:
+            print(f"⏭️ 미디어 캐시 폴더는 초기화하지 않습니다: {folder}")
+            continue
         if path.exists():
             if remove_only_files:
                 for child in path.iterdir():
@@ -143,26 +181,69 @@ def reset_folder(*folders, remove_only_files=False):
 
 
 def run_mfa_align():
+    """
+    syncdata/mfa/corpus 를 정렬해 mfa_output 에 TextGrid 를 만든다.
+    작업마다 corpus 를 jobs/corpus_<id> 로 복사해 jobs/output_<id> 에 정렬하고 TextGrid 만 mfa_output 으로 옮긴다
+    (시간 초과로 버려진 작업이 다음 작업의 입력/출력과 섞이지 않도록).
+    MFA_DAEMON_ENABLED 면 상주 컨테이너 워커(mfa_client)에 작업을 보내고,
+    워커를 쓸 수 없으면 예전처럼 docker run 으로 한 번 실행한다 (둘 다 MFA_JOB_TIMEOUT 을 넘으면 MFAAlignError / TimeoutExpired,
+    시간 초과된 작업은 다시 돌리지 않는다).
+    """
     current_dir = Path(__file__).parent
     project_root = current_dir.parent
     mfa_data_path = project_root / "syncdata" / "mfa"
+    job_id = uuid.uuid4().hex[:8]
+    # MFA 는 corpus 폴더 이름으로 임시 작업 폴더를 만들므로 이름에도 작업 id 를 넣는다
+    corpus, output = f"jobs/corpus_{job_id}", f"jobs/output_{job_id}"
+    shutil.copytree(mfa_data_path / "corpus", mfa_data_path / corpus)
+    try:
+        textgrids = None
+        if MFA_DAEMON_ENABLED:
+            from mfa_client import align, MFADaemonUnavailable
+            try:
+                textgrids = align(mfa_data_path, corpus, output, job_id=job_id)
+            except MFADaemonUnavailable as e:
+                print(f"⚠️ MFA 상주 워커 사용 불가, docker run 으로 실행합니다: {e}")
+        if textgrids is None:
+            textgrids = _run_mfa_align_once(mfa_data_path, corpus, output, job_id=job_id)
+
+        output_dir = mfa_data_path / "mfa_output"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return [Path(shutil.move(str(p), str(output_dir / Path(p).name))) for p in textgrids]
+    finally:
+        for job_dir in (corpus, output):
+            shutil.rmtree(mfa_data_path / job_dir, ignore_errors=True)
+
+
+def _run_mfa_align_once(mfa_data_path: Path, corpus="corpus", output="mfa_output", job_id=None, timeout=MFA_JOB_TIMEOUT):
     mfa_data_absolute = mfa_data_path.resolve()
     print(f"Docker MFA 경로: {mfa_data_absolute}")
-    # 디버깅: corpus, mfa_output 폴더 파일 리스트 출력
-    print("[DEBUG] corpus 폴더 파일:", list((mfa_data_path / "corpus").glob("*")))
-    print("[DEBUG] mfa_output 폴더 파일 (실행 전):", list((mfa_data_path / "mfa_output").glob("*")))
+    # 디버깅: corpus 폴더 파일 리스트 출력
+    print("[DEBUG] corpus 폴더 파일:", list((mfa_data_path / corpus).glob("*")))
     host_mount = str(mfa_data_absolute).replace('C:', '/c').replace('\\', '/')
+    # 시간 초과 시 docker 클라이언트만 죽이면 컨테이너는 계속 돌므로 이름을 붙여 두고 컨테이너째 지운다
+    container = f"mfa-align-{job_id or uuid.uuid4().hex[:8]}"
     command = [
-        "docker", "run", "--rm", "--platform", "linux/amd64",
+        "docker", "run", "--rm", "--name", container, "--platform", "linux/amd64",
         "-v", f"{host_mount}:/data",
-        "mmcauliffe/montreal-forced-aligner:latest",
+        MFA_IMAGE,
         "mfa", "align",
-        "/data/corpus", "/data/english_us_arpa.dict", "/data/english_us_arpa", "/data/mfa_output",
+        f"/data/{corpus}", "/data/english_us_arpa.dict", "/data/english_us_arpa", f"/data/{output}",
         "--clean", "--beam", "100", "--retry_beam", "400",
         "--phone_boundary_method", "strict", "--output_format", "long_textgrid"
     ]
     try:
         process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            subprocess.run(["docker", "rm", "-f", container], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            process.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.daemon = True
+        timer.start()
         if process.stdout is not None:
             for raw_line in process.stdout:
                 try:
@@ -171,10 +252,15 @@ def run_mfa_align():
                     line = raw_line.decode('utf-8', errors='ignore')
                 print(line, end='')
         process.wait()
-        # 디버깅: mfa_output 폴더 파일 리스트 출력 (실행 후)
-        print("[DEBUG] mfa_output 폴더 파일 (실행 후):", list((mfa_data_path / "mfa_output").glob("*")))
+        timer.cancel()
+        if timed_out.is_set():
+            print(f"❌ MFA 실행 시간 초과 ({timeout}초), 컨테이너를 지웠습니다: {container}")
+            raise subprocess.TimeoutExpired(command, timeout)
+        # 디버깅: output 폴더 파일 리스트 출력 (실행 후)
+        print("[DEBUG] output 폴더 파일 (실행 후):", list((mfa_data_path / output).glob("*")))
         if process.returncode != 0:
             raise subprocess.CalledProcessError(process.returncode, command)
+        return sorted((mfa_data_path / output).glob("*.TextGrid"))
     except subprocess.CalledProcessError as e:
         print("❌ MFA 실행 중 오류 발생!")
         print("명령:", e.cmd)
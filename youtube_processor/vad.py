@@ -0,0 +1,65 @@
+"""
+음성 구간 검출 (VAD)
+
+webrtcvad(requirements.txt 에 webrtcvad==2.0.10 으로 직접 명시)로 16k mono 를 30ms 프레임 단위로 판정하고,
+짧은 끊김은 합치고 앞뒤로 여유(pad)를 붙여 (start, end) 초 단위 구간 목록을 만든다.
+오디오는 공유 오디오 저장소에서 받아 프레임 단위로 읽으므로 긴 파일도 메모리 사용이 일정하다.
+"""
+
+import numpy as np
+import webrtcvad
+
+from audio_store import get_audio_store
+from config import VAD_AGGRESSIVENESS, VAD_PAD_SEC, VAD_MIN_GAP_SEC, VAD_MIN_SPEECH_SEC
+
+VAD_SR = 16000
+FRAME_MS = 30
+
+
+def detect_speech_regions(audio_path, aggressiveness=VAD_AGGRESSIVENESS, pad_sec=VAD_PAD_SEC,
+                          min_gap_sec=VAD_MIN_GAP_SEC, min_speech_sec=VAD_MIN_SPEECH_SEC) -> list:
+    """
+    음성 구간 [(start_sec, end_sec), ...] 반환 (시간순, 서로 겹치지 않음)
+
+    - min_gap_sec 보다 짧은 무음으로 떨어진 구간은 하나로 합친다
+    - min_speech_sec 보다 짧은 구간은 버린다 (클릭/잡음)
+    - 각 구간 앞뒤로 pad_sec 를 붙인다 (파일 범위 안으로 자름)
+    """
+    y = get_audio_store(audio_path).get(sr=VAD_SR, channels=1)
+    vad = webrtcvad.Vad(int(aggressiveness))
+    frame = VAD_SR * FRAME_MS // 1000
+    duration = len(y) / VAD_SR
+
+    raw = []
+    current = None
+    for i in range(0, len(y) - frame + 1, frame):
+        pcm = np.clip(np.rint(np.asarray(y[i:i + frame]) * 32768.0), -32768, 32767).astype("<i2").tobytes()
+        if vad.is_speech(pcm, VAD_SR):
+            t = i / VAD_SR
+            if current is None:
+                current = [t, t + FRAME_MS / 1000]
+            else:
+                current[1] = t + FRAME_MS / 1000
+        elif current is not None:
+            raw.append(current)
+            current = None
+    if current is not None:
+        raw.append(current)
+
+    merged = []
+    for start, end in raw:
+        if merged and start - merged[-1][1] < min_gap_sec:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    regions = []
+    for start, end in merged:
+        if end - start < min_speech_sec:
+            continue
+        start, end = max(0.0, start - pad_sec), min(duration, end + pad_sec)
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)  # pad 때문에 겹치면 합침
+        else:
+            regions.append((start, end))
+    return regions
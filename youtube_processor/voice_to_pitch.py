@@ -30,7 +30,8 @@ import json
 import numpy as np
 from pathlib import Path
 from config import PITCH_REFERENCE_DIR, PITCH_USER_DIR, USER_UPLOADS_DIR
-from utils import extract_video_id, sanitize_filename
+from utils import extract_source_id, sanitize_filename
+from audio_store import get_audio_store
 
 def create_pitch_json_with_token(vocal_path, speaker):
     """
@@ -48,14 +49,17 @@ def create_pitch_json_with_token(vocal_path, speaker):
         # 기준 음성 피치 디렉토리 생성
         PITCH_REFERENCE_DIR.mkdir(parents=True, exist_ok=True)
         safe_actor_name = sanitize_filename(speaker['actor'])
-        safe_url = extract_video_id(speaker['video_url'])
+        safe_url = extract_source_id(speaker['video_url'])
         output_filename = f"{safe_actor_name}_{safe_url}_{speaker['token_id']}pitch.json"
         output_path = PITCH_REFERENCE_DIR / output_filename
         print(f"[DEBUG] output_path: {output_path}")
         print(f"기준 음성 피치 분석: {vocal_path}")
         print(f"출력 파일: {output_path}")
-        # 오디오 파일 로드
-        snd = parselmouth.Sound(vocal_path)
+        # 공유 오디오 저장소의 원본 샘플레이트/채널 버전 사용 (파일 재디코딩 생략)
+        store = get_audio_store(vocal_path)
+        samples = store.get()
+        values = samples[None, :] if samples.ndim == 1 else samples.T  # parselmouth: (channels, frames)
+        snd = parselmouth.Sound(values.astype(np.float64), sampling_frequency=store.native_sr)
         print(f"오디오 정보: {snd.duration:.2f}초, {snd.sampling_frequency}Hz")
         pitch = snd.to_pitch(time_step=0.1)
         print(f"피치 프레임 수: {pitch.get_number_of_frames()}")